@@ -2,7 +2,9 @@
 Django settings for bank_api project.
 """
 
+import os
 from pathlib import Path
+from .database import cache_settings, database_settings, replica_aliases
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,9 +38,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'banks.profiling.ProfilingMiddleware',
+    'banks.routers.ReplicaMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'banks.async_views.AsyncViewMiddleware',  # Before the synchronous middleware below
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -70,11 +75,36 @@ WSGI_APPLICATION = 'bank_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Configured from the environment, see bank_api/database.py: DATABASE_URL
+# (default: SQLite at db.sqlite3), DATABASE_REPLICA_URLS, DB_CONN_MAX_AGE,
+# DB_CONN_HEALTH_CHECKS and DB_DISABLE_SERVER_SIDE_CURSORS.
+
+DATABASES = database_settings(os.environ, f'sqlite:///{BASE_DIR / "db.sqlite3"}')
+
+# Reads go to these aliases in turn, one per request, and writes to the
+# primary (see banks.routers)
+BANKS_READ_REPLICAS = replica_aliases(DATABASES)
+
+DATABASE_ROUTERS = ['banks.routers.ReplicaRouter']
+
+# Configured from the environment, see bank_api/database.py: CACHE_URL (default:
+# memory private to each process).
+
+CACHES = cache_settings(os.environ)
+
+# Pragmas set on every SQLite connection (see banks.sqlite). Serving processes
+# that never write can set SQLITE_QUERY_ONLY=1; the data load commands must
+# run without it.
+BANKS_SQLITE = {
+    'PRAGMAS': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'memory',
+        'busy_timeout': 5000,
+    },
+    'QUERY_ONLY': os.environ.get('SQLITE_QUERY_ONLY') == '1',
 }
 
 
@@ -124,13 +154,88 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'banks.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
 }
 
+# Cache-Control max-age, in seconds, of public read responses (see banks.conditional)
+BANKS_HTTP_CACHE = {
+    'MAX_AGE': 300,
+}
+
+# Read-through cache of branch detail payloads keyed by IFSC. Lookups served from it
+# check the dataset version for changes made by other processes every CHECK_INTERVAL
+# seconds.
+BANKS_IFSC_CACHE = {
+    'MAX_SIZE': 20000,  # Entries; roughly 1.5 KB each
+    'TTL': 3600,  # Seconds
+    'CHECK_INTERVAL': 1,
+}
+
+# Encoded JSON of branch list rows and banks, reused across list pages
+BANKS_FRAGMENT_CACHE = {
+    'MAX_SIZE': 20000,
+    'TTL': 3600,
+}
+
+# Serve the read endpoints from an in-memory snapshot of both tables (see banks.snapshot).
+# Each process checks the tables for changes every CHECK_INTERVAL seconds. PACK is a
+# file written by export_pack that snapshots are read from while it matches the tables.
+BANKS_SNAPSHOT = {
+    'ENABLED': False,
+    'CHECK_INTERVAL': 30,
+    'PACK': os.environ.get('BANKS_SNAPSHOT_PACK') or None,
+}
+
+# Detail, list and search payloads in the shared cache CACHES[ALIAS], namespaced by
+# the dataset version (see banks.shared_cache). A missing key is computed by one
+# process; the others wait for it for up to WAIT seconds.
+BANKS_SHARED_CACHE = {
+    'ENABLED': os.environ.get('SHARED_CACHE') == '1',
+    'ALIAS': 'default',
+    'TIMEOUT': 3600,  # Seconds
+    'LOCK_TIMEOUT': 10,
+    'WAIT': 5,
+}
+
+# Maximum number of IFSC codes accepted by POST /api/branches/batch/
+BANKS_BATCH_LOOKUP_MAX = 1000
+
+# Opt-in request profiling (see banks.profiling): Server-Timing headers, histograms at
+# /api/metrics/ and a warning for requests that run more queries than their view's budget
+BANKS_PROFILING = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'QUERY_BUDGET': 10,
+    'QUERY_BUDGETS': {},  # Per URL name, e.g. {'bank-summary': 4}
+}
+
+# In-memory autocomplete index (see banks.autocomplete). Each process checks for
+# changed data every CHECK_INTERVAL seconds and rebuilds its index if needed.
+BANKS_AUTOCOMPLETE = {
+    'CHECK_INTERVAL': 30,
+}
+
+# Nearest-branch search (see banks.geo). GAZETTEER is a CSV of place coordinates that
+# load_real_data locates branches with. Each process checks for changed data every
+# CHECK_INTERVAL seconds and rebuilds its spatial index if needed.
+BANKS_GEO = {
+    'GAZETTEER': os.environ.get('BANKS_GAZETTEER') or None,
+    'CHECK_INTERVAL': 30,
+}
+
+# The operations endpoints (/api/cache/stats/, /api/snapshot/stats/, /api/metrics/) are
+# staff-only unless PUBLIC is set (see banks.permissions)
+BANKS_OPERATIONS = {
+    'PUBLIC': os.environ.get('BANKS_OPERATIONS_PUBLIC') == '1',
+}
+
+# Seconds a process keeps its in-memory copy of the facets table
+BANKS_FACET_TTL = 300
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWED_ORIGINS = [
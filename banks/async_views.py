@@ -0,0 +1,190 @@
+"""
+Async versions of the read endpoints, served under ``/api/async/``.
+
+Under an ASGI server (``uvicorn bank_api.asgi:application``) these views run
+on the event loop and use Django's async ORM, so a request waiting on the
+database or on a slow client does not hold a worker thread. Responses match
+the synchronous DRF endpoints of the same name: they carry the same
+validators and cache headers (see banks.conditional), and are answered from
+the snapshot and the shared cache when those are enabled. Detail lookups
+answered from the snapshot or the in-process caches run on the event loop
+without leaving it; only misses await the async ORM. Code that only exists
+synchronously, the shared cache and the full-text search check, runs in a
+thread. AsyncViewMiddleware keeps Django's synchronous middleware from
+moving the request to a thread and back.
+"""
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from . import snapshot
+from .cache import aget_bank_payload, get_bank_payload
+from .conditional import (
+    arequest_branch_payload,
+    arequest_payload,
+    ause_shared_cache,
+    bank_conditional,
+    branch_conditional,
+    dataset_conditional,
+    request_data,
+    search_conditional,
+)
+from .models import Bank, Branch
+from .search import MATCH_MODES, MATCH_PREFIX, SEARCH_FIELDS, has_fts, search_branches
+from .serializers import BRANCH_LIST_ROW, BankSerializer
+
+
+class AsyncViewMiddleware:
+    """
+    Serve the views of this module straight from the event loop under ASGI.
+
+    Django 4.2's own middleware only has synchronous hooks, and an async
+    stack runs each of them in the thread-sensitive executor: a dozen hops
+    through a single thread per request, which outweigh a cache hit many
+    times over. Listed before them in MIDDLEWARE, this answers requests for
+    these views without them; the views are public, read-only JSON and use
+    neither the session, the user, messages nor CSRF. Under WSGI it does
+    nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return await self.get_response(request)
+        if match.func.__module__ != __name__:
+            return await self.get_response(request)
+        request.resolver_match = match
+        return await match.func(request, *match.args, **match.kwargs)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def not_found(detail='Not found.'):
+    return json_response({'detail': detail}, status=404)
+
+
+async def shared_data(request, kind, build):
+    """request_data() of the coroutine function ``build``, awaited directly unless the shared cache is used."""
+    if not await ause_shared_cache():
+        return await build()
+    return await sync_to_async(request_data)(request, kind, async_to_sync(build))
+
+
+async def paginate(request, items, serializer_class=None):
+    """
+    Page a queryset, or a list of payloads from the snapshot, the way DRF's
+    PageNumberPagination does. Queryset items are rendered by ``serializer_class``.
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await items.acount() if serializer_class else len(items)
+    last_page = max(1, -(-count // page_size))
+    if not 1 <= page <= last_page:
+        return None
+
+    offset = (page - 1) * page_size
+    if serializer_class:
+        results = serializer_class([item async for item in items[offset:offset + page_size]], many=True).data
+    else:
+        results = list(items[offset:offset + page_size])
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < last_page else None,
+        'previous': previous,
+        'results': results,
+    }
+
+
+@dataset_conditional
+async def bank_list(request):
+    """List all banks, paginated."""
+    async def build():
+        return await paginate(request, Bank.objects.all(), BankSerializer)
+
+    current = await snapshot.aget_snapshot()
+    if current is not None:
+        data = await paginate(request, current.bank_list())
+    else:
+        data = await shared_data(request, 'bank-list', build)
+    if data is None:
+        return not_found('Invalid page.')
+    return json_response(data)
+
+
+@bank_conditional
+async def bank_detail(request, id):
+    """Retrieve a specific bank; the validators have already loaded it."""
+    payload = await arequest_payload(request, get_bank_payload, aget_bank_payload, id)
+    if payload is None:
+        return not_found()
+    return json_response(payload)
+
+
+@branch_conditional
+async def branch_detail(request, ifsc):
+    """Retrieve a specific branch by IFSC code; the validators have already loaded it."""
+    payload = await arequest_branch_payload(request, ifsc)
+    if payload is None:
+        return not_found()
+    return json_response(payload)
+
+
+@search_conditional
+async def branch_search(request):
+    """Search branches by IFSC code, city, district or branch name."""
+    ifsc = request.GET.get('ifsc')
+    terms = {
+        field: request.GET[field]
+        for field in SEARCH_FIELDS
+        if request.GET.get(field, '').strip()
+    }
+    match = request.GET.get('match', MATCH_PREFIX)
+
+    if not ifsc and not terms:
+        return json_response({'error': f'Please provide one of: {", ".join(("ifsc",) + SEARCH_FIELDS)}'}, status=400)
+    if match not in MATCH_MODES:
+        return json_response({'error': f'match must be one of: {", ".join(MATCH_MODES)}'}, status=400)
+
+    if ifsc:
+        payload = await arequest_branch_payload(request, ifsc)
+        if payload is None:
+            return json_response({'message': 'No branches found'}, status=404)
+        return json_response({'branch': payload})
+
+    async def build():
+        queryset = Branch.objects.all()
+        fts = await sync_to_async(has_fts)(queryset.db)
+        rows = BRANCH_LIST_ROW.values(search_branches(queryset, terms, match, fts=fts))
+        return [BRANCH_LIST_ROW.to_representation(row) async for row in rows]
+
+    current = await snapshot.aget_snapshot()
+    branches = current.search(terms, match) if current is not None else None
+    if branches is None:
+        branches = await shared_data(request, 'branch-search', build)
+    if not branches:
+        return json_response({'message': 'No branches found'}, status=404)
+    return json_response({'branches': branches})
@@ -0,0 +1,442 @@
+"""
+Autocomplete over bank names, cities, districts and branch names.
+
+An AutocompleteIndex keeps one entry per bank, district, city and branch in
+memory, with an inverted index from lower-cased words to entries. Every
+query word is matched as a word prefix ("bangalor" finds BANGALORE), and a
+word that is the prefix of no indexed word is matched within a small edit
+distance instead ("banglore"), using a trigram index to find candidate
+words. An entry is also found through its context: a branch through its
+bank and city names ("hdfc kora" finds HDFC's Koramangala branches), a city
+or district through its district and state.
+
+Suggestions are ranked by how well the words matched, words of the entry's
+own name counting more than words of its context, then by kind and by
+branch count. Each process builds its index from the bank and branch
+tables on first use, and rebuilds it when the DatasetVersion changes.
+After a refresh the loading process patches its index in place instead.
+"""
+import heapq
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+from .models import Bank, Branch, DatasetVersion, Facet
+from .search import RANGE_END
+
+
+BANK = 'bank'
+CITY = 'city'
+DISTRICT = 'district'
+BRANCH = 'branch'
+KINDS = (BANK, CITY, DISTRICT, BRANCH)  # Also the order of ties in the ranking
+
+EXACT, PREFIX, FUZZY = 4, 3, 1
+# Score of a word matched in an entry's context rather than its name.
+CONTEXT = 2
+
+FUZZY_MIN_LENGTH = 4
+# Entries gathered for one query word; words matching more are only used to filter.
+MAX_SCAN = 5000
+# Candidates scored for a query whose words all match more than MAX_SCAN entries.
+CANDIDATES = 1000
+# Single-word queries up to this long have their results remembered.
+SHORT_PREFIX = 3
+MAX_LIMIT = 50
+
+WORD_RE = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+def max_distance(word):
+    """Edit distance allowed when matching ``word`` fuzzily."""
+    if len(word) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def trigrams(word):
+    # Padded at the front only: the trigrams of a prefix are then a subset of the word's.
+    padded = '  ' + word
+    return {padded[i:i + 3] for i in range(len(word))}
+
+
+def within_one(word, other):
+    """Whether ``word`` is at most one edit from a prefix of ``other``."""
+    n = len(word)
+    i = 0
+    for char, other_char in zip(word, other):
+        if char != other_char:
+            break
+        i += 1
+    if i == n:
+        return True
+    return (
+        other[i:n - 1] == word[i + 1:]  # ``word[i]`` deleted
+        or (len(other) > i and other[i + 1:n] == word[i + 1:])  # ``word[i]`` replaced
+        or other[i + 1:n + 1] == word[i:]  # ``other[i]`` inserted
+    )
+
+
+def prefix_distance(word, other, limit):
+    """
+    Smallest edit distance between ``word`` and a prefix of ``other``, or
+    ``limit + 1`` once it is certain to exceed ``limit``.
+    """
+    previous = list(range(len(word) + 1))
+    best = previous[-1]
+    # Longer prefixes are more than ``limit`` insertions away.
+    for char in other[:len(word) + limit]:
+        current = [previous[0] + 1]
+        for i, word_char in enumerate(word, 1):
+            current.append(min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (word_char != char)))
+        best = min(best, current[-1])
+        if min(current) > limit:
+            break
+        previous = current
+    return best if best <= limit else limit + 1
+
+
+class QueryWord:
+    """One word of a query and the indexed words it matches."""
+
+    def __init__(self, text, prefixed=(), fuzzy=()):
+        self.text = text
+        self.prefixed = frozenset(prefixed)
+        self.fuzzy = frozenset(fuzzy)
+        self.words = list(prefixed) + list(fuzzy)
+
+    def score(self, words, context):
+        if self.text in words:
+            return EXACT
+        if not self.prefixed.isdisjoint(words):
+            return PREFIX
+        if self.fuzzy and not self.fuzzy.isdisjoint(words):
+            return FUZZY
+        if not self.prefixed.isdisjoint(context):
+            return CONTEXT
+        if self.fuzzy and not self.fuzzy.isdisjoint(context):
+            return FUZZY
+        return 0
+
+
+class AutocompleteIndex:
+    """
+    Entries and the word index over them.
+
+    Entries are added in ranking order, by kind and then by falling branch
+    count, so lower ids rank first on a tie in score and the best entries
+    of a word are the head of its postings. Removed entries are only marked
+    dead, so ids stay valid while a refresh is applied; ``compact`` builds a
+    fresh index from the live entries, in ranking order again.
+    """
+
+    def __init__(self, version=(0, None)):
+        self.version = version
+        self.kinds = []
+        self.weights = []
+        self.suggestions = []
+        self.words = []
+        self.context = []
+        self.alive = bytearray()
+        self.dead = 0
+        self.by_key = {}
+        self.postings = {}
+        self.sorted_words = []
+        self.grams = defaultdict(list)
+        self._results = {}
+        self.checked_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.kinds) - self.dead
+
+    def add(self, key, kind, weight, suggestion, name, context=()):
+        """Add an entry; ``key`` identifies it for ``remove``."""
+        words = tuple(dict.fromkeys(tokenize(name)))
+        context = tuple(word for word in dict.fromkeys(tokenize(' '.join(context))) if word not in words)
+        self._add(key, KINDS.index(kind), weight, suggestion, words, context)
+
+    def _add(self, key, code, weight, suggestion, words, context):
+        entry = len(self.kinds)
+        self.kinds.append(code)
+        self.weights.append(weight)
+        self.suggestions.append(suggestion)
+        self.words.append(words)
+        self.context.append(context)
+        self.alive.append(1)
+        self.by_key[key] = entry
+        for word in words + context:
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = array('I')
+                # While bulk loading the words are sorted once at the end.
+                if self.sorted_words is not None:
+                    insort(self.sorted_words, word)
+                for gram in trigrams(word):
+                    self.grams[gram].append(word)
+            postings.append(entry)
+        self._results.clear()
+
+    def remove(self, key):
+        entry = self.by_key.pop(key, None)
+        if entry is not None:
+            self.alive[entry] = 0
+            self.dead += 1
+            self._results.clear()
+
+    def remove_kind(self, kind):
+        code = KINDS.index(kind)
+        for key in [key for key, entry in self.by_key.items() if self.kinds[entry] == code]:
+            self.remove(key)
+
+    def compact(self):
+        """A new index holding only the live entries."""
+        index = AutocompleteIndex(self.version)
+        index.sorted_words = None
+        entries = sorted(self.by_key.items(), key=lambda item: (self.kinds[item[1]], -self.weights[item[1]]))
+        for key, entry in entries:
+            index._add(key, self.kinds[entry], self.weights[entry], self.suggestions[entry],
+                       self.words[entry], self.context[entry])
+        index.sorted_words = sorted(index.postings)
+        return index
+
+    def fuzzy_words(self, text):
+        """Indexed words that ``text`` is within max_distance of a prefix of."""
+        limit = max_distance(text)
+        if not limit:
+            return []
+        grams = trigrams(text)
+        # A prefix within ``limit`` edits shares at least this many trigrams with ``text``.
+        needed = max(1, len(grams) - 3 * limit)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.grams.get(gram, ()))
+        if limit == 1:
+            return [word for word, count in shared.items() if count >= needed and within_one(text, word)]
+        return [
+            word for word, count in shared.items()
+            if count >= needed and prefix_distance(text, word, limit) <= limit
+        ]
+
+    def match(self, text):
+        """A QueryWord for ``text``, or None if it matches no indexed word."""
+        lo = bisect_left(self.sorted_words, text)
+        hi = bisect_left(self.sorted_words, text + RANGE_END, lo)
+        if lo < hi:
+            return QueryWord(text, prefixed=self.sorted_words[lo:hi])
+        fuzzy = self.fuzzy_words(text)
+        return QueryWord(text, fuzzy=fuzzy) if fuzzy else None
+
+    def entries(self, words):
+        """Entries indexed under any of ``words``, or None past MAX_SCAN."""
+        found = set()
+        for word in words:
+            postings = self.postings[word]
+            if len(found) + len(postings) > MAX_SCAN:
+                return None
+            found.update(postings)
+        return found
+
+    def head(self, words):
+        """The first CANDIDATES entries indexed under any of ``words``, in ranking order."""
+        head = {}
+        # An entry can be under several of the words, so count distinct ones.
+        for entry in heapq.merge(*(self.postings[word] for word in words)):
+            head[entry] = None
+            if len(head) == CANDIDATES:
+                break
+        return list(head)
+
+    def search(self, query, limit=10, kinds=KINDS):
+        """The best ``limit`` suggestions for ``query``, of the given kinds."""
+        texts = list(dict.fromkeys(tokenize(query)))
+        if not texts:
+            return []
+        codes = frozenset(KINDS.index(kind) for kind in kinds)
+        # The first keys typed match the most entries, and are the same for everyone.
+        if len(texts) == 1 and len(texts[0]) <= SHORT_PREFIX and limit <= MAX_LIMIT:
+            key = (texts[0], codes)
+            ranked = self._results.get(key)
+            if ranked is None:
+                ranked = self._results[key] = self.rank(texts, MAX_LIMIT, codes)
+            return [self.suggestions[entry] for entry in ranked[:limit]]
+        return [self.suggestions[entry] for entry in self.rank(texts, limit, codes)]
+
+    def rank(self, texts, limit, codes):
+        """Ids of the best ``limit`` entries matching every word of ``texts``."""
+        query_words = []
+        candidates = None
+        for text in texts:
+            query_word = self.match(text)
+            if query_word is None:
+                return []
+            query_words.append(query_word)
+            found = self.entries(query_word.words)
+            if found is not None:
+                candidates = found if candidates is None else candidates & found
+        if candidates is None:
+            # Every word is too common to gather in full: start from the best
+            # entries of the most specific one.
+            candidates = self.head(min((query_word.words for query_word in query_words), key=len))
+
+        kinds, weights, alive, words, context = self.kinds, self.weights, self.alive, self.words, self.context
+        scored = []
+        for entry in candidates:
+            if not alive[entry] or kinds[entry] not in codes:
+                continue
+            score = 0
+            for query_word in query_words:
+                word_score = query_word.score(words[entry], context[entry])
+                if not word_score:
+                    break
+                score += word_score
+            else:
+                scored.append((-score, kinds[entry], -weights[entry], entry))
+        return [entry for *_, entry in heapq.nsmallest(limit, scored)]
+
+
+def _add_places(index, banks, districts, cities):
+    for bank_id, name, count in sorted(banks, key=lambda row: -row[-1]):
+        index.add(
+            (BANK, bank_id), BANK, count,
+            {'type': BANK, 'text': name, 'id': bank_id, 'branch_count': count},
+            name,
+        )
+    for state, district, city, count in sorted(cities, key=lambda row: -row[-1]):
+        index.add(
+            (CITY, state, district, city), CITY, count,
+            {'type': CITY, 'text': city, 'district': district, 'state': state, 'branch_count': count},
+            city, (district, state),
+        )
+    for state, district, count in sorted(districts, key=lambda row: -row[-1]):
+        index.add(
+            (DISTRICT, state, district), DISTRICT, count,
+            {'type': DISTRICT, 'text': district, 'state': state, 'branch_count': count},
+            district, (state,),
+        )
+
+
+def _add_branches(index, rows, bank_names, bank_sizes):
+    for ifsc, name, bank_id, city in sorted(rows, key=lambda row: (-bank_sizes.get(row[2], 0), row[0])):
+        bank_name = bank_names.get(bank_id, '')
+        index.add(
+            (BRANCH, ifsc), BRANCH, bank_sizes.get(bank_id, 0),
+            {'type': BRANCH, 'text': name, 'ifsc': ifsc, 'bank': bank_name, 'city': city},
+            name, (bank_name, city),
+        )
+
+
+def build(using=None):
+    """Build an index from the bank and branch tables."""
+    using = using or router.db_for_read(Branch)
+    index = AutocompleteIndex(DatasetVersion.current(using))
+    index.sorted_words = None
+    bank_names = dict(Bank.objects.using(using).values_list('id', 'name'))
+    rows = list(
+        Branch.objects.using(using).order_by()
+        .values_list('ifsc', 'branch', 'bank_id', 'city', 'district', 'state').iterator(chunk_size=5000)
+    )
+    bank_sizes = Counter(row[2] for row in rows)
+    _add_places(
+        index,
+        [(bank_id, name, bank_sizes[bank_id]) for bank_id, name in bank_names.items()],
+        [(*key, count) for key, count in Counter((row[5], row[4]) for row in rows).items()],
+        [(*key, count) for key, count in Counter((row[5], row[4], row[3]) for row in rows).items()],
+    )
+    _add_branches(index, [row[:4] for row in rows], bank_names, bank_sizes)
+    index.sorted_words = sorted(index.postings)
+    return index
+
+
+def update(index, summary, using=DEFAULT_DB_ALIAS):
+    """
+    Apply a refresh's RefreshSummary to ``index`` in place: replace the
+    banks, districts and cities, from the facets table the load has just
+    rebuilt, and the changed branches. A changed bank renames the context of
+    many branches and needs a full ``build`` instead; returns False then.
+    """
+    if summary.banks_created or summary.banks_updated or summary.banks_deleted:
+        return False
+    bank_names = dict(Bank.objects.using(using).values_list('id', 'name'))
+    facets = list(Facet.objects.using(using).exclude(kind=Facet.STATE))
+    banks = [(facet.bank_id, facet.name, facet.branch_count) for facet in facets if facet.kind == Facet.BANK]
+    for kind in (BANK, CITY, DISTRICT):
+        index.remove_kind(kind)
+    _add_places(
+        index,
+        banks,
+        [(facet.state, facet.district, facet.branch_count) for facet in facets if facet.kind == Facet.DISTRICT],
+        [(facet.state, facet.district, facet.city, facet.branch_count)
+         for facet in facets if facet.kind == Facet.CITY],
+    )
+    bank_sizes = {bank_id: count for bank_id, _, count in banks}
+    ifscs = summary.changed_ifscs
+    for ifsc in ifscs:
+        index.remove((BRANCH, ifsc))
+    for start in range(0, len(ifscs), 5000):
+        rows = Branch.objects.using(using).filter(ifsc__in=ifscs[start:start + 5000]) \
+            .values_list('ifsc', 'branch', 'bank_id', 'city')
+        _add_branches(index, rows, bank_names, bank_sizes)
+    return True
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_AUTOCOMPLETE', {})
+    return config.get('CHECK_INTERVAL', 30)
+
+
+def get_index():
+    """
+    Return this process's index, building it on first use and rebuilding it
+    when the DatasetVersion has changed, which is checked at most every
+    ``BANKS_AUTOCOMPLETE['CHECK_INTERVAL']`` seconds.
+    """
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at <= get_config():
+        return index
+    with _lock:
+        index = _index
+        if index is None or time.monotonic() - index.checked_at > get_config():
+            if index is not None and DatasetVersion.current() == index.version:
+                index.checked_at = time.monotonic()
+            else:
+                index = _index = build()
+    return index
+
+
+def dataset_changed(summary=None, using=DEFAULT_DB_ALIAS):
+    """
+    Bring this process's index, if it has one, up to date after a load.
+    Called once the load's new DatasetVersion is committed. Lookups made
+    while a refresh is being applied may see part of it.
+    """
+    global _index
+    with _lock:
+        index = _index
+        if index is None:
+            return
+        if summary is None or not update(index, summary, using):
+            _index = build(using)
+            return
+        if index.dead > len(index):
+            index = index.compact()
+        index.version = DatasetVersion.current(using)
+        index.checked_at = time.monotonic()
+        _index = index
+
+
+def discard():
+    global _index
+    _index = None
@@ -0,0 +1,848 @@
+"""
+Benchmark helpers: a synthetic dataset generator, latency measurement, a
+registry of benchmark suites run by the ``benchmark`` management command and
+comparison of results against a saved baseline.
+"""
+import asyncio
+import csv
+import heapq
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models import Count
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from . import autocomplete, facets, geo, pack, renderers, snapshot, sqlite
+from .cache import branch_cache, fragment_cache
+from .ingest import BRANCH_FIELDS, CSV_FIELDS, CSVIngestor, ParallelValidator, validate_file, validate_rows
+from .models import Bank, Branch
+from .search import MATCH_CONTAINS, MATCH_PREFIX, search_branches
+from .serializers import BRANCH_DETAIL_ROW, BRANCH_LIST_ROW, BranchDetailSerializer, BranchListSerializer
+
+
+PRODUCTION_BANKS = 170
+PRODUCTION_BRANCHES = 128000
+
+SYLLABLES = [
+    'BAN', 'GAL', 'ORE', 'MUM', 'BAI', 'DEL', 'HI', 'PUN', 'CHEN', 'NAI', 'KOL', 'KA',
+    'TA', 'HYDER', 'ABAD', 'JAI', 'PUR', 'LUCK', 'NOW', 'NAG', 'SUR', 'AT', 'VAD',
+    'ODA', 'IND', 'BHO', 'PAL', 'PAT', 'NA', 'RAN', 'CHI', 'MAD', 'URAI', 'KOCH',
+    'AG', 'RA', 'MEE', 'RUT', 'NASH', 'IK', 'GUN', 'TUR', 'BEL', 'GAUM', 'SAL', 'EM',
+]
+STATES = [
+    'ANDHRA PRADESH', 'ASSAM', 'BIHAR', 'CHHATTISGARH', 'DELHI', 'GOA', 'GUJARAT',
+    'HARYANA', 'HIMACHAL PRADESH', 'JHARKHAND', 'KARNATAKA', 'KERALA', 'MADHYA PRADESH',
+    'MAHARASHTRA', 'ODISHA', 'PUNJAB', 'RAJASTHAN', 'TAMIL NADU', 'TELANGANA',
+    'UTTAR PRADESH', 'UTTARAKHAND', 'WEST BENGAL',
+]
+
+
+def _name(rng, parts):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(parts))
+
+
+def generate_rows(banks=PRODUCTION_BANKS, branches=PRODUCTION_BRANCHES, seed=0):
+    """
+    Yield ``branches`` CSV-shaped rows spread over ``banks`` banks.
+
+    The output is deterministic for a given seed. Bank sizes are skewed the
+    way the real dataset is, so a few banks own most of the branches.
+    """
+    rng = random.Random(seed)
+    districts = [(rng.choice(STATES), _name(rng, 2)) for _ in range(700)]
+    cities = [(state, district, _name(rng, rng.randint(2, 3)))
+              for state, district in districts for _ in range(6)]
+    bank_names = [f'{_name(rng, 2)} BANK LIMITED'[:49] for _ in range(banks)]
+    weights = [1 / (rank + 1) for rank in range(banks)]
+    codes = [f'{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}B' for i in range(banks)]
+    counters = [0] * banks
+
+    for bank in rng.choices(range(banks), weights=weights, k=branches):
+        counters[bank] += 1
+        state, district, city = rng.choice(cities)
+        name = f'{city} {rng.choice(["MAIN", "BAZAR", "ROAD", "NAGAR", "CHOWK", "CAMP"])}'
+        yield {
+            'ifsc': f'{codes[bank]}0{counters[bank]:06d}',
+            'bank_id': str(bank + 1),
+            'branch': name[:74],
+            'address': f'{rng.randint(1, 999)} {name}, {district}, {state}'[:195],
+            'city': city[:50],
+            'district': district[:50],
+            'state': state,
+            'bank_name': bank_names[bank],
+        }
+
+
+class SyntheticGazetteer:
+    """
+    Made-up coordinates in India for any place: states are spread over the
+    country, districts around their state and cities around their district.
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._places = {}
+
+    def _offset(self, key, spread):
+        if key not in self._places:
+            rng = random.Random(f'{self.seed}:{key}')
+            self._places[key] = (rng.uniform(-spread, spread), rng.uniform(-spread, spread))
+        return self._places[key]
+
+    def locate(self, city, district, state):
+        state_lat, state_lon = self._offset(state, 1)
+        district_lat, district_lon = self._offset((state, district), 1.5)
+        city_lat, city_lon = self._offset((state, district, city), 0.3)
+        # Around the middle of India, roughly 8-36 N and 69-97 E.
+        return (
+            round(22 + 12 * state_lat + district_lat + city_lat, 4),
+            round(83 + 12 * state_lon + district_lon + city_lon, 4),
+        )
+
+
+def load_synthetic(banks=PRODUCTION_BANKS, branches=PRODUCTION_BRANCHES, seed=0, using=DEFAULT_DB_ALIAS):
+    """
+    Replace the tables with a synthetic dataset, located by a SyntheticGazetteer,
+    rebuild the facets from it and return the IngestResult.
+    """
+    rows = validate_rows(enumerate(generate_rows(banks, branches, seed), start=2))
+    result = CSVIngestor(using=using, gazetteer=SyntheticGazetteer(seed)).ingest(rows)
+    facets.rebuild_facets(using)
+    return result
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+class Timing:
+    """
+    Latency samples, in seconds, for one benchmark case.
+
+    ``elapsed`` is the wall time of a concurrent run; without it the samples
+    are taken to have run one after another.
+    """
+
+    def __init__(self, name, samples, elapsed=None):
+        self.name = name
+        self.samples = sorted(samples)
+        self.elapsed = elapsed
+
+    @property
+    def mean(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    @property
+    def p50(self):
+        return percentile(self.samples, 0.50)
+
+    @property
+    def p95(self):
+        return percentile(self.samples, 0.95)
+
+    @property
+    def p99(self):
+        return percentile(self.samples, 0.99)
+
+    @property
+    def ops_per_second(self):
+        total = self.elapsed if self.elapsed is not None else sum(self.samples)
+        return len(self.samples) / total if total else 0.0
+
+    def as_dict(self):
+        return {
+            'mean': self.mean, 'p50': self.p50, 'p95': self.p95, 'p99': self.p99,
+            'ops_per_second': self.ops_per_second, 'samples': len(self.samples),
+        }
+
+
+def measure(name, func, repeat=50, warmup=3):
+    """Call ``func`` ``warmup + repeat`` times and time the last ``repeat`` calls."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return Timing(name, samples)
+
+
+SUITES = {}
+
+
+def suite(name):
+    """Register a benchmark suite: a callable taking ``repeat`` and returning Timings."""
+    def register(func):
+        SUITES[name] = func
+        return func
+    return register
+
+
+def _sample_cities(limit=5):
+    """The most common city names, which make the largest result sets."""
+    return list(
+        Branch.objects.values_list('city', flat=True)
+        .annotate(n=Count('ifsc')).order_by('-n')[:limit]
+    )
+
+
+@suite('search')
+def search_suite(repeat):
+    """City search: the old ``icontains`` scan against the indexed prefix and trigram paths."""
+    base = Branch.objects.all()
+
+    def fetch(queryset):
+        return list(queryset.values_list('ifsc', flat=True))
+
+    timings = []
+    for city in _sample_cities():
+        prefix = city[:5].lower()
+        middle = city[2:7].lower()
+        timings.append(measure(
+            f'icontains {middle!r} (before)',
+            lambda: base.filter(city__icontains=middle).exists() and fetch(base.filter(city__icontains=middle)),
+            repeat,
+        ))
+        timings.append(measure(
+            f'prefix {prefix!r}',
+            lambda: fetch(search_branches(base, {'city': prefix}, MATCH_PREFIX)),
+            repeat,
+        ))
+        timings.append(measure(
+            f'contains {middle!r}',
+            lambda: fetch(search_branches(base, {'city': middle}, MATCH_CONTAINS)),
+            repeat,
+        ))
+    return timings
+
+
+# Worker threads of the WSGI server being modelled (e.g. gunicorn --threads 8).
+WSGI_THREADS = 8
+CONCURRENCY = (1, 16, 64)
+
+
+def run_wsgi(paths, concurrency, threads=WSGI_THREADS):
+    """
+    Request ``paths`` from ``concurrency`` clients through the WSGI handler,
+    which serves at most ``threads`` requests at a time. Returns a Timing
+    whose samples include the time spent waiting for a free thread.
+    """
+    workers = threading.BoundedSemaphore(threads)
+    samples = []
+
+    def client_loop(chunk):
+        client = Client()
+        for path in chunk:
+            started = time.perf_counter()
+            with workers:
+                client.get(path)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client_loop, [paths[i::concurrency] for i in range(concurrency)]))
+    return Timing('', samples, time.perf_counter() - started)
+
+
+def run_asgi(paths, concurrency):
+    """Request ``paths`` from ``concurrency`` clients through the ASGI handler."""
+    samples = []
+
+    async def client_loop(chunk):
+        client = AsyncClient()
+        for path in chunk:
+            started = time.perf_counter()
+            await client.get(path)
+            samples.append(time.perf_counter() - started)
+
+    async def run():
+        await asyncio.gather(*(client_loop(paths[i::concurrency]) for i in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return Timing('', samples, time.perf_counter() - started)
+
+
+@suite('asgi')
+def asgi_suite(repeat):
+    """
+    Sync DRF views under WSGI against the async views under ASGI, with a
+    growing number of concurrent clients. Branch lookups start from a cold
+    IFSC cache so that every request reaches the database, except for the
+    cached case, which only requests codes already in the cache.
+    """
+    ifscs = list(Branch.objects.order_by('?').values_list('ifsc', flat=True)[:repeat * 4])
+    prefixes = [city[:5].lower() for city in _sample_cities()]
+    cases = [
+        ('branch detail', '/api/branches/{}/', '/api/async/branches/{}/', ifscs, False),
+        ('cached branch detail', '/api/branches/{}/', '/api/async/branches/{}/', ifscs[:repeat], True),
+        ('city search', '/api/branches/search/?city={}', '/api/async/branches/search/?city={}', prefixes, False),
+    ]
+
+    timings = []
+    for label, sync_path, async_path, values, warm in cases:
+        for concurrency in CONCURRENCY:
+            count = max(repeat * 4, concurrency)
+            values = (values * (count // len(values) + 1))[:count]
+            for server, path, run in (
+                ('wsgi', sync_path, run_wsgi),
+                ('asgi', async_path, run_asgi),
+            ):
+                branch_cache.clear()
+                paths = [path.format(value) for value in values]
+                if warm:
+                    run(sorted(set(paths)), 1)
+                timing = run(paths, concurrency)
+                timing.name = f'{label} {server} c={concurrency}'
+                timings.append(timing)
+    return timings
+
+
+@suite('snapshot')
+def snapshot_suite(repeat):
+    """Building the in-memory snapshot, and reads from it against the database path."""
+    current = None
+
+    def build():
+        nonlocal current
+        current = snapshot.Snapshot()
+
+    timings = [measure('build snapshot', build, repeat=1, warmup=0)]
+    stats = current.stats()
+    timings[0].name = f'build ({stats["bytes_per_branch"]} B/branch)'
+
+    ifscs = list(Branch.objects.order_by('?').values_list('ifsc', flat=True)[:repeat])
+    codes = iter(ifscs * 4)
+    queryset = Branch.objects.select_related('bank')
+    timings.append(measure(
+        'branch detail, database',
+        lambda: BranchDetailSerializer(queryset.get(ifsc=next(codes))).data,
+        repeat,
+    ))
+    timings.append(measure(
+        'branch detail, snapshot',
+        lambda: current.branch_payload(next(codes)),
+        repeat,
+    ))
+    for city in _sample_cities(3):
+        prefix = city[:5].lower()
+        timings.append(measure(
+            f'search {prefix!r}, database',
+            lambda: BranchListSerializer(search_branches(queryset, {'city': prefix}), many=True).data,
+            repeat,
+        ))
+        timings.append(measure(
+            f'search {prefix!r}, snapshot',
+            lambda: current.search({'city': prefix}),
+            repeat,
+        ))
+    return timings
+
+
+def per_row(timing, rows):
+    """Rescale a Timing of calls that each handle ``rows`` rows to per-row figures."""
+    return Timing(timing.name, [sample / rows for sample in timing.samples])
+
+
+@suite('serializers')
+def serializers_suite(repeat):
+    """
+    BranchListSerializer and BranchDetailSerializer against the row serializers
+    that mirror them, in rows per second. Rows are fetched once, so only
+    serialization is timed.
+    """
+    timings = []
+    for rows in (20, 1000):
+        instances = list(Branch.objects.select_related('bank').order_by('ifsc')[:rows])
+        values = list(BRANCH_DETAIL_ROW.values(Branch.objects.order_by('ifsc'))[:rows])
+        list_values = list(BRANCH_LIST_ROW.values(Branch.objects.order_by('ifsc'))[:rows])
+        for label, serialize in (
+            ('list, ModelSerializer', lambda: BranchListSerializer(instances, many=True).data),
+            ('list, row serializer', lambda: BRANCH_LIST_ROW.serialize(list_values)),
+            ('detail, ModelSerializer', lambda: BranchDetailSerializer(instances, many=True).data),
+            ('detail, row serializer', lambda: BRANCH_DETAIL_ROW.serialize(values)),
+        ):
+            timings.append(per_row(measure(f'{label} x{rows} (per row)', serialize, repeat), rows))
+    return timings
+
+
+@suite('renderers')
+def renderers_suite(repeat):
+    """
+    Encoding a 20-row list page and a search-by-city response with DRF's
+    JSONRenderer, FastJSONRenderer on each backend, and from cached Fragments.
+    """
+    page_rows = BRANCH_LIST_ROW.serialize(BRANCH_LIST_ROW.values(Branch.objects.all()[:20]))
+    city = _sample_cities(1)[0]
+    search_rows = BRANCH_LIST_ROW.serialize(BRANCH_LIST_ROW.values(Branch.objects.filter(city=city)))
+    payloads = [
+        ('page', lambda rows: {'count': PRODUCTION_BRANCHES, 'next': 'http://testserver/api/branches/?page=2',
+                               'previous': None, 'results': rows}, page_rows),
+        (f'search x{len(search_rows)}', lambda rows: {'branches': rows}, search_rows),
+    ]
+    encoders = [('stdlib', renderers.encode_stdlib)]
+    if renderers.orjson is not None:
+        encoders.append(('orjson', renderers.encode_orjson))
+
+    timings = []
+    for label, wrap, rows in payloads:
+        data = wrap(rows)
+        timings.append(measure(f'{label}, JSONRenderer', lambda: JSONRenderer().render(data), repeat))
+        for name, encode in encoders:
+            timings.append(measure(f'{label}, {name}', lambda: renderers.assemble(data, encode), repeat))
+        fragments = wrap(renderers.FragmentList(renderers.Fragment(row) for row in rows))
+        timings.append(measure(f'{label}, fragments', lambda: renderers.assemble(fragments), repeat))
+    return timings
+
+
+def endpoint_cases():
+    """
+    Requests covering every URL in banks.urls, as ``(url name, label, method,
+    paths, data)``. Requests cycle through ``paths``, so branch lookups are
+    spread over many IFSC codes.
+    """
+    bank_id = (
+        Branch.objects.values('bank_id').annotate(n=Count('ifsc')).order_by('-n')
+        .values_list('bank_id', flat=True)[0]
+    )
+    ifscs = list(Branch.objects.order_by('?').values_list('ifsc', flat=True)[:200])
+    city = _sample_cities(1)[0]
+    state, district, lat, lon = Branch.objects.filter(city=city).values_list(
+        'state', 'district', 'latitude', 'longitude',
+    )[0]
+    if lat is None:
+        lat, lon = 20.5937, 78.9629
+    prefix = quote(city[:5].lower())
+    middle_page = max(1, Branch.objects.count() // settings.REST_FRAMEWORK['PAGE_SIZE'] // 2)
+
+    def url(name, query='', **kwargs):
+        return reverse(name, kwargs=kwargs) + (f'?{query}' if query else '')
+
+    return [
+        ('api-overview', 'overview', 'get', [url('api-overview')], None),
+        ('bank-list', 'bank list', 'get', [url('bank-list')], None),
+        ('bank-detail', 'bank detail', 'get', [url('bank-detail', id=bank_id)], None),
+        ('bank-branches', 'bank branches', 'get', [url('bank-branches', bank_id=bank_id)], None),
+        ('bank-summary', 'bank summary', 'get', [url('bank-summary', id=bank_id)], None),
+        ('bank-by-code', 'bank by code', 'get', [url('bank-by-code', code=ifsc[:4]) for ifsc in ifscs], None),
+        ('branch-list', 'branch list', 'get', [url('branch-list')], None),
+        ('branch-list', 'branch list middle page', 'get', [url('branch-list', f'page={middle_page}')], None),
+        ('branch-list', 'branch list cursor', 'get', [url('branch-list', 'pagination=cursor')], None),
+        ('branch-list', 'branch list bank in state', 'get',
+         [url('branch-list', f'bank={bank_id}&state={quote(state)}&ordering=city')], None),
+        ('branch-list', 'branch list city', 'get',
+         [url('branch-list', f'state={quote(state)}&district={quote(district)}&city={quote(city)}')], None),
+        ('branch-list', 'branch list ifsc prefix', 'get',
+         [url('branch-list', f'ifsc_prefix={ifscs[0][:5]}&pagination=cursor')], None),
+        ('branch-detail', 'branch detail', 'get', [url('branch-detail', ifsc=ifsc) for ifsc in ifscs], None),
+        ('branch-search', 'search ifsc', 'get', [url('branch-search', f'ifsc={ifsc}') for ifsc in ifscs], None),
+        ('branch-search', 'search city prefix', 'get', [url('branch-search', f'city={prefix}')], None),
+        ('branch-search', 'search city contains', 'get',
+         [url('branch-search', f'city={quote(city[2:7].lower())}&match=contains')], None),
+        ('branch-export', 'export bank in state', 'get',
+         [url('branch-export', f'bank={bank_id}&state={quote(state)}&format=csv')], None),
+        ('branch-batch', 'batch lookup x100', 'post', [url('branch-batch')], {'ifsc': ifscs[:100]}),
+        ('branch-nearby', 'nearby 10', 'get', [url('branch-nearby', f'lat={lat}&lon={lon}')], None),
+        ('branch-nearby', 'nearby within 25 km', 'get',
+         [url('branch-nearby', f'lat={lat}&lon={lon}&radius_km=25&limit=100')], None),
+        ('facet-banks', 'facets banks', 'get', [url('facet-banks')], None),
+        ('facet-states', 'facets states', 'get', [url('facet-states')], None),
+        ('facet-districts', 'facets districts', 'get', [url('facet-districts', f'state={quote(state)}')], None),
+        ('facet-cities', 'facets cities', 'get',
+         [url('facet-cities', f'state={quote(state)}&district={quote(district)}')], None),
+        ('autocomplete', 'autocomplete city', 'get', [url('autocomplete', f'q={prefix}')], None),
+        ('cache-stats', 'cache stats', 'get', [url('cache-stats')], None),
+        ('snapshot-stats', 'snapshot stats', 'get', [url('snapshot-stats')], None),
+        ('request-metrics', 'metrics', 'get', [url('request-metrics')], None),
+        ('async-bank-list', 'async bank list', 'get', [url('async-bank-list')], None),
+        ('async-bank-detail', 'async bank detail', 'get', [url('async-bank-detail', id=bank_id)], None),
+        ('async-branch-search', 'async search city prefix', 'get',
+         [url('async-branch-search', f'city={prefix}')], None),
+        ('async-branch-detail', 'async branch detail', 'get',
+         [url('async-branch-detail', ifsc=ifsc) for ifsc in ifscs], None),
+    ]
+
+
+@suite('endpoints')
+def endpoints_suite(repeat):
+    """
+    Every endpoint in banks.urls through the Django test client, including
+    middleware and rendering. Caches are cleared before each case, so the
+    first calls are cold; warmup calls are not timed.
+    """
+    client = Client()
+    timings = []
+    # The operations endpoints are timed as an anonymous client.
+    with override_settings(BANKS_OPERATIONS={'PUBLIC': True}):
+        for name, label, method, paths, data in endpoint_cases():
+            requests = itertools.cycle(paths)
+            request = getattr(client, method)
+
+            def call():
+                response = (
+                    request(next(requests), data, content_type='application/json') if data
+                    else request(next(requests))
+                )
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{label}: HTTP {response.status_code}')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+
+            branch_cache.clear()
+            fragment_cache.clear()
+            timings.append(measure(label, call, repeat))
+    return timings
+
+
+# Each full load replaces the whole dataset, so the loader cases run fewer times.
+LOADER_REPEAT = 3
+# Processes that parse and validate the CSV in the parallel loader cases
+LOADER_WORKERS = 4
+
+
+def dataset_rows():
+    """The current branches as CSV rows, in IFSC order."""
+    rows = list(Branch.objects.order_by('ifsc').values(*BRANCH_FIELDS, 'bank_id', 'bank__name'))
+    for row in rows:
+        row['bank_name'] = row.pop('bank__name')
+    return rows
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@suite('loaders')
+def loaders_suite(repeat):
+    """
+    The data load commands against CSV files of the synthetic dataset: a full
+    load, refreshes with no changes and with 1% of rows changed, a facet
+    rebuild and the sample data. Parsing and validating the file alone is
+    timed in this process and in LOADER_WORKERS processes, which gains only
+    as far as there are idle CPUs. Ends with a full load, so later suites see
+    the same data.
+    """
+    repeat = min(repeat, LOADER_REPEAT)
+    rows = dataset_rows()
+
+    def changed(row, index):
+        return {**row, 'address': f'{row["address"]} (moved)'[:195]} if index % 100 == 0 else row
+
+    def command(*args, **options):
+        return lambda: call_command(*args, stdout=StringIO(), **options)
+
+    with tempfile.TemporaryDirectory() as directory:
+        original = os.path.join(directory, 'original.csv')
+        modified = os.path.join(directory, 'modified.csv')
+        rejects = os.path.join(directory, 'rejects.csv')
+        write_csv(original, rows)
+        write_csv(modified, (changed(row, index) for index, row in enumerate(rows)))
+        # Alternate between the files, so that every refresh changes 1% of rows.
+        files = itertools.cycle([modified, original])
+
+        full_load = command('load_real_data', file=original, rejects=rejects)
+        timings = [
+            measure('refresh, no changes', command('load_real_data', file=original, rejects=rejects, refresh=True),
+                    repeat, warmup=0),
+            measure('refresh, 1% changed', lambda: call_command(
+                'load_real_data', file=next(files), rejects=rejects, refresh=True, stdout=StringIO(),
+            ), repeat * 2, warmup=0),
+            measure('rebuild_facets', command('rebuild_facets'), repeat, warmup=0),
+            measure('init_data', command('init_data'), repeat, warmup=0),
+            measure('validate, in process', lambda: deque(validate_file(original), maxlen=0), repeat, warmup=0),
+            measure(f'validate, {LOADER_WORKERS} workers', lambda: deque(
+                ParallelValidator(LOADER_WORKERS).validate(original), maxlen=0,
+            ), repeat, warmup=0),
+            measure(f'full load x{len(rows)}, {LOADER_WORKERS} workers', command(
+                'load_real_data', file=original, rejects=rejects, workers=LOADER_WORKERS,
+            ), repeat, warmup=0),
+            measure(f'full load x{len(rows)}', full_load, repeat, warmup=0),
+        ]
+    return timings
+
+
+@suite('pack')
+def pack_suite(repeat):
+    """
+    Cold start from a pack file against the CSV and the database: exporting
+    the pack, restoring the tables from it against a full CSV load, and
+    building the in-memory snapshot from it against the database. Opening
+    the pack is timed with and without checking its checksums. Restores the
+    data it started with, so later suites see the same data.
+    """
+    repeat = min(repeat, LOADER_REPEAT)
+    rows = dataset_rows()
+
+    def command(*args, **options):
+        return lambda: call_command(*args, stdout=StringIO(), **options)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'banks.pack')
+        original = os.path.join(directory, 'original.csv')
+        write_csv(original, rows)
+        timings = [measure('export_pack', command('export_pack', file=path), repeat, warmup=0)]
+        timings[0].name = (
+            f'export_pack ({os.path.getsize(path) / 2 ** 20:.1f} MiB, CSV {os.path.getsize(original) / 2 ** 20:.1f} MiB)'
+        )
+        timings += [
+            measure('open, verified', lambda: pack.Pack(path).close(), repeat),
+            measure('open, not verified', lambda: pack.Pack(path, verify=False).close(), repeat),
+            measure(f'load_real_data x{len(rows)}', command(
+                'load_real_data', file=original, rejects=os.path.join(directory, 'rejects.csv'),
+            ), repeat, warmup=0),
+            measure(f'load_pack x{len(rows)}', command('load_pack', file=path), repeat, warmup=0),
+            measure('snapshot, database', snapshot.Snapshot, repeat, warmup=0),
+        ]
+
+        def snapshot_from_pack():
+            with pack.Pack(path) as opened:
+                return snapshot.Snapshot(pack=opened)
+
+        timings.append(measure('snapshot, pack', snapshot_from_pack, repeat, warmup=0))
+        with pack.Pack(path) as opened:
+            ifscs = itertools.cycle([row['ifsc'] for row in rows[::max(1, len(rows) // 1000)]])
+            timings.append(measure('find in mapped pack', lambda: opened.find(next(ifscs)), repeat))
+    return timings
+
+
+# Reader threads of a serving process (e.g. gunicorn --threads 4)
+SQLITE_READERS = 4
+# Seconds the readers run with no load, for comparison
+SQLITE_IDLE = 1.0
+
+
+def read_during(alias, load, ifscs, readers=SQLITE_READERS):
+    """
+    Look up ``ifscs`` on ``alias`` from ``readers`` threads for as long as
+    ``load()`` runs. Returns Timings of the lookups and of the load. A lookup
+    that gives up on a locked database is timed like any other.
+    """
+    done = threading.Event()
+    samples = []
+
+    def reader(chunk):
+        try:
+            for ifsc in itertools.cycle(chunk):
+                if done.is_set():
+                    break
+                started = time.perf_counter()
+                try:
+                    list(Branch.objects.using(alias).filter(ifsc=ifsc).values_list('branch', 'city'))
+                except OperationalError:
+                    pass
+                samples.append(time.perf_counter() - started)
+        finally:
+            connections[alias].close()
+
+    with ThreadPoolExecutor(max_workers=readers) as executor:
+        futures = [executor.submit(reader, ifscs[i::readers]) for i in range(readers)]
+        started = time.perf_counter()
+        try:
+            load()
+        finally:
+            elapsed = time.perf_counter() - started
+            done.set()
+        for future in futures:
+            future.result()
+    return Timing('reads', samples, elapsed), Timing('load', [elapsed])
+
+
+@suite('sqlite')
+def sqlite_suite(repeat):
+    """
+    Branch lookups from SQLITE_READERS threads on a SQLite file while the
+    whole dataset is reloaded: in place with SQLite's default rollback
+    journal, in place with the WAL profile of banks.sqlite, and into a copy
+    that is swapped in. Readers with a rollback journal wait for every batch
+    the load commits; with WAL they only share the CPU with it.
+    """
+    rows = dataset_rows()
+    ifscs = [row['ifsc'] for row in rows[::max(1, len(rows) // 1000)]]
+    rollback = {'journal_mode': 'delete'}
+
+    def ingest(using):
+        return CSVIngestor(using=using).ingest(validate_rows(enumerate(rows, start=2)))
+
+    cases = [
+        ('idle', sqlite.DEFAULT_PRAGMAS, lambda alias: time.sleep(SQLITE_IDLE)),
+        ('rollback journal, in place', rollback, ingest),
+        ('wal, in place', sqlite.DEFAULT_PRAGMAS, ingest),
+        ('wal, swap', sqlite.DEFAULT_PRAGMAS, lambda alias: sqlite.swap_load(ingest, using=alias)),
+    ]
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        with sqlite.database_alias('bench_sqlite', os.path.join(directory, 'bench.sqlite3')) as alias:
+            call_command('migrate', database=alias, verbosity=0)
+            ingest(alias)
+            for label, pragmas, load in cases:
+                with override_settings(BANKS_SQLITE={'PRAGMAS': pragmas}):
+                    # Reconnect, so the case's pragmas (and journal mode) apply.
+                    connections[alias].close()
+                    connections[alias].ensure_connection()
+                    reads, load_timing = read_during(alias, lambda: load(alias), ifscs)
+                reads.name = f'{label}: reads'
+                timings.append(reads)
+                if label != 'idle':
+                    load_timing.name = f'{label}: load'
+                    timings.append(load_timing)
+    return timings
+
+
+def results_dict(results):
+    """``{suite: {case: figures}}`` from ``{suite: [Timing]}``."""
+    return {name: {timing.name: timing.as_dict() for timing in timings} for name, timings in results.items()}
+
+
+def save_baseline(path, results, **meta):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'meta': meta, 'results': results_dict(results)}, file, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+class Regression:
+    """A case whose ``metric`` got slower than the baseline allows."""
+
+    def __init__(self, suite, case, metric, before, after):
+        self.suite = suite
+        self.case = case
+        self.metric = metric
+        self.before = before
+        self.after = after
+
+    @property
+    def change(self):
+        return self.after / self.before - 1 if self.before else float('inf')
+
+    def __str__(self):
+        return (
+            f'{self.suite}: {self.case}: {self.metric} {self.before * 1000:.3f} ms -> '
+            f'{self.after * 1000:.3f} ms ({self.change:+.0%})'
+        )
+
+
+def compare(baseline, results, metric='p95', tolerance=0.25, min_delta=0.0005):
+    """
+    Return the Regressions of ``results`` against a saved ``baseline``: cases
+    whose ``metric`` latency grew by more than ``tolerance`` and by more than
+    ``min_delta`` seconds, which keeps sub-millisecond noise from failing a
+    run. Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, cases in results_dict(results).items():
+        saved = baseline['results'].get(name, {})
+        for case, figures in cases.items():
+            if case not in saved:
+                continue
+            before, after = saved[case][metric], figures[metric]
+            if after > before * (1 + tolerance) and after - before > min_delta:
+                regressions.append(Regression(name, case, metric, before, after))
+    return regressions
+
+
+def _typo(word):
+    # Drops a letter from the middle, the most common typo.
+    middle = len(word) // 2
+    return word[:middle] + word[middle + 1:]
+
+
+@suite('autocomplete')
+def autocomplete_suite(repeat):
+    """
+    Building the autocomplete index, then lookups as a name is typed one key
+    at a time, with a typo, and with a bank and city together.
+    """
+    index = None
+
+    def build():
+        nonlocal index
+        index = autocomplete.build()
+
+    timings = [measure(f'build ({Branch.objects.count()} branches)', build, repeat=1, warmup=0)]
+    city = _sample_cities(1)[0].lower()
+    bank = Bank.objects.order_by('id').values_list('name', flat=True)[0].split()[0].lower()
+    for length in range(1, len(city) + 1):
+        timings.append(measure(f'keystroke {city[:length]!r}', lambda: index.search(city[:length]), repeat))
+    for query in (_typo(city), f'{bank} {city[:4]}', f'{_typo(bank)} {city[:4]}'):
+        timings.append(measure(repr(query), lambda: index.search(query), repeat))
+    return timings
+
+
+# Timed calls of the haversine scan, which reads every branch
+GEO_SCAN_REPEAT = 10
+
+
+def nearest_scan(rows, lat, lon, limit=10, radius_km=None):
+    """IFSCs of the ``limit`` branches nearest to ``(lat, lon)``, by a haversine scan of ``(ifsc, lat, lon)`` rows."""
+    distances = ((geo.haversine(lat, lon, row_lat, row_lon), ifsc) for ifsc, row_lat, row_lon in rows)
+    if radius_km is not None:
+        distances = (item for item in distances if item[0] <= radius_km)
+    return [ifsc for _, ifsc in heapq.nsmallest(limit, distances)]
+
+
+@suite('geo')
+def geo_suite(repeat):
+    """
+    Building the GeoIndex and nearest-10 and within-25-km queries on it,
+    against a haversine scan of every branch. The dataset has one point per
+    city, as a city gazetteer gives; the index is also built and queried
+    with every branch at its own point.
+    """
+    if not Branch.objects.exclude(latitude=None).exists():
+        CSVIngestor(gazetteer=SyntheticGazetteer()).ingest(validate_rows(enumerate(dataset_rows(), start=2)))
+    rows = list(Branch.objects.order_by('ifsc').values_list(
+        'ifsc', 'branch', 'city', 'district', 'state', 'bank_id', 'latitude', 'longitude',
+    ))
+    bank_names = dict(Bank.objects.values_list('id', 'name'))
+    rng = random.Random(0)
+    spread = [
+        (*row[:6], round(row[6] + rng.uniform(-0.05, 0.05), 5), round(row[7] + rng.uniform(-0.05, 0.05), 5))
+        for row in rows
+    ]
+    queries = itertools.cycle([(row[6] + 0.01, row[7] - 0.01) for row in rng.sample(rows, min(len(rows), 100))])
+    points = [(ifsc, lat, lon) for ifsc, *_, lat, lon in rows]
+    version = (0, None)
+    timings = []
+    for label, data in (('city points', rows), ('branch points', spread)):
+        index = None
+
+        def build():
+            nonlocal index
+            index = geo.GeoIndex(version, data, bank_names)
+
+        timing = measure('build', build, repeat=1, warmup=0)
+        timing.name = f'{label}: build ({len(index.points)} points)'
+        timings.append(timing)
+        timings.append(measure(f'{label}: nearest 10', lambda: index.nearest(*next(queries), 10), repeat))
+        timings.append(measure(
+            f'{label}: within 25 km', lambda: index.nearest(*next(queries), geo.MAX_LIMIT, 25), repeat,
+        ))
+    scan_repeat = min(repeat, GEO_SCAN_REPEAT)
+    timings.append(measure('scan: nearest 10', lambda: nearest_scan(points, *next(queries)), scan_repeat, warmup=1))
+    return timings
@@ -0,0 +1,242 @@
+"""
+In-process read-through cache for branch lookups by IFSC.
+
+BranchDetailSerializer payloads, rendered from rows by BRANCH_DETAIL_ROW,
+are kept in a bounded LRU with a TTL, keyed by the normalized IFSC. Unknown
+codes are cached as well so that repeated lookups of bad codes do not reach
+the database. Codes that are not structured like an IFSC never get here
+(see banks.conditional.request_branch_payload), so scanner traffic cannot
+evict real entries. A second LRU keeps the encoded rows of list pages.
+Payloads are cached as Fragments, so they are encoded to JSON only once.
+Entries are dropped by the model signals and the data load commands (see
+banks.signals) in the process that made the change, and in every other
+process by the first request that sees the dataset version it bumped.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+from . import snapshot
+from .models import Bank, Branch
+from .renderers import Fragment, FragmentList
+from .serializers import BANK_ROW, BRANCH_DETAIL_ROW
+from .validators import normalize_ifsc
+
+
+MISSING = object()
+
+# Kinds of fragment_cache entries, keyed by (kind, primary key).
+BRANCH_LIST_FRAGMENT = 'branch-list'
+BANK_FRAGMENT = 'bank'
+
+# Codes per ``ifsc__in`` query, below SQLite's 999 variables before 3.32.
+LOOKUP_CHUNK_SIZE = 500
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and hit/miss counters.
+
+    ``version`` is the dataset version (see banks.conditional.request_version)
+    the entries were cached under; observe() drops them all once a newer one
+    is seen, which is how writes made by other processes reach this one.
+    Lookups that need no version of their own re-check it when check_due()
+    says ``check_interval`` seconds have passed since the last observe().
+    """
+
+    def __init__(self, max_size=10000, ttl=3600, check_interval=1):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.version = None
+        self.observed_at = 0.0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for ``key``, or MISSING."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.version = None
+
+    def observe(self, version):
+        """Record the dataset ``version`` of a request, clearing the cache if it is newer."""
+        self.observed_at = time.monotonic()
+        # Only newer: replicas that lag behind must not make the cache thrash.
+        if self.version is not None and version[0] <= self.version[0]:
+            return
+        with self._lock:
+            if self.version is not None:
+                if version[0] <= self.version[0]:
+                    return
+                self._data.clear()
+            self.version = version
+
+    def check_due(self):
+        return self.version is None or time.monotonic() - self.observed_at >= self.check_interval
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+_config = getattr(settings, 'BANKS_IFSC_CACHE', {})
+branch_cache = LRUCache(
+    max_size=_config.get('MAX_SIZE', 10000),
+    ttl=_config.get('TTL', 3600),
+    check_interval=_config.get('CHECK_INTERVAL', 1),
+)
+
+
+_config = getattr(settings, 'BANKS_FRAGMENT_CACHE', {})
+fragment_cache = LRUCache(
+    max_size=_config.get('MAX_SIZE', 10000),
+    ttl=_config.get('TTL', 3600),
+)
+
+
+def get_fragments(kind, key, rows, row_serializer):
+    """
+    Render ``.values()`` rows with ``row_serializer`` as a FragmentList,
+    reusing the Fragments cached under ``(kind, row[key])``.
+    """
+    tzinfo = timezone.get_current_timezone()
+    fragments = FragmentList()
+    for row in rows:
+        cache_key = (kind, row[key])
+        fragment = fragment_cache.get(cache_key)
+        if fragment is MISSING:
+            fragment = Fragment(row_serializer.to_representation(row, tzinfo))
+            fragment_cache.set(cache_key, fragment)
+        fragments.append(fragment)
+    return fragments
+
+
+def get_bank_payload(bank_id):
+    """Return the BankSerializer payload for ``bank_id``, or None."""
+    current = snapshot.get_snapshot()
+    if current is not None:
+        return current.bank_payload(bank_id)
+    payload = fragment_cache.get((BANK_FRAGMENT, bank_id))
+    if payload is MISSING:
+        rows = BANK_ROW.values(Bank.objects.filter(id=bank_id))
+        payload = next(iter(get_fragments(BANK_FRAGMENT, 'id', rows, BANK_ROW)), None)
+    return payload
+
+
+async def aget_bank_payload(bank_id):
+    """
+    Async version of get_bank_payload for async views.
+
+    Cache operations only hold the lock for a dictionary update, so they run
+    directly on the event loop; a miss awaits the async ORM.
+    """
+    current = await snapshot.aget_snapshot()
+    if current is not None:
+        return current.bank_payload(bank_id)
+    payload = fragment_cache.get((BANK_FRAGMENT, bank_id))
+    if payload is MISSING:
+        row = await BANK_ROW.values(Bank.objects.filter(id=bank_id)).afirst()
+        payload = next(iter(get_fragments(BANK_FRAGMENT, 'id', [row] if row else [], BANK_ROW)), None)
+    return payload
+
+
+def get_branch_payload(ifsc):
+    """
+    Return the BranchDetailSerializer payload for ``ifsc``, or None if no
+    branch has that code. Answered from the snapshot when it is enabled.
+    """
+    key = normalize_ifsc(ifsc)
+    current = snapshot.get_snapshot()
+    if current is not None:
+        return current.branch_payload(key)
+    payload = branch_cache.get(key)
+    if payload is MISSING:
+        row = BRANCH_DETAIL_ROW.values(Branch.objects.filter(ifsc=key)).first()
+        payload = Fragment(BRANCH_DETAIL_ROW.to_representation(row)) if row is not None else None
+        branch_cache.set(key, payload)
+    return payload
+
+
+async def aget_branch_payload(ifsc):
+    """Async version of get_branch_payload for async views, like aget_bank_payload."""
+    key = normalize_ifsc(ifsc)
+    current = await snapshot.aget_snapshot()
+    if current is not None:
+        return current.branch_payload(key)
+    payload = branch_cache.get(key)
+    if payload is MISSING:
+        row = await BRANCH_DETAIL_ROW.values(Branch.objects.filter(ifsc=key)).afirst()
+        payload = Fragment(BRANCH_DETAIL_ROW.to_representation(row)) if row is not None else None
+        branch_cache.set(key, payload)
+    return payload
+
+
+def get_branch_payloads(codes):
+    """
+    Return ``{code: payload or None}`` for normalized IFSC ``codes``.
+
+    Cached codes are answered from the cache; the rest are fetched with
+    ``ifsc__in`` queries of LOOKUP_CHUNK_SIZE codes and cached, including
+    the ones not found.
+    """
+    current = snapshot.get_snapshot()
+    if current is not None:
+        return {code: current.branch_payload(code) for code in codes}
+    payloads = {}
+    misses = []
+    for code in codes:
+        payload = branch_cache.get(code)
+        if payload is MISSING:
+            misses.append(code)
+        else:
+            payloads[code] = payload
+    for start in range(0, len(misses), LOOKUP_CHUNK_SIZE):
+        chunk = misses[start:start + LOOKUP_CHUNK_SIZE]
+        rows = BRANCH_DETAIL_ROW.values(Branch.objects.filter(ifsc__in=chunk).order_by())
+        found = {item['ifsc']: Fragment(item) for item in BRANCH_DETAIL_ROW.serialize(rows)}
+        for code in chunk:
+            payloads[code] = found.get(code)
+            branch_cache.set(code, payloads[code])
+    return payloads
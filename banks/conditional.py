@@ -0,0 +1,319 @@
+"""
+HTTP validators and cache headers for the read endpoints.
+
+Responses that depend on many rows (lists, search, facets, summaries) are
+validated by the global DatasetVersion, which the load commands and model
+signals bump after every committed change. Detail responses are validated
+by the ``updated_at`` of the branch and its bank. Conditional GETs are
+answered with a 304 by Django's ``condition`` decorator before the view
+runs. For the dataset-wide responses that skips the view's query and
+serializer. A detail payload has to be loaded to compute its validators,
+so request_payload() loads it once and the view reuses it. The same
+decorators apply to the async views, which load the payload or version
+on the event loop first (see async_condition).
+
+The payloads and response data a request loads through request_payload()
+and request_data() come from the shared cache (banks.shared_cache) when it
+is enabled, under the DatasetVersion of the request.
+"""
+import asyncio
+import datetime
+import hashlib
+from functools import partial, wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from . import autocomplete, facets, geo, snapshot
+from .cache import (
+    aget_bank_payload,
+    aget_branch_payload,
+    branch_cache,
+    fragment_cache,
+    get_bank_payload,
+    get_branch_payload,
+)
+from .models import DatasetVersion
+from .shared_cache import get_config as get_shared_cache_config, shared_cache
+from .validators import is_valid_ifsc, normalize_ifsc
+
+
+CACHEABLE_STATUS = (200, 304)
+
+
+_bump_callbacks = {}
+
+
+def schedule_bump(using=DEFAULT_DB_ALIAS):
+    """
+    Bump the version once the current transaction commits, at most once per
+    transaction however many rows it changes.
+    """
+    callback = _bump_callbacks.setdefault(using, partial(DatasetVersion.bump, using))
+    connection = connections[using]
+    if connection.in_atomic_block and any(entry[1] is callback for entry in connection.run_on_commit):
+        return
+    transaction.on_commit(callback, using=using)
+
+
+def _patch_public(response):
+    if response.status_code in CACHEABLE_STATUS:
+        config = getattr(settings, 'BANKS_HTTP_CACHE', {})
+        patch_cache_control(response, public=True, max_age=config.get('MAX_AGE', 60))
+    return response
+
+
+def public_cache(view):
+    """Mark successful and 304 responses as cacheable for ``BANKS_HTTP_CACHE['MAX_AGE']`` seconds."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return _patch_public(view(request, *args, **kwargs))
+    return wrapper
+
+
+def async_condition(etag_func=None, last_modified_func=None, prepare=None):
+    """
+    ``condition`` for async views; the view only runs when the request is
+    not answered with a 304 or 412. ``prepare``, a coroutine function taking
+    the view's arguments, loads what the funcs read on the event loop, and
+    the funcs then run there too. Without it they may query the database,
+    so they run in a thread.
+    """
+    def validators(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        if last_modified:
+            if not timezone.is_aware(last_modified):
+                last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+            last_modified = int(last_modified.timestamp())
+        return quote_etag(etag) if etag is not None else None, last_modified or None
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if prepare is not None:
+                await prepare(request, *args, **kwargs)
+                etag, last_modified = validators(request, *args, **kwargs)
+            else:
+                etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return _patch_public(response)
+        return wrapper
+    return decorator
+
+
+def conditional(etag_func=None, last_modified_func=None, prepare=None):
+    """
+    ``condition`` with ``public_cache``; the funcs receive the view's
+    arguments. Async views get async_condition instead, with ``prepare``.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return async_condition(etag_func, last_modified_func, prepare)(view)
+        return public_cache(condition(etag_func, last_modified_func)(view))
+    return decorator
+
+
+def request_version(request):
+    """
+    ``(version, updated_at)`` of the data a request reads, looked up once per
+    request. ``request`` may be a DRF or Django request. The in-process
+    caches are cleared when it is newer than the version they were filled
+    under, so neither a payload nor a list ETag covers stale entries.
+    """
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_dataset_version'):
+        current = snapshot.get_snapshot()
+        _set_version(request, current.version if current is not None else DatasetVersion.current())
+    return request._dataset_version
+
+
+async def arequest_version(request):
+    """Async request_version(), for async views."""
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_dataset_version'):
+        current = await snapshot.aget_snapshot()
+        _set_version(request, current.version if current is not None else await DatasetVersion.acurrent())
+    return request._dataset_version
+
+
+def _set_version(request, version):
+    request._dataset_version = version
+    branch_cache.observe(version)
+    fragment_cache.observe(version)
+
+
+def dataset_etag(request, *args, **kwargs):
+    return '"dataset-{}"'.format(request_version(request)[0])
+
+
+def dataset_last_modified(request, *args, **kwargs):
+    return request_version(request)[1]
+
+
+
+
+def payload_etag(payload):
+    """ETag of a detail payload, from its own and its bank's ``updated_at``."""
+    if payload is None:
+        return None
+    bank = payload.get('bank') or {}
+    key = f'{payload.get("ifsc", payload.get("id"))}:{payload["updated_at"]}:{bank.get("updated_at")}'
+    return '"{}"'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def payload_last_modified(payload):
+    if payload is None:
+        return None
+    bank = payload.get('bank') or {}
+    return max(parse_datetime(value) for value in (payload['updated_at'], bank.get('updated_at')) if value)
+
+
+def check_version(request):
+    """
+    Observe the dataset version before a lookup from the in-process caches,
+    when the last check is older than BANKS_IFSC_CACHE['CHECK_INTERVAL'], so
+    that changes made by other processes are seen within that interval.
+    """
+    if branch_cache.check_due():
+        request_version(request)
+
+
+async def acheck_version(request):
+    """Async check_version()."""
+    if branch_cache.check_due():
+        await arequest_version(request)
+
+
+def use_shared_cache():
+    # The snapshot answers from memory; the shared cache would only be slower.
+    return get_shared_cache_config()['ENABLED'] and snapshot.get_snapshot() is None
+
+
+async def ause_shared_cache():
+    return get_shared_cache_config()['ENABLED'] and await snapshot.aget_snapshot() is None
+
+
+def request_payload(request, loader, key):
+    """
+    ``loader(key)``, looked up once per request and shared by the
+    validators and the view. ``request`` may be a DRF or Django request.
+    """
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_payload'):
+        check_version(request)
+        if use_shared_cache():
+            request._payload = shared_cache.get_or_set(
+                loader.__name__, key, partial(loader, key), request_version(request),
+            )
+        else:
+            request._payload = loader(key)
+    return request._payload
+
+
+def request_branch_payload(request, ifsc):
+    """
+    request_payload() of get_branch_payload, or None without any lookup for a
+    code that is not structured like an IFSC. Every IFSC lookup of the read
+    endpoints goes through here.
+    """
+    if not is_valid_ifsc(normalize_ifsc(ifsc)):
+        return None
+    return request_payload(request, get_branch_payload, ifsc)
+
+
+async def arequest_payload(request, loader, aloader, key):
+    """
+    Async request_payload(), with ``aloader``, the async version of
+    ``loader``, run on the event loop. The shared cache is synchronous, so
+    with it the lookup runs in a thread.
+    """
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_payload'):
+        if await ause_shared_cache():
+            # Thread-sensitive: a miss queries the request's connection.
+            return await sync_to_async(request_payload)(request, loader, key)
+        await acheck_version(request)
+        request._payload = await aloader(key)
+    return request._payload
+
+
+async def arequest_branch_payload(request, ifsc):
+    """Async request_branch_payload()."""
+    if not is_valid_ifsc(normalize_ifsc(ifsc)):
+        return None
+    return await arequest_payload(request, get_branch_payload, aget_branch_payload, ifsc)
+
+
+def request_data(request, kind, build):
+    """
+    ``build()``, the response data of a list or search request, from the
+    shared cache when it is enabled. Keyed by the full URL, which the
+    pagination links include.
+    """
+    if not use_shared_cache():
+        return build()
+    return shared_cache.get_or_set(kind, request.build_absolute_uri(), build, request_version(request))
+
+
+def _search_validator(payload_func, dataset_func):
+    # A search by IFSC is validated like the branch it returns.
+    def validator(request):
+        ifsc = request.GET.get('ifsc')
+        if ifsc:
+            return payload_func(request_branch_payload(request, ifsc))
+        return dataset_func(request)
+    return validator
+
+
+async def _prepare_search(request):
+    ifsc = request.GET.get('ifsc')
+    if ifsc:
+        await arequest_branch_payload(request, ifsc)
+    else:
+        await arequest_version(request)
+
+
+dataset_conditional = conditional(
+    dataset_etag,
+    dataset_last_modified,
+    lambda request, *args, **kwargs: arequest_version(request),
+)
+branch_conditional = conditional(
+    lambda request, ifsc: payload_etag(request_branch_payload(request, ifsc)),
+    lambda request, ifsc: payload_last_modified(request_branch_payload(request, ifsc)),
+    arequest_branch_payload,
+)
+bank_conditional = conditional(
+    lambda request, id: payload_etag(request_payload(request, get_bank_payload, id)),
+    lambda request, id: payload_last_modified(request_payload(request, get_bank_payload, id)),
+    lambda request, id: arequest_payload(request, get_bank_payload, aget_bank_payload, id),
+)
+search_conditional = conditional(
+    _search_validator(payload_etag, dataset_etag),
+    _search_validator(payload_last_modified, dataset_last_modified),
+    _prepare_search,
+)
+facet_conditional = conditional(
+    lambda request, **kwargs: '"facets-{}"'.format(facets.get_snapshot().version[0]),
+    lambda request, **kwargs: facets.get_snapshot().version[1],
+)
+autocomplete_conditional = conditional(
+    lambda request: '"autocomplete-{}"'.format(autocomplete.get_index().version[0]),
+    lambda request: autocomplete.get_index().version[1],
+)
+geo_conditional = conditional(
+    lambda request: '"geo-{}"'.format(geo.get_index().version[0]),
+    lambda request: geo.get_index().version[1],
+)
@@ -0,0 +1,126 @@
+"""
+Streaming export of the full branch list as NDJSON or CSV.
+
+Rows are read with a server-side iterator and encoded in chunks, so memory
+use stays constant however many branches are exported.
+"""
+import csv
+import hashlib
+import json
+from django.db.models import Count, Max
+from rest_framework.renderers import BaseRenderer
+from .ingest import CSV_FIELDS
+from .models import Branch
+
+
+# The columns of bank_branches.csv, so an exported CSV can be loaded back.
+EXPORT_FIELDS = CSV_FIELDS + ['updated_at']
+EXPORT_COLUMNS = ['ifsc', 'bank_id', 'branch', 'address', 'city', 'district', 'state', 'bank__name', 'updated_at']
+CHUNK_SIZE = 2000
+
+
+def format_datetime(value):
+    """Match the ISO 8601 output of DRF's DateTimeField."""
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def export_queryset(bank_id=None, state=None, since=None):
+    """Branches to export, in IFSC order."""
+    queryset = Branch.objects.order_by('ifsc')
+    if bank_id is not None:
+        queryset = queryset.filter(bank_id=bank_id)
+    if state:
+        queryset = queryset.filter(state=state)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    return queryset
+
+
+def export_etag(queryset, fmt):
+    """
+    Return ``(etag, last_modified)`` for an export.
+
+    Both come from one aggregate query. The row count is part of the ETag so
+    that deletes, which do not move the latest ``updated_at``, still change it.
+    """
+    stats = queryset.order_by().aggregate(
+        count=Count('ifsc'),
+        branches_modified=Max('updated_at'),
+        banks_modified=Max('bank__updated_at'),
+    )
+    modified = [value for value in (stats['branches_modified'], stats['banks_modified']) if value]
+    last_modified = max(modified) if modified else None
+    key = f'{fmt}:{stats["count"]}:{stats["branches_modified"]}:{stats["banks_modified"]}'
+    return hashlib.md5(key.encode('utf-8')).hexdigest(), last_modified
+
+
+def iter_rows(queryset):
+    for row in queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=CHUNK_SIZE):
+        yield row[:-1] + (format_datetime(row[-1]),)
+
+
+def _chunked(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer.clear()
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_ndjson(queryset):
+    """Yield the export as newline-delimited JSON, one branch per line."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    return _chunked(
+        dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in iter_rows(queryset)
+    )
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    """Yield the export as CSV with a header row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS).encode('utf-8')
+    yield from _chunked(writer.writerow(row) for row in iter_rows(queryset))
+
+
+EXPORTERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Selects the NDJSON export; renders error payloads as a single JSON line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Selects the CSV export; renders error payloads as a one-row CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        writer = csv.writer(_Echo())
+        return (writer.writerow(list(data)) + writer.writerow(list(data.values()))).encode('utf-8')
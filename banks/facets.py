@@ -0,0 +1,135 @@
+"""
+Precomputed facets: branch counts per bank, state, district and city, and
+per bank code (the first four characters of an IFSC) and bank.
+
+The ``facets`` table is rebuilt from the branches table after every data
+load. Reads are answered from an in-memory FacetSnapshot of that table, so
+building a dropdown or finding the bank of a code never scans the branches
+table.
+"""
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from django.db.models.functions import Substr
+from .models import Bank, Branch, DatasetVersion, Facet
+from .validators import is_valid_bank_code
+
+
+def rebuild_facets(using=DEFAULT_DB_ALIAS):
+    """Recompute the facets table from the bank and branch tables."""
+    branches = Branch.objects.using(using).order_by()
+    facets = [
+        Facet(kind=Facet.BANK, bank_id=bank_id, name=name, branch_count=count)
+        for bank_id, name, count in Bank.objects.using(using).order_by()
+        .annotate(n=Count('branches')).values_list('id', 'name', 'n')
+    ]
+    facets += [
+        Facet(kind=Facet.STATE, state=state, branch_count=count)
+        for state, count in branches.values_list('state').annotate(n=Count('ifsc'))
+    ]
+    facets += [
+        Facet(kind=Facet.DISTRICT, state=state, district=district, branch_count=count)
+        for state, district, count in branches.values_list('state', 'district').annotate(n=Count('ifsc'))
+    ]
+    facets += [
+        Facet(kind=Facet.CITY, state=state, district=district, city=city, branch_count=count)
+        for state, district, city, count in branches.values_list('state', 'district', 'city').annotate(n=Count('ifsc'))
+    ]
+    # Read from the bank and IFSC index alone; codes of malformed IFSCs are left out.
+    names = {facet.bank_id: facet.name for facet in facets if facet.kind == Facet.BANK}
+    facets += [
+        Facet(kind=Facet.CODE, code=code, bank_id=bank_id, name=names[bank_id], branch_count=count)
+        for code, bank_id, count in branches.annotate(code=Substr('ifsc', 1, 4))
+        .values_list('code', 'bank_id').annotate(n=Count('ifsc'))
+        if is_valid_bank_code(code)
+    ]
+    with transaction.atomic(using=using):
+        Facet.objects.using(using).all().delete()
+        Facet.objects.using(using).bulk_create(facets, batch_size=5000)
+    invalidate()
+    return len(facets)
+
+
+class FacetSnapshot:
+    """
+    Facet rows grouped for lookup by parent state and district. ``version``
+    is the DatasetVersion read just before the rows, for HTTP validators.
+    """
+
+    def __init__(self, facets, version=(0, None)):
+        self.version = version
+        self.banks = []
+        self.states = []
+        self.districts = defaultdict(list)
+        self.cities = defaultdict(list)
+        self.cities_by_state = defaultdict(list)
+        self.codes = defaultdict(list)
+        for facet in facets:
+            if facet.kind == Facet.BANK:
+                self.banks.append({'id': facet.bank_id, 'name': facet.name, 'branch_count': facet.branch_count})
+            elif facet.kind == Facet.STATE:
+                self.states.append({'state': facet.state, 'branch_count': facet.branch_count})
+            elif facet.kind == Facet.DISTRICT:
+                self.districts[facet.state].append({
+                    'state': facet.state, 'district': facet.district, 'branch_count': facet.branch_count,
+                })
+            elif facet.kind == Facet.CITY:
+                row = {
+                    'state': facet.state, 'district': facet.district, 'city': facet.city,
+                    'branch_count': facet.branch_count,
+                }
+                self.cities[(facet.state, facet.district)].append(row)
+                self.cities_by_state[facet.state].append(row)
+            elif facet.kind == Facet.CODE:
+                self.codes[facet.code].append({'id': facet.bank_id, 'name': facet.name, 'branch_count': facet.branch_count})
+        # A code is normally one bank's; where banks share one, the largest comes first.
+        for banks in self.codes.values():
+            banks.sort(key=lambda bank: (-bank['branch_count'], bank['id']))
+        self.loaded_at = time.monotonic()
+
+    def get_districts(self, state=None):
+        if state is None:
+            return [row for rows in self.districts.values() for row in rows]
+        return self.districts.get(state, [])
+
+    def get_banks_by_code(self, code):
+        """The banks whose IFSCs start with a normalized bank ``code``, with their branch counts under it."""
+        return self.codes.get(code, [])
+
+    def get_cities(self, state=None, district=None):
+        if district is not None:
+            if state is not None:
+                return self.cities.get((state, district), [])
+            return [row for (_, name), rows in self.cities.items() if name == district for row in rows]
+        if state is not None:
+            return self.cities_by_state.get(state, [])
+        return [row for rows in self.cities.values() for row in rows]
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Return the current FacetSnapshot, loading it from the facets table when
+    missing or older than ``BANKS_FACET_TTL`` seconds.
+    """
+    global _snapshot
+    ttl = getattr(settings, 'BANKS_FACET_TTL', 300)
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - snapshot.loaded_at > ttl:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at > ttl:
+                version = DatasetVersion.current()
+                snapshot = _snapshot = FacetSnapshot(Facet.objects.order_by(*Facet._meta.ordering), version)
+    return snapshot
+
+
+def invalidate():
+    global _snapshot
+    _snapshot = None
@@ -0,0 +1,159 @@
+"""
+Declarative filters and sort orders for the branch list endpoints.
+
+A FilterSet lists the query parameters it accepts and the sort orders it
+offers; FilterBackend applies it through DRF's ``filter_backends`` hook and
+describes it in the API schema. Values are matched exactly, as returned by
+the facets endpoints, so that every combination of BranchFilterSet's
+filters is answered from one of the composite indexes on Branch (bank and
+state, bank and city, state, district and city) rather than a scan. An
+IFSC prefix is a range of the IFSC primary key (or of the bank and IFSC
+index), not a LIKE.
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.filters import BaseFilterBackend
+from .validators import parse_ifsc_prefix, prefix_range
+
+
+ORDERING_PARAM = 'ordering'
+
+
+class FilterError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'invalid_filter'
+
+    def __init__(self, message):
+        super().__init__({'error': message})
+
+
+class Filter:
+    """
+    An exact match of ``field`` against a query parameter, converted by
+    ``parse``; ``error`` is the message for a value ``parse`` rejects.
+    """
+
+    def __init__(self, field, parse=str, type='string', description='', error=None):
+        self.field = field
+        self.parse = parse
+        self.type = type
+        self.description = description
+        self.error = error
+
+    def lookups(self, value):
+        return {self.field: value}
+
+
+class PrefixFilter(Filter):
+    """Values of ``field`` starting with the parameter, as a range of an index on it."""
+
+    def lookups(self, value):
+        start, end = prefix_range(value)
+        return {f'{self.field}__gte': start, f'{self.field}__lt': end}
+
+
+class FilterSet:
+    """
+    Query parameter filters and sort orders, declared by subclasses as
+    ``filters`` (parameter name to Filter) and ``orderings`` (sort name to
+    model fields). ``?ordering=`` takes a comma-separated list of sort
+    names, each optionally prefixed with ``-`` for descending order.
+    ``tiebreaker`` is appended so that pages of equal values are stable.
+    """
+    filters = {}
+    orderings = {}
+    tiebreaker = None
+
+    def __init__(self, params, exclude=()):
+        self.params = params
+        self.filters = {name: spec for name, spec in self.filters.items() if name not in exclude}
+
+    def lookups(self):
+        lookups = {}
+        for name, spec in self.filters.items():
+            value = self.params.get(name, '').strip()
+            if not value:
+                continue
+            try:
+                lookups.update(spec.lookups(spec.parse(value)))
+            except ValueError:
+                raise FilterError(spec.error or f'{name} must be a valid {spec.type}')
+        return lookups
+
+    def ordering(self):
+        value = self.params.get(ORDERING_PARAM, '').strip()
+        if not value:
+            return None
+        fields = []
+        for name in value.split(','):
+            name = name.strip()
+            descending = name.startswith('-')
+            if name.lstrip('-') not in self.orderings:
+                raise FilterError(f'ordering must be a comma-separated list of: {", ".join(self.orderings)}')
+            fields.extend(('-' if descending else '') + field for field in self.orderings[name.lstrip('-')])
+        if self.tiebreaker and not any(field.lstrip('-') == self.tiebreaker for field in fields):
+            fields.append(self.tiebreaker)
+        return fields
+
+    def is_active(self):
+        """Whether the request filters or sorts at all."""
+        return any(self.params.get(name, '').strip() for name in (*self.filters, ORDERING_PARAM))
+
+    def filter(self, queryset):
+        queryset = queryset.filter(**self.lookups())
+        ordering = self.ordering()
+        return queryset.order_by(*ordering) if ordering else queryset
+
+    @classmethod
+    def schema_parameters(cls, exclude=()):
+        parameters = [
+            {
+                'name': name, 'required': False, 'in': 'query',
+                'description': spec.description, 'schema': {'type': spec.type},
+            }
+            for name, spec in cls.filters.items() if name not in exclude
+        ]
+        parameters.append({
+            'name': ORDERING_PARAM, 'required': False, 'in': 'query',
+            'description': f'Comma-separated sort orders, "-" for descending: {", ".join(cls.orderings)}',
+            'schema': {'type': 'string'},
+        })
+        return parameters
+
+
+class BranchFilterSet(FilterSet):
+    filters = {
+        'bank': Filter('bank_id', int, 'integer', 'Bank ID'),
+        'state': Filter('state', description='State, exactly as in the facets'),
+        'district': Filter('district', description='District, exactly as in the facets'),
+        'city': Filter('city', description='City, exactly as in the facets'),
+        'ifsc_prefix': PrefixFilter(
+            'ifsc', parse_ifsc_prefix, description='Start of the IFSC, e.g. HDFC0 for all of a bank code',
+            error='ifsc_prefix must be the start of an IFSC: up to 4 letters, or 4 letters, 0 and up to 6 letters or digits',
+        ),
+    }
+    orderings = {
+        'ifsc': ('ifsc',),
+        'bank': ('bank__name',),
+        'branch': ('branch',),
+        'city': ('city',),
+        'district': ('district',),
+        'state': ('state',),
+    }
+    tiebreaker = 'ifsc'
+
+
+class FilterBackend(BaseFilterBackend):
+    """
+    Apply the view's ``filterset_class``, leaving out the parameters in its
+    ``filterset_exclude`` (filters already fixed by the URL).
+    """
+
+    def get_filterset(self, request, view):
+        return view.filterset_class(request.query_params, getattr(view, 'filterset_exclude', ()))
+
+    def filter_queryset(self, request, queryset, view):
+        return self.get_filterset(request, view).filter(queryset)
+
+    def get_schema_operation_parameters(self, view):
+        return view.filterset_class.schema_parameters(getattr(view, 'filterset_exclude', ()))
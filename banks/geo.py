@@ -0,0 +1,264 @@
+"""
+Branch coordinates and nearest-branch search.
+
+Branches have no coordinates in the source data. The data load commands
+locate them with a Gazetteer, a CSV file of place coordinates with the
+columns ``state,district,city,latitude,longitude``: a branch gets the
+coordinates of its city in its district, or of a city of that name anywhere
+in its state, or of its district (a row with an empty city).
+
+A GeoIndex answers nearest-N and within-radius queries from memory. Branches
+at the same coordinates (every branch of a city, with a city gazetteer) are
+grouped into one point, and the points are kept in a KD-tree over their unit
+vectors, where straight-line distance grows with great-circle distance, so
+the search needs no special cases at the poles or the antimeridian. Each
+process builds its index on first use and rebuilds it when the
+DatasetVersion changes, like the autocomplete index.
+"""
+import csv
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+from .models import Bank, Branch, DatasetVersion
+
+
+EARTH_RADIUS_KM = 6371.0088
+GAZETTEER_FIELDS = ['state', 'district', 'city', 'latitude', 'longitude']
+MAX_LIMIT = 100
+# Points in a KD-tree leaf
+LEAF_SIZE = 8
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres between two points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_vector(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord_squared(km):
+    """Squared straight-line distance between unit vectors ``km`` apart on the surface."""
+    if km >= math.pi * EARTH_RADIUS_KM:
+        return 4.0
+    return (2 * math.sin(km / (2 * EARTH_RADIUS_KM))) ** 2
+
+
+def chord_km(squared):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared) / 2))
+
+
+def valid_coordinates(lat, lon):
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def _place(value):
+    return ' '.join(value.split()).lower()
+
+
+class Gazetteer:
+    """Coordinates of places, looked up by state, district and city."""
+
+    def __init__(self):
+        self.places = {}
+        self.cities = {}
+
+    def add(self, state, district, city, latitude, longitude):
+        state, district, city = _place(state), _place(district), _place(city)
+        self.places[(state, district, city)] = (latitude, longitude)
+        if city:
+            self.cities.setdefault((state, city), (latitude, longitude))
+
+    def locate(self, city, district, state):
+        """``(latitude, longitude)`` of a branch's place, or ``(None, None)``."""
+        state, district, city = _place(state), _place(district), _place(city)
+        return (
+            self.places.get((state, district, city))
+            or self.cities.get((state, city))
+            or self.places.get((state, district, ''))
+            or (None, None)
+        )
+
+    def __len__(self):
+        return len(self.places)
+
+    @classmethod
+    def load(cls, path):
+        """Read a gazetteer CSV file; raises ValueError naming the first bad line."""
+        gazetteer = cls()
+        with open(path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            missing = [name for name in GAZETTEER_FIELDS if name not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f'{path}: missing columns: {", ".join(missing)}')
+            for row in reader:
+                try:
+                    latitude, longitude = float(row['latitude']), float(row['longitude'])
+                except (TypeError, ValueError):
+                    latitude = longitude = None
+                if latitude is None or not valid_coordinates(latitude, longitude):
+                    raise ValueError(f'{path}, line {reader.line_num}: invalid coordinates')
+                gazetteer.add(row['state'] or '', row['district'] or '', row['city'] or '', latitude, longitude)
+        return gazetteer
+
+
+def _build_tree(points, vectors):
+    # Leaves are lists of point numbers; nodes are (axis, split, below, above).
+    if len(points) <= LEAF_SIZE:
+        return points
+    spreads = [
+        max(vectors[point][axis] for point in points) - min(vectors[point][axis] for point in points)
+        for axis in range(3)
+    ]
+    axis = spreads.index(max(spreads))
+    points.sort(key=lambda point: vectors[point][axis])
+    middle = len(points) // 2
+    split = vectors[points[middle]][axis]
+    return (axis, split, _build_tree(points[:middle], vectors), _build_tree(points[middle:], vectors))
+
+
+class GeoIndex:
+    """Branches with coordinates, grouped by point, in a KD-tree."""
+
+    def __init__(self, version, rows, bank_names):
+        """``rows`` are ``(ifsc, branch, city, district, state, bank_id, latitude, longitude)``."""
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.bank_names = bank_names
+        groups = defaultdict(list)
+        for row in rows:
+            groups[row[6], row[7]].append(row[:6])
+        self.points = list(groups)
+        self.members = [sorted(groups[point]) for point in self.points]
+        self.vectors = [to_vector(*point) for point in self.points]
+        self.branches = len(rows)
+        self.tree = _build_tree(list(range(len(self.points))), self.vectors)
+
+    def __len__(self):
+        return self.branches
+
+    def nearest(self, lat, lon, limit=10, radius_km=None):
+        """
+        Payloads of the ``limit`` branches nearest to ``(lat, lon)``, nearest
+        first and by IFSC at equal distance, only those within ``radius_km``
+        when it is given, each with its ``distance_km``.
+        """
+        query = to_vector(lat, lon)
+        members = self.members
+        vectors = self.vectors
+        bound = chord_squared(radius_km) if radius_km is not None else 4.0
+        # Max-heap of the nearest points found, holding at least ``limit`` branches.
+        found = []
+        count = 0
+
+        def visit(node):
+            nonlocal bound, count
+            if isinstance(node, list):
+                for point in node:
+                    x, y, z = vectors[point]
+                    distance = (x - query[0]) ** 2 + (y - query[1]) ** 2 + (z - query[2]) ** 2
+                    if distance > bound:
+                        continue
+                    heapq.heappush(found, (-distance, point))
+                    count += len(members[point])
+                    while count - len(members[found[0][1]]) >= limit:
+                        count -= len(members[heapq.heappop(found)[1]])
+                    if count >= limit:
+                        bound = -found[0][0]
+                return
+            axis, split, below, above = node
+            offset = query[axis] - split
+            near, far = (below, above) if offset < 0 else (above, below)
+            visit(near)
+            if offset * offset <= bound:
+                visit(far)
+
+        if limit > 0 and self.points:
+            visit(self.tree)
+        results = []
+        for distance, point in sorted((-distance, point) for distance, point in found):
+            latitude, longitude = self.points[point]
+            distance_km = round(chord_km(distance), 3)
+            for ifsc, branch, city, district, state, bank_id in members[point]:
+                results.append({
+                    'ifsc': ifsc,
+                    'branch': branch,
+                    'city': city,
+                    'district': district,
+                    'state': state,
+                    'bank_name': self.bank_names.get(bank_id),
+                    'bank_id': bank_id,
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'distance_km': distance_km,
+                })
+                if len(results) == limit:
+                    return results
+        return results
+
+
+def build(using=None):
+    """Build an index from the branches with coordinates."""
+    using = using or router.db_for_read(Branch)
+    version = DatasetVersion.current(using)
+    bank_names = dict(Bank.objects.using(using).values_list('id', 'name'))
+    rows = list(
+        Branch.objects.using(using).order_by().exclude(latitude=None).exclude(longitude=None)
+        .values_list('ifsc', 'branch', 'city', 'district', 'state', 'bank_id', 'latitude', 'longitude')
+        .iterator(chunk_size=5000)
+    )
+    return GeoIndex(version, rows, bank_names)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_GEO', {})
+    return {
+        'GAZETTEER': config.get('GAZETTEER'),
+        'CHECK_INTERVAL': config.get('CHECK_INTERVAL', 30),
+    }
+
+
+def get_index():
+    """
+    Return this process's index, building it on first use and rebuilding it
+    when the DatasetVersion has changed, which is checked at most every
+    ``BANKS_GEO['CHECK_INTERVAL']`` seconds.
+    """
+    global _index
+    interval = get_config()['CHECK_INTERVAL']
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at <= interval:
+        return index
+    with _lock:
+        index = _index
+        if index is None or time.monotonic() - index.checked_at > interval:
+            if index is not None and DatasetVersion.current() == index.version:
+                index.checked_at = time.monotonic()
+            else:
+                index = _index = build()
+    return index
+
+
+def dataset_changed(using=DEFAULT_DB_ALIAS):
+    """Rebuild this process's index, if it has one, after a load."""
+    global _index
+    with _lock:
+        if _index is not None:
+            _index = build(using)
+
+
+def discard():
+    global _index
+    _index = None
@@ -0,0 +1,615 @@
+"""
+Streaming CSV ingest for bank and branch data.
+
+Rows are read lazily from the CSV file, validated one at a time and written
+to the database in batches with ``bulk_create``, so memory use does not grow
+with the size of the input file. Rows that fail validation are collected in a
+side file instead of aborting the load.
+
+CSVIngestor replaces both tables wholesale; DatasetRefresher compares the
+input with the current tables and only writes the rows that changed. Given
+a Gazetteer (see banks.geo), both fill in the coordinates of each branch.
+
+For large files a ParallelValidator splits the file into byte ranges of
+whole records, parses and validates them in a pool of processes and hands
+the results back in file order, so the single writer sees exactly the rows,
+line numbers and errors of a sequential read.
+"""
+import csv
+import hashlib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import Bank, Branch
+from .search import fts_suspended
+from .validators import is_valid_ifsc
+
+
+CSV_FIELDS = ['ifsc', 'bank_id', 'branch', 'address', 'city', 'district', 'state', 'bank_name']
+BRANCH_FIELDS = ['ifsc', 'branch', 'address', 'city', 'district', 'state']
+COORDINATE_FIELDS = ['latitude', 'longitude']
+DEFAULT_BATCH_SIZE = 5000
+# Bytes of CSV parsed and validated by a worker process at a time, at most
+# and at least: smaller files are split into a few chunks per worker.
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+MIN_CHUNK_BYTES = 64 * 1024
+
+
+class RowError(ValueError):
+    """Raised when a CSV row fails validation."""
+
+
+class IngestError(Exception):
+    """
+    Raised when a load fails after clearing the tables. ``result`` is the
+    IngestResult of the batches committed before the failure.
+    """
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+def _max_length(model, name):
+    return model._meta.get_field(name).max_length
+
+
+def clean_row(row):
+    """
+    Validate a raw CSV row and return the cleaned values.
+
+    Raises RowError describing the first problem found.
+    """
+    missing = [name for name in CSV_FIELDS if row.get(name) is None]
+    if missing:
+        raise RowError(f'missing columns: {", ".join(missing)}')
+
+    try:
+        bank_id = int(row['bank_id'])
+    except ValueError:
+        raise RowError(f'invalid bank_id {row["bank_id"]!r}')
+
+    cleaned = {name: row[name].strip() for name in BRANCH_FIELDS}
+    cleaned['ifsc'] = cleaned['ifsc'].upper()
+    cleaned['bank_id'] = bank_id
+    cleaned['bank_name'] = row['bank_name'].strip()
+
+    if not cleaned['ifsc']:
+        raise RowError('empty ifsc')
+    if not is_valid_ifsc(cleaned['ifsc']):
+        raise RowError(f'invalid ifsc {cleaned["ifsc"]!r}')
+    if not cleaned['bank_name']:
+        raise RowError('empty bank_name')
+
+    for name in BRANCH_FIELDS:
+        limit = _max_length(Branch, name)
+        if len(cleaned[name]) > limit:
+            raise RowError(f'{name} longer than {limit} characters')
+    if len(cleaned['bank_name']) > _max_length(Bank, 'name'):
+        raise RowError(f'bank_name longer than {_max_length(Bank, "name")} characters')
+
+    return cleaned
+
+
+def read_rows(file):
+    """Yield ``(line_number, row)`` pairs from an open CSV file."""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def validate_rows(rows):
+    """
+    Validate ``(line_number, row)`` pairs.
+
+    Yields ``(line_number, row, cleaned, error)`` where exactly one of
+    ``cleaned`` and ``error`` is set.
+    """
+    for line, row in rows:
+        try:
+            yield line, row, clean_row(row), None
+        except RowError as exc:
+            yield line, row, None, str(exc)
+
+
+def locate(gazetteer, cleaned):
+    """Add the coordinates of a cleaned row's place, or None for both, to it."""
+    if gazetteer is None:
+        latitude = longitude = None
+    else:
+        latitude, longitude = gazetteer.locate(cleaned['city'], cleaned['district'], cleaned['state'])
+    cleaned['latitude'] = latitude
+    cleaned['longitude'] = longitude
+    return latitude is not None
+
+
+def _count_lines(data, end):
+    # Lines as the csv module counts them when reading with newline='': \r, \n and \r\n all end one.
+    return data.count(b'\n', 0, end) + data.count(b'\r', 0, end) - data.count(b'\r\n', 0, end)
+
+
+def split_records(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Split the CSV file at ``path`` into byte ranges of about ``chunk_bytes``
+    that end on record boundaries. Returns the header's field names and
+    ``(start, end, lines_before)`` for each range, where ``lines_before``
+    counts the lines ahead of ``start``.
+
+    A newline ends a record unless it is inside a quoted field, that is
+    unless an odd number of quotes precede it in the record; escaped quotes
+    come in pairs and do not change that.
+    """
+    ranges = []
+    with open(path, 'rb') as file:
+        header = file.readline()
+        fieldnames = next(csv.reader([header.decode('utf-8')]), None)
+        start = file.tell()
+        lines = _count_lines(header, len(header))
+        while True:
+            block = file.read(chunk_bytes)
+            if not block:
+                break
+            while True:
+                more = file.read(chunk_bytes)
+                if not more:
+                    end = len(block)
+                    break
+                # Look for the last newline outside quotes, or read on.
+                end = block.rfind(b'\n')
+                while end != -1 and block.count(b'"', 0, end) % 2:
+                    end = block.rfind(b'\n', 0, end)
+                if end != -1:
+                    end += 1
+                    break
+                block += more
+            file.seek(start + end)
+            ranges.append((start, start + end, lines))
+            lines += _count_lines(block, end)
+            start += end
+    return fieldnames, ranges
+
+
+def validate_range(path, fieldnames, start, end, lines_before):
+    """
+    Parse and validate one range from split_records(), as validate_rows()
+    does for a whole file.
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+    return list(validate_rows((lines_before + reader.line_num, row) for row in reader))
+
+
+def _setup_worker():
+    # Worker processes that were spawned rather than forked need the app registry for clean_row.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+class ParallelValidator:
+    """
+    Validate a CSV file in ``workers`` processes (one per CPU by default).
+
+    Ranges of ``chunk_bytes`` (by default sized for about four per worker,
+    within MIN_CHUNK_BYTES and DEFAULT_CHUNK_BYTES) are validated ahead of
+    the consumer by at most two per worker, so memory use does not grow
+    with the file. ``waited``
+    is the time the consumer spent waiting for the workers: when it is a
+    small part of a load, the load is bound by writing, not parsing.
+    """
+
+    def __init__(self, workers=None, chunk_bytes=None):
+        if workers is not None and workers < 1:
+            raise ValueError('workers must be a positive integer')
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.rows = 0
+        self.chunks = 0
+        self.waited = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def validate(self, path):
+        """Yield ``(line_number, row, cleaned, error)`` for the file at ``path``, in file order."""
+        started = time.perf_counter()
+        chunk_bytes = self.chunk_bytes or min(
+            DEFAULT_CHUNK_BYTES, max(MIN_CHUNK_BYTES, os.path.getsize(path) // (self.workers * 4)),
+        )
+        fieldnames, ranges = split_records(path, chunk_bytes)
+        ranges = iter(ranges)
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_setup_worker)
+        pending = deque()
+
+        def submit():
+            for start, end, lines_before in ranges:
+                pending.append(pool.submit(validate_range, path, fieldnames, start, end, lines_before))
+                return
+
+        try:
+            for _ in range(self.workers * 2):
+                submit()
+            while pending:
+                waiting = time.perf_counter()
+                rows = pending.popleft().result()
+                self.waited += time.perf_counter() - waiting
+                submit()
+                self.chunks += 1
+                self.rows += len(rows)
+                yield from rows
+        finally:
+            pool.shutdown(cancel_futures=True)
+            self.elapsed = time.perf_counter() - started
+
+    def __str__(self):
+        return (
+            f'parsed {self.rows} rows in {self.chunks} chunks with {self.workers} workers '
+            f'in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s), '
+            f'waited {self.waited:.2f}s for parsing'
+        )
+
+
+def validate_file(path, validator=None):
+    """``(line_number, row, cleaned, error)`` for the CSV file at ``path``, by ``validator`` if given."""
+    if validator is not None:
+        yield from validator.validate(path)
+        return
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        yield from validate_rows(read_rows(file))
+
+
+class RejectWriter:
+    """Write rejected rows, with their line number and error, to a CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line, row, error):
+        if self.path is None:
+            self.count += 1
+            return
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['line', 'error'] + CSV_FIELDS)
+        self._writer.writerow([line, error] + [row.get(name) or '' for name in CSV_FIELDS])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class BatchStats:
+    """Timing for a single written batch."""
+
+    def __init__(self, number, rows, rejected, elapsed):
+        self.number = number
+        self.rows = rows
+        self.rejected = rejected
+        self.elapsed = elapsed
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class IngestResult:
+    """Totals for a completed ingest."""
+
+    def __init__(self, banks, branches, rejected, batches, elapsed, located=0):
+        self.banks = banks
+        self.branches = branches
+        self.rejected = rejected
+        self.batches = batches
+        self.elapsed = elapsed
+        self.located = located
+
+    @property
+    def rows_per_second(self):
+        return self.branches / self.elapsed if self.elapsed else 0.0
+
+
+class CSVIngestor:
+    """
+    Replace the bank and branch tables with the contents of a CSV file.
+
+    Validated rows are buffered up to ``batch_size`` and written with
+    ``bulk_create``; the clear and each batch are committed in their own
+    transactions, so readers see empty and then partial tables until the load
+    finishes, and a failed load leaves the batches committed before it (see
+    IngestError). ``on_batch`` is called with a BatchStats after every batch.
+    Files are read by ``validator``, a ParallelValidator, when one is given.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, rejects_path=None,
+                 using=DEFAULT_DB_ALIAS, on_batch=None, gazetteer=None, validator=None):
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+        self.batch_size = batch_size
+        self.rejects_path = rejects_path
+        self.using = using
+        self.on_batch = on_batch
+        self.gazetteer = gazetteer
+        self.validator = validator
+
+    def load(self, path):
+        """Ingest the CSV file at ``path``."""
+        return self.ingest(validate_file(path, self.validator))
+
+    def clear(self):
+        """Empty both tables without loading every row to send delete signals."""
+        with connections[self.using].cursor() as cursor:
+            ops = connections[self.using].ops
+            cursor.execute(f'DELETE FROM {ops.quote_name(Branch._meta.db_table)}')
+            cursor.execute(f'DELETE FROM {ops.quote_name(Bank._meta.db_table)}')
+
+    def ingest(self, validated):
+        """
+        Load ``(line_number, row, cleaned, error)`` tuples into empty tables.
+
+        The tables are cleared first. Rows repeating an IFSC already seen in
+        the input are rejected. Any failure after that is raised as an
+        IngestError.
+        """
+        with fts_suspended(self.using):
+            return self._ingest(validated)
+
+    def _ingest(self, validated):
+        started = time.perf_counter()
+        rejects = RejectWriter(self.rejects_path)
+        bank_ids = set()
+        seen_ifsc = set()
+        branches = 0
+        batches = 0
+        located = 0
+        pending_banks = []
+        pending_branches = []
+        batch_rejected = 0
+
+        with transaction.atomic(using=self.using):
+            self.clear()
+
+        def flush():
+            nonlocal branches, batches, batch_rejected
+            batch_started = time.perf_counter()
+            with transaction.atomic(using=self.using):
+                if pending_banks:
+                    Bank.objects.using(self.using).bulk_create(pending_banks)
+                Branch.objects.using(self.using).bulk_create(pending_branches)
+            batches += 1
+            branches += len(pending_branches)
+            if self.on_batch is not None:
+                self.on_batch(BatchStats(
+                    batches, len(pending_branches), batch_rejected,
+                    time.perf_counter() - batch_started,
+                ))
+            pending_banks.clear()
+            pending_branches.clear()
+            batch_rejected = 0
+
+        try:
+            for line, row, cleaned, error in validated:
+                if error is None and cleaned['ifsc'] in seen_ifsc:
+                    error = f'duplicate ifsc {cleaned["ifsc"]}'
+                if error is not None:
+                    rejects.write(line, row, error)
+                    batch_rejected += 1
+                    continue
+
+                seen_ifsc.add(cleaned['ifsc'])
+                bank_id = cleaned['bank_id']
+                if bank_id not in bank_ids:
+                    bank_ids.add(bank_id)
+                    pending_banks.append(Bank(id=bank_id, name=cleaned['bank_name']))
+                located += locate(self.gazetteer, cleaned)
+                pending_branches.append(Branch(
+                    bank_id=bank_id,
+                    **{name: cleaned[name] for name in BRANCH_FIELDS + COORDINATE_FIELDS}
+                ))
+                if len(pending_branches) >= self.batch_size:
+                    flush()
+
+            if pending_branches or pending_banks:
+                flush()
+        except Exception as exc:
+            committed = IngestResult(
+                banks=len(bank_ids) - len(pending_banks),
+                branches=branches,
+                rejected=rejects.count,
+                batches=batches,
+                elapsed=time.perf_counter() - started,
+            )
+            raise IngestError(str(exc), committed) from exc
+        finally:
+            rejects.close()
+
+        return IngestResult(
+            banks=len(bank_ids),
+            branches=branches,
+            rejected=rejects.count,
+            batches=batches,
+            elapsed=time.perf_counter() - started,
+            located=located,
+        )
+
+
+REFRESH_FIELDS = ['bank_id', 'branch', 'address', 'city', 'district', 'state'] + COORDINATE_FIELDS
+
+
+def _row_digest(values):
+    """Fingerprint the refreshable columns of a branch."""
+    joined = '\x1f'.join(str(value) for value in values)
+    return hashlib.blake2b(joined.encode('utf-8'), digest_size=16).digest()
+
+
+class RefreshSummary:
+    """The changes applied, or that would be applied, by a refresh."""
+
+    def __init__(self):
+        self.banks_created = []
+        self.banks_updated = []
+        self.banks_deleted = []
+        self.branches_created = []
+        self.branches_updated = []
+        self.branches_deleted = []
+        self.unchanged = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+
+    @property
+    def has_changes(self):
+        return any([
+            self.banks_created, self.banks_updated, self.banks_deleted,
+            self.branches_created, self.branches_updated, self.branches_deleted,
+        ])
+
+    @property
+    def changed_ifscs(self):
+        return self.branches_created + self.branches_updated + self.branches_deleted
+
+    def __str__(self):
+        return (
+            f'banks: {len(self.banks_created)} created, {len(self.banks_updated)} updated, '
+            f'{len(self.banks_deleted)} deleted; '
+            f'branches: {len(self.branches_created)} created, {len(self.branches_updated)} updated, '
+            f'{len(self.branches_deleted)} deleted, {self.unchanged} unchanged; '
+            f'{self.rejected} rejected'
+        )
+
+
+class DatasetRefresher:
+    """
+    Bring the bank and branch tables in line with a CSV file.
+
+    Branches are matched by IFSC and banks by id. Only inserts, updates and
+    deletes are written, all inside a single transaction, so readers keep
+    seeing the previous data until the refresh commits. With ``dry_run`` the
+    changes are computed but not applied. Files are read by ``validator``,
+    a ParallelValidator, when one is given.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, rejects_path=None,
+                 using=DEFAULT_DB_ALIAS, dry_run=False, gazetteer=None, validator=None):
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+        self.batch_size = batch_size
+        self.rejects_path = rejects_path
+        self.using = using
+        self.dry_run = dry_run
+        self.gazetteer = gazetteer
+        self.validator = validator
+
+    def load(self, path):
+        """Refresh from the CSV file at ``path``."""
+        return self.refresh(validate_file(path, self.validator))
+
+    def refresh(self, validated):
+        """Apply ``(line_number, row, cleaned, error)`` tuples as a diff."""
+        started = time.perf_counter()
+        summary = RefreshSummary()
+        rejects = RejectWriter(self.rejects_path)
+
+        try:
+            with transaction.atomic(using=self.using):
+                self._refresh(validated, summary, rejects)
+                if self.dry_run:
+                    transaction.set_rollback(True, using=self.using)
+        finally:
+            rejects.close()
+
+        summary.rejected = rejects.count
+        summary.elapsed = time.perf_counter() - started
+        return summary
+
+    def _refresh(self, validated, summary, rejects):
+        banks = Bank.objects.using(self.using)
+        branches = Branch.objects.using(self.using)
+
+        # Without a gazetteer there are no coordinates to compare, so the
+        # stored ones are kept rather than overwritten with None.
+        if self.gazetteer is None:
+            fields = [name for name in REFRESH_FIELDS if name not in COORDINATE_FIELDS]
+        else:
+            fields = REFRESH_FIELDS
+        current_banks = dict(banks.values_list('id', 'name'))
+        current_branches = {
+            values[0]: _row_digest(values[1:])
+            for values in branches.values_list('ifsc', *fields).iterator(chunk_size=self.batch_size)
+        }
+        incoming_banks = set()
+        seen_ifsc = set()
+        to_create = []
+        to_update = []
+        now = timezone.now()
+
+        def flush():
+            if not self.dry_run:
+                branches.bulk_create(to_create)
+                branches.bulk_update(to_update, fields + ['updated_at'])
+            to_create.clear()
+            to_update.clear()
+
+        for line, row, cleaned, error in validated:
+            if error is None and cleaned['ifsc'] in seen_ifsc:
+                error = f'duplicate ifsc {cleaned["ifsc"]}'
+            if error is not None:
+                rejects.write(line, row, error)
+                continue
+
+            ifsc = cleaned['ifsc']
+            seen_ifsc.add(ifsc)
+
+            bank_id = cleaned['bank_id']
+            if bank_id not in incoming_banks:
+                incoming_banks.add(bank_id)
+                if bank_id not in current_banks:
+                    summary.banks_created.append(bank_id)
+                    if not self.dry_run:
+                        banks.create(id=bank_id, name=cleaned['bank_name'])
+                elif current_banks[bank_id] != cleaned['bank_name']:
+                    summary.banks_updated.append(bank_id)
+                    if not self.dry_run:
+                        banks.filter(id=bank_id).update(name=cleaned['bank_name'], updated_at=now)
+
+            locate(self.gazetteer, cleaned)
+            values = {name: cleaned[name] for name in BRANCH_FIELDS + COORDINATE_FIELDS}
+            digest = current_branches.pop(ifsc, None)
+            if digest is None:
+                summary.branches_created.append(ifsc)
+                to_create.append(Branch(bank_id=bank_id, **values))
+            elif digest != _row_digest([cleaned[name] for name in fields]):
+                summary.branches_updated.append(ifsc)
+                to_update.append(Branch(bank_id=bank_id, updated_at=now, **values))
+            else:
+                summary.unchanged += 1
+
+            if len(to_create) + len(to_update) >= self.batch_size:
+                flush()
+        flush()
+
+        # Whatever was not matched by the input no longer exists.
+        summary.branches_deleted = sorted(current_branches)
+        summary.banks_deleted = sorted(set(current_banks) - incoming_banks)
+        if not self.dry_run:
+            for start in range(0, len(summary.branches_deleted), self.batch_size):
+                chunk = summary.branches_deleted[start:start + self.batch_size]
+                branches.filter(ifsc__in=chunk).delete()
+            if summary.banks_deleted:
+                banks.filter(id__in=summary.banks_deleted).delete()
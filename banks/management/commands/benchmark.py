@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from banks.bench import (
+    PRODUCTION_BANKS,
+    PRODUCTION_BRANCHES,
+    SUITES,
+    compare,
+    load_baseline,
+    load_synthetic,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run benchmark suites against a throwaway database filled with synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suites',
+            nargs='*',
+            help=f'Suites to run (default: all). Available: {", ".join(sorted(SUITES))}',
+        )
+        parser.add_argument('--banks', type=int, default=PRODUCTION_BANKS)
+        parser.add_argument('--branches', type=int, default=PRODUCTION_BRANCHES)
+        parser.add_argument('--repeat', type=int, default=50, help='Timed calls per case')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the results to a JSON baseline file')
+        parser.add_argument(
+            '--baseline',
+            metavar='PATH',
+            help='Compare with a baseline file and fail if any case regressed',
+        )
+        parser.add_argument('--metric', choices=['mean', 'p50', 'p95', 'p99'], default='p50',
+                            help='Latency compared with the baseline (default: p50)')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown as a fraction of the baseline (default: 0.25)')
+        parser.add_argument('--min-delta', type=float, default=0.5,
+                            help='Ignore slowdowns smaller than this many milliseconds (default: 0.5)')
+
+    # Only the primary gets a test database, so reads must not go to replicas.
+    @override_settings(BANKS_READ_REPLICAS=[])
+    def handle(self, *args, **options):
+        names = options['suites'] or sorted(SUITES)
+        unknown = sorted(set(names) - set(SUITES))
+        if unknown:
+            raise CommandError(f'Unknown suite(s): {", ".join(unknown)}')
+
+        baseline = load_baseline(options['baseline']) if options['baseline'] else None
+
+        # Never touch the configured database: build a test database instead.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(
+                f'Generating {options["branches"]} branches across {options["banks"]} banks...'
+            )
+            result = load_synthetic(options['banks'], options['branches'], options['seed'])
+            self.stdout.write(f'Loaded in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s)')
+
+            results = {}
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+                self.stdout.write(
+                    f'{"case":<40} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"ops/s":>10}'
+                )
+                results[name] = SUITES[name](options['repeat'])
+                for timing in results[name]:
+                    self.stdout.write(
+                        f'{timing.name[:40]:<40} {timing.mean * 1000:9.3f} {timing.p50 * 1000:9.3f} '
+                        f'{timing.p95 * 1000:9.3f} {timing.p99 * 1000:9.3f} {timing.ops_per_second:10,.0f}'
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        meta = {key: options[key] for key in ('banks', 'branches', 'repeat', 'seed')}
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], results, **meta)
+            self.stdout.write(f'\nSaved baseline to {options["save_baseline"]}')
+        if baseline is not None:
+            self.check_baseline(baseline, results, meta, options)
+
+    def check_baseline(self, baseline, results, meta, options):
+        if baseline.get('meta') != meta:
+            self.stdout.write(self.style.WARNING(
+                f'\nBaseline was recorded with {baseline.get("meta")}, this run used {meta}'
+            ))
+        regressions = compare(
+            baseline, results, options['metric'], options['tolerance'], options['min_delta'] / 1000,
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(str(regression))
+            raise CommandError(
+                f'{len(regressions)} case(s) regressed by more than {options["tolerance"]:.0%} '
+                f'against {options["baseline"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'\nNo {options["metric"]} regressions against {options["baseline"]}'
+        ))
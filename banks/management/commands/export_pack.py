@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from banks.pack import export
+
+
+class Command(BaseCommand):
+    help = 'Write the bank and branch tables to a binary pack file for load_pack'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default='bank_branches.pack',
+            help='Path of the pack file to write (default: bank_branches.pack in the current directory)',
+        )
+        parser.add_argument(
+            '--database',
+            help='Database to export (default: the read database)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            info = export(options['file'], using=options['database'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not write the pack: {exc}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {info} to {options["file"]} in {info.elapsed:.2f}s')
+        )
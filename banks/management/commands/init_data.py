@@ -1,122 +1,141 @@
 from django.core.management.base import BaseCommand
-from banks.models import Bank, Branch
+from banks.ingest import CSVIngestor, DatasetRefresher, validate_rows
+from banks.routers import use_primary
+from banks.signals import dataset_loaded
+
+
+# Sample rows in the same shape as bank_branches.csv
+SAMPLE_ROWS = [
+    {
+        'ifsc': 'SBIN0000001',
+        'bank_id': '1',
+        'bank_name': 'State Bank of India',
+        'branch': 'Mumbai Main Branch',
+        'address': '123 Fort Area, Mumbai',
+        'city': 'Mumbai',
+        'district': 'Mumbai',
+        'state': 'Maharashtra',
+    },
+    {
+        'ifsc': 'SBIN0000002',
+        'bank_id': '1',
+        'bank_name': 'State Bank of India',
+        'branch': 'Delhi Connaught Place',
+        'address': '456 CP, New Delhi',
+        'city': 'Delhi',
+        'district': 'Delhi',
+        'state': 'Delhi',
+    },
+    {
+        'ifsc': 'HDFC0000001',
+        'bank_id': '2',
+        'bank_name': 'HDFC Bank',
+        'branch': 'Bangalore Koramangala',
+        'address': '789 Koramangala, Bangalore',
+        'city': 'Bangalore',
+        'district': 'Bangalore',
+        'state': 'Karnataka',
+    },
+    {
+        'ifsc': 'HDFC0000002',
+        'bank_id': '2',
+        'bank_name': 'HDFC Bank',
+        'branch': 'Chennai Anna Nagar',
+        'address': '321 Anna Nagar, Chennai',
+        'city': 'Chennai',
+        'district': 'Chennai',
+        'state': 'Tamil Nadu',
+    },
+    {
+        'ifsc': 'ICIC0000001',
+        'bank_id': '3',
+        'bank_name': 'ICICI Bank',
+        'branch': 'Pune Camp',
+        'address': '654 Camp Area, Pune',
+        'city': 'Pune',
+        'district': 'Pune',
+        'state': 'Maharashtra',
+    },
+    {
+        'ifsc': 'ICIC0000002',
+        'bank_id': '3',
+        'bank_name': 'ICICI Bank',
+        'branch': 'Hyderabad Gachibowli',
+        'address': '987 Gachibowli, Hyderabad',
+        'city': 'Hyderabad',
+        'district': 'Hyderabad',
+        'state': 'Telangana',
+    },
+    {
+        'ifsc': 'UTIB0000001',
+        'bank_id': '4',
+        'bank_name': 'Axis Bank',
+        'branch': 'Kolkata Park Street',
+        'address': '147 Park Street, Kolkata',
+        'city': 'Kolkata',
+        'district': 'Kolkata',
+        'state': 'West Bengal',
+    },
+    {
+        'ifsc': 'UTIB0000002',
+        'bank_id': '4',
+        'bank_name': 'Axis Bank',
+        'branch': 'Ahmedabad CG Road',
+        'address': '258 CG Road, Ahmedabad',
+        'city': 'Ahmedabad',
+        'district': 'Ahmedabad',
+        'state': 'Gujarat',
+    },
+    {
+        'ifsc': 'PUNB0000001',
+        'bank_id': '5',
+        'bank_name': 'Punjab National Bank',
+        'branch': 'Jaipur MI Road',
+        'address': '369 MI Road, Jaipur',
+        'city': 'Jaipur',
+        'district': 'Jaipur',
+        'state': 'Rajasthan',
+    },
+    {
+        'ifsc': 'PUNB0000002',
+        'bank_id': '5',
+        'bank_name': 'Punjab National Bank',
+        'branch': 'Lucknow Hazratganj',
+        'address': '741 Hazratganj, Lucknow',
+        'city': 'Lucknow',
+        'district': 'Lucknow',
+        'state': 'Uttar Pradesh',
+    },
+]
 
 
 class Command(BaseCommand):
     help = 'Initialize the database with sample bank and branch data'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Only apply the changes needed to match the sample data',
+        )
+
+    @use_primary()
     def handle(self, *args, **options):
         self.stdout.write('Initializing database with sample data...')
 
-        # Clear existing data
-        Branch.objects.all().delete()
-        Bank.objects.all().delete()
-
-        # Create sample banks
-        banks_data = [
-            {'name': 'State Bank of India', 'code': 'SBI'},
-            {'name': 'HDFC Bank', 'code': 'HDFC'},
-            {'name': 'ICICI Bank', 'code': 'ICICI'},
-            {'name': 'Axis Bank', 'code': 'AXIS'},
-            {'name': 'Punjab National Bank', 'code': 'PNB'},
-        ]
-
-        banks = {}
-        for bank_data in banks_data:
-            bank = Bank.objects.create(**bank_data)
-            banks[bank_data['code']] = bank
-            self.stdout.write(f'Created bank: {bank.name}')
-
-        # Create sample branches
-        branches_data = [
-            {
-                'bank': banks['SBI'],
-                'name': 'Mumbai Main Branch',
-                'ifsc': 'SBIN0000001',
-                'address': '123 Fort Area, Mumbai',
-                'city': 'Mumbai',
-                'state': 'Maharashtra'
-            },
-            {
-                'bank': banks['SBI'],
-                'name': 'Delhi Connaught Place',
-                'ifsc': 'SBIN0000002',
-                'address': '456 CP, New Delhi',
-                'city': 'Delhi',
-                'state': 'Delhi'
-            },
-            {
-                'bank': banks['HDFC'],
-                'name': 'Bangalore Koramangala',
-                'ifsc': 'HDFC0000001',
-                'address': '789 Koramangala, Bangalore',
-                'city': 'Bangalore',
-                'state': 'Karnataka'
-            },
-            {
-                'bank': banks['HDFC'],
-                'name': 'Chennai Anna Nagar',
-                'ifsc': 'HDFC0000002',
-                'address': '321 Anna Nagar, Chennai',
-                'city': 'Chennai',
-                'state': 'Tamil Nadu'
-            },
-            {
-                'bank': banks['ICICI'],
-                'name': 'Pune Camp',
-                'ifsc': 'ICIC0000001',
-                'address': '654 Camp Area, Pune',
-                'city': 'Pune',
-                'state': 'Maharashtra'
-            },
-            {
-                'bank': banks['ICICI'],
-                'name': 'Hyderabad Gachibowli',
-                'ifsc': 'ICIC0000002',
-                'address': '987 Gachibowli, Hyderabad',
-                'city': 'Hyderabad',
-                'state': 'Telangana'
-            },
-            {
-                'bank': banks['AXIS'],
-                'name': 'Kolkata Park Street',
-                'ifsc': 'UTIB0000001',
-                'address': '147 Park Street, Kolkata',
-                'city': 'Kolkata',
-                'state': 'West Bengal'
-            },
-            {
-                'bank': banks['AXIS'],
-                'name': 'Ahmedabad CG Road',
-                'ifsc': 'UTIB0000002',
-                'address': '258 CG Road, Ahmedabad',
-                'city': 'Ahmedabad',
-                'state': 'Gujarat'
-            },
-            {
-                'bank': banks['PNB'],
-                'name': 'Jaipur MI Road',
-                'ifsc': 'PUNB0000001',
-                'address': '369 MI Road, Jaipur',
-                'city': 'Jaipur',
-                'state': 'Rajasthan'
-            },
-            {
-                'bank': banks['PNB'],
-                'name': 'Lucknow Hazratganj',
-                'ifsc': 'PUNB0000002',
-                'address': '741 Hazratganj, Lucknow',
-                'city': 'Lucknow',
-                'state': 'Uttar Pradesh'
-            },
-        ]
+        # Line numbers as they would appear in a CSV file with a header row
+        rows = validate_rows(enumerate(SAMPLE_ROWS, start=2))
 
-        for branch_data in branches_data:
-            branch = Branch.objects.create(**branch_data)
-            self.stdout.write(f'Created branch: {branch.name} ({branch.ifsc})')
+        if options['refresh']:
+            summary = DatasetRefresher().refresh(rows)
+            dataset_loaded.send(sender=self.__class__, summary=summary)
+            self.stdout.write(self.style.SUCCESS(f'Refresh complete - {summary}'))
+            return
 
+        result = CSVIngestor().ingest(rows)
+        dataset_loaded.send(sender=self.__class__, summary=None)
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {Bank.objects.count()} banks and {Branch.objects.count()} branches'
+                f'Successfully created {result.banks} banks and {result.branches} branches'
             )
         )
@@ -0,0 +1,73 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from banks.facets import rebuild_facets
+from banks.ingest import DEFAULT_BATCH_SIZE
+from banks.pack import Pack, restore
+from banks.routers import use_primary
+from banks.signals import dataset_loaded
+from banks.sqlite import swap_load
+
+
+class Command(BaseCommand):
+    help = 'Replace the bank and branch data with the contents of a pack file from export_pack'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default='bank_branches.pack',
+            help='Path to the pack file (default: bank_branches.pack in the current directory)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of branches written per insert (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='Skip checking the checksums of the data sections',
+        )
+        parser.add_argument(
+            '--swap',
+            action='store_true',
+            help='Load into a copy of the SQLite database file and swap it in when done',
+        )
+
+    @use_primary()
+    def handle(self, *args, **options):
+        path = options['file']
+        if not os.path.exists(path):
+            raise CommandError(f'Pack file not found: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+
+        try:
+            pack = Pack(path, verify=not options['no_verify'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read the pack: {exc}')
+        self.stdout.write(f'Loading {pack.info} from {path}...')
+
+        def build(using):
+            # restore() sets the dataset version, so the signal must not bump it again.
+            result = restore(pack, using, options['batch_size'])
+            rebuild_facets(using)
+            return result
+
+        with pack:
+            if options['swap']:
+                try:
+                    result = swap_load(build)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+            else:
+                result = build(DEFAULT_DB_ALIAS)
+        dataset_loaded.send(sender=self.__class__, summary=None, swapped=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully loaded {result.banks} banks and {result.branches} branches '
+                f'in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s)'
+            )
+        )
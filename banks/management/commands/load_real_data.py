@@ -1,19 +1,69 @@
-import csv
 import os
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from banks.models import Bank, Branch
+from django.core.management.base import BaseCommand, CommandError
+from banks import geo
+from banks.facets import rebuild_facets
+from banks.ingest import CSVIngestor, DatasetRefresher, DEFAULT_BATCH_SIZE, IngestError, ParallelValidator
+from banks.models import DatasetVersion
+from banks.routers import use_primary
+from banks.signals import dataset_loaded
+from banks.sqlite import swap_load
 
 
 class Command(BaseCommand):
-    help = 'Load real bank and branch data from the CSV file'
+    help = (
+        'Load real bank and branch data from the CSV file. A full load clears the tables and commits '
+        'each batch as it goes, so readers see partial data until it finishes and a failed load '
+        'leaves the tables half-loaded; use --swap or --refresh to keep the previous data visible.'
+    )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default='bank_branches.csv',
+            help='Path to the CSV file (default: bank_branches.csv in the current directory)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of branches written per bulk insert (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes that parse and validate the CSV, 0 for one per CPU (default: 1, in this process)',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Where to write rejected rows (default: <file>.rejects.csv)',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Only apply the inserts, updates and deletes needed to match the CSV',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='With --refresh, report the changes without applying them',
+        )
+        parser.add_argument(
+            '--gazetteer',
+            help='CSV of place coordinates used to locate branches (default: BANKS_GEO["GAZETTEER"])',
+        )
+        parser.add_argument(
+            '--swap',
+            action='store_true',
+            help='Load into a copy of the SQLite database file and swap it in when done',
+        )
+
+    @use_primary()
     def handle(self, *args, **options):
         self.stdout.write('Loading real bank and branch data...')
 
-        # Path to the CSV file
-        csv_file_path = os.path.join('bank_branches.csv')
-        
+        csv_file_path = options['file']
+
         if not os.path.exists(csv_file_path):
             self.stdout.write(
                 self.style.ERROR(
@@ -22,58 +72,115 @@ class Command(BaseCommand):
             )
             return
 
-        # Clear existing data
-        with transaction.atomic():
-            Branch.objects.all().delete()
-            Bank.objects.all().delete()
-
-            banks_created = {}
-            branches_created = 0
-
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
-                    bank_id = int(row['bank_id'])
-                    bank_name = row['bank_name']
-                    
-                    # Create bank if it doesn't exist
-                    if bank_id not in banks_created:
-                        bank, created = Bank.objects.get_or_create(
-                            id=bank_id,
-                            defaults={'name': bank_name}
-                        )
-                        if created:
-                            banks_created[bank_id] = bank
-                            self.stdout.write(f'Created bank: {bank_name} (ID: {bank_id})')
-                        else:
-                            banks_created[bank_id] = bank
-                    
-                    # Create branch
-                    try:
-                        branch = Branch.objects.create(
-                            ifsc=row['ifsc'],
-                            bank=banks_created[bank_id],
-                            branch=row['branch'],
-                            address=row['address'],
-                            city=row['city'],
-                            district=row['district'],
-                            state=row['state']
-                        )
-                        branches_created += 1
-                        
-                        if branches_created % 1000 == 0:
-                            self.stdout.write(f'Created {branches_created} branches...')
-                            
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'Error creating branch {row["ifsc"]}: {e}'
-                            )
-                        )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        if options['workers'] < 0:
+            raise CommandError('--workers must be 0 or a positive integer')
+
+        rejects_path = options['rejects'] or f'{os.path.splitext(csv_file_path)[0]}.rejects.csv'
+        gazetteer = self.load_gazetteer(options['gazetteer'] or geo.get_config()['GAZETTEER'])
+        validator = ParallelValidator(options['workers'] or None) if options['workers'] != 1 else None
+
+        if options['refresh']:
+            if options['swap']:
+                raise CommandError('--swap replaces the whole file and cannot be used with --refresh')
+            self.refresh(csv_file_path, rejects_path, gazetteer, validator, options)
+            return
+        if options['dry_run']:
+            raise CommandError('--dry-run can only be used with --refresh')
+
+        ingestor = CSVIngestor(
+            batch_size=options['batch_size'],
+            rejects_path=rejects_path,
+            on_batch=self.report_batch,
+            gazetteer=gazetteer,
+            validator=validator,
+        )
+        if options['swap']:
+            try:
+                result = swap_load(lambda using: self.build(ingestor, csv_file_path, using))
+            except IngestError as exc:
+                raise CommandError(f'Load failed, the database was not changed: {exc}')
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            dataset_loaded.send(sender=self.__class__, summary=None, swapped=True)
+        else:
+            try:
+                result = ingestor.load(csv_file_path)
+            except IngestError as exc:
+                # The committed batches are live, so caches and versions must still follow them.
+                dataset_loaded.send(sender=self.__class__, summary=None)
+                raise CommandError(
+                    f'Load failed after committing {exc.result.banks} banks and {exc.result.branches} '
+                    f'branches in {exc.result.batches} batches: {exc}. The tables hold a partial '
+                    f'dataset; run the load again, or use --swap or --refresh.'
+                )
+            dataset_loaded.send(sender=self.__class__, summary=None)
+
+        if result.rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Rejected {result.rejected} rows, see {rejects_path}'
+                )
+            )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully loaded {len(banks_created)} banks and {branches_created} branches'
+                f'Successfully loaded {result.banks} banks and {result.branches} branches '
+                f'in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s)'
             )
         )
+        if gazetteer is not None:
+            self.stdout.write(f'Located {result.located} of {result.branches} branches')
+        if validator is not None:
+            self.stdout.write(f'Validator: {validator}')
+
+    def build(self, ingestor, csv_file_path, using):
+        # Readers of the new file see its facets and version as soon as it is swapped in.
+        ingestor.using = using
+        result = ingestor.load(csv_file_path)
+        rebuild_facets(using)
+        DatasetVersion.bump(using)
+        return result
+
+    def load_gazetteer(self, path):
+        if not path:
+            return None
+        try:
+            gazetteer = geo.Gazetteer.load(path)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read the gazetteer: {exc}')
+        self.stdout.write(f'Locating branches with {len(gazetteer)} places from {path}')
+        return gazetteer
+
+    def refresh(self, csv_file_path, rejects_path, gazetteer, validator, options):
+        refresher = DatasetRefresher(
+            batch_size=options['batch_size'],
+            rejects_path=rejects_path,
+            dry_run=options['dry_run'],
+            gazetteer=gazetteer,
+            validator=validator,
+        )
+        summary = refresher.load(csv_file_path)
+        if not options['dry_run']:
+            dataset_loaded.send(sender=self.__class__, summary=summary)
+
+        if summary.rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Rejected {summary.rejected} rows, see {rejects_path}'
+                )
+            )
+
+        prefix = 'Dry run, no changes applied' if options['dry_run'] else 'Refresh complete'
+        self.stdout.write(
+            self.style.SUCCESS(f'{prefix} in {summary.elapsed:.2f}s - {summary}')
+        )
+        if validator is not None:
+            self.stdout.write(f'Validator: {validator}')
+
+    def report_batch(self, stats):
+        self.stdout.write(
+            f'Batch {stats.number}: {stats.rows} branches in {stats.elapsed:.2f}s '
+            f'({stats.rows_per_second:,.0f} rows/s, {stats.rejected} rejected)'
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from banks.facets import rebuild_facets
+from banks.routers import use_primary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the bank, state, district and city facet counts'
+
+    @use_primary()
+    def handle(self, *args, **options):
+        count = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} facets'))
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:49
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+# Trigram full-text index over the searchable branch columns, SQLite only.
+# The triggers keep it in step with single-row writes; bulk loads suspend
+# them and rebuild the index afterwards (see banks.search). SQLite builds
+# without FTS5 or the trigram tokenizer (3.34+) get no table, and substring
+# search falls back to icontains.
+CREATE_FTS = [
+    """CREATE VIRTUAL TABLE branches_fts USING fts5(
+        city, district, branch,
+        content='branches', content_rowid='rowid', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER branches_fts_insert AFTER INSERT ON branches BEGIN
+        INSERT INTO branches_fts(rowid, city, district, branch)
+        VALUES (new.rowid, new.city, new.district, new.branch);
+    END""",
+    """CREATE TRIGGER branches_fts_delete AFTER DELETE ON branches BEGIN
+        INSERT INTO branches_fts(branches_fts, rowid, city, district, branch)
+        VALUES ('delete', old.rowid, old.city, old.district, old.branch);
+    END""",
+    """CREATE TRIGGER branches_fts_update AFTER UPDATE ON branches BEGIN
+        INSERT INTO branches_fts(branches_fts, rowid, city, district, branch)
+        VALUES ('delete', old.rowid, old.city, old.district, old.branch);
+        INSERT INTO branches_fts(rowid, city, district, branch)
+        VALUES (new.rowid, new.city, new.district, new.branch);
+    END""",
+    "INSERT INTO branches_fts(branches_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    'DROP TRIGGER IF EXISTS branches_fts_insert',
+    'DROP TRIGGER IF EXISTS branches_fts_delete',
+    'DROP TRIGGER IF EXISTS branches_fts_update',
+    'DROP TABLE IF EXISTS branches_fts',
+]
+
+
+def fts_supported(connection):
+    """Whether the SQLite library has FTS5 and its trigram tokenizer."""
+    if connection.Database.sqlite_version_info < (3, 34, 0):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite' or not fts_supported(schema_editor.connection):
+        return
+    for statement in CREATE_FTS:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(django.db.models.functions.text.Lower('city'), name='branches_city_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(django.db.models.functions.text.Lower('district'), name='branches_district_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(django.db.models.functions.text.Lower('branch'), name='branches_branch_lower_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(fields=['bank', 'ifsc'], name='branches_bank_ifsc_idx'),
+        ),
+    ]
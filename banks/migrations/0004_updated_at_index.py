@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0003_bank_ifsc_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(fields=['updated_at'], name='branches_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0004_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Facet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('bank', 'Bank'), ('state', 'State'), ('district', 'District'), ('city', 'City')], max_length=8)),
+                ('bank_id', models.BigIntegerField(blank=True, null=True)),
+                ('name', models.CharField(blank=True, max_length=49)),
+                ('state', models.CharField(blank=True, max_length=26)),
+                ('district', models.CharField(blank=True, max_length=50)),
+                ('city', models.CharField(blank=True, max_length=50)),
+                ('branch_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'db_table': 'facets',
+                'ordering': ['kind', 'name', 'state', 'district', 'city'],
+                'indexes': [models.Index(fields=['kind', 'state', 'district'], name='facets_kind_88c521_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    DatasetVersion = apps.get_model('banks', 'DatasetVersion')
+    DatasetVersion.objects.using(schema_editor.connection.alias).create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0005_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dataset_version',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
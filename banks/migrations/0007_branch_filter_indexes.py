@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0006_dataset_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='branch',
+            name='branches_state_9ddda4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(fields=['bank', 'state', 'ifsc'], name='branches_bank_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(fields=['bank', 'city', 'ifsc'], name='branches_bank_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branch',
+            index=models.Index(fields=['state', 'district', 'city', 'ifsc'], name='branches_state_place_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0007_branch_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='branch',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
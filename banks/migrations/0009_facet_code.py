@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banks', '0008_branch_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facet',
+            name='code',
+            field=models.CharField(blank=True, max_length=4),
+        ),
+        migrations.AlterField(
+            model_name='facet',
+            name='kind',
+            field=models.CharField(choices=[('bank', 'Bank'), ('state', 'State'), ('district', 'District'), ('city', 'City'), ('code', 'Bank code')], max_length=8),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class Bank(models.Model):
@@ -25,6 +28,9 @@ class Branch(models.Model):
     city = models.CharField(max_length=50)
     district = models.CharField(max_length=50)  # Added district field from original
     state = models.CharField(max_length=26)
+    # Located from a gazetteer by the data load commands (see banks.geo); None when unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -33,9 +39,86 @@ class Branch(models.Model):
         ordering = ['bank__name', 'branch']
         indexes = [
             models.Index(fields=['city']),
-            models.Index(fields=['state']),
             models.Index(fields=['district']),
+            # Filtered branch lists (see banks.filters); the trailing IFSC
+            # serves cursor pages of a filter in order. The state, district
+            # and city index also covers filters on state alone.
+            models.Index(fields=['bank', 'state', 'ifsc'], name='branches_bank_state_idx'),
+            models.Index(fields=['bank', 'city', 'ifsc'], name='branches_bank_city_idx'),
+            models.Index(fields=['state', 'district', 'city', 'ifsc'], name='branches_state_place_idx'),
+            # Keyset pagination of a bank's branches (see banks.pagination)
+            models.Index(fields=['bank', 'ifsc'], name='branches_bank_ifsc_idx'),
+            # Incremental exports (?since=) in banks.export
+            models.Index(fields=['updated_at'], name='branches_updated_at_idx'),
+            # Case-folded prefix search (see banks.search)
+            models.Index(Lower('city'), name='branches_city_lower_idx'),
+            models.Index(Lower('district'), name='branches_district_lower_idx'),
+            models.Index(Lower('branch'), name='branches_branch_lower_idx'),
         ]
 
     def __str__(self):
         return f"{self.branch} - {self.bank.name}"
+
+
+class Facet(models.Model):
+    """Precomputed branch count for a bank, state, district, city or bank code (see banks.facets)."""
+    BANK = 'bank'
+    STATE = 'state'
+    DISTRICT = 'district'
+    CITY = 'city'
+    CODE = 'code'
+    KIND_CHOICES = [(BANK, 'Bank'), (STATE, 'State'), (DISTRICT, 'District'), (CITY, 'City'), (CODE, 'Bank code')]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    bank_id = models.BigIntegerField(null=True, blank=True)  # Plain column so bulk reloads need no FK checks
+    name = models.CharField(max_length=49, blank=True)  # Bank name, for bank facets
+    state = models.CharField(max_length=26, blank=True)
+    district = models.CharField(max_length=50, blank=True)
+    city = models.CharField(max_length=50, blank=True)
+    code = models.CharField(max_length=4, blank=True)  # The first four characters of the bank's IFSCs, for code facets
+    branch_count = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'facets'
+        ordering = ['kind', 'name', 'state', 'district', 'city']
+        indexes = [
+            models.Index(fields=['kind', 'state', 'district']),
+        ]
+
+    def __str__(self):
+        value = self.code or self.name or self.city or self.district or self.state
+        return f'{self.kind}: {value} ({self.branch_count})'
+
+
+class DatasetVersion(models.Model):
+    """
+    Version of the bank and branch data as a whole, kept in a single row and
+    bumped after every committed change (see banks.conditional). Used as the
+    validator for responses that depend on more than one object.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dataset_version'
+
+    def __str__(self):
+        return f'v{self.version} ({self.updated_at})'
+
+    @classmethod
+    def current(cls, using=None):
+        """Return ``(version, updated_at)`` of the data, from ``using`` or the router's read database."""
+        row = cls.objects.using(using).filter(id=1).values_list('version', 'updated_at').first()
+        return row or (0, None)
+
+    @classmethod
+    async def acurrent(cls, using=None):
+        """Async version of current()."""
+        row = await cls.objects.using(using).filter(id=1).values_list('version', 'updated_at').afirst()
+        return row or (0, None)
+
+    @classmethod
+    def bump(cls, using=DEFAULT_DB_ALIAS):
+        versions = cls.objects.using(using)
+        if not versions.filter(id=1).update(version=F('version') + 1, updated_at=timezone.now()):
+            versions.create(id=1, version=1)
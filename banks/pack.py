@@ -0,0 +1,424 @@
+"""
+Compact binary snapshot of the bank and branch tables, for cold starts.
+
+``export_pack`` writes both tables to a pack file and ``load_pack`` restores
+them from it, so a new replica does not have to copy a database file or
+parse the CSV. With ``BANKS_SNAPSHOT['PACK']`` the in-memory Snapshot (see
+banks.snapshot) is read from the pack instead of the database whenever the
+pack holds the data the database holds.
+
+A pack is a header, a section table and one section per column, each
+aligned to 8 bytes and stored little-endian, so columns can be used straight
+from a memory map. Every distinct string is stored once, in one section of
+UTF-8 text with an offset index, and so are timestamps and coordinates;
+columns hold indexes into these tables, each in the narrowest unsigned
+type that fits. Branch rows are in IFSC order, so a branch can be found
+by binary search without reading the rest of the file. Each section, and
+the header itself, carries a BLAKE2b checksum.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import timedelta
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils import timezone
+from .ingest import DEFAULT_BATCH_SIZE, CSVIngestor, IngestResult
+from .models import Bank, Branch, DatasetVersion
+from .search import fts_suspended
+from .snapshot import EPOCH, to_micros
+
+
+MAGIC = b'BANKPACK'
+FORMAT_VERSION = 1
+# magic, format version, section count, reserved, dataset version and its
+# updated_at, and the number of banks, branches and strings
+HEADER = struct.Struct('<8sHHIqqQQQ')
+# name, array typecode, offset, length, checksum
+SECTION = struct.Struct('<31scQQ16s')
+DIGEST_SIZE = 16
+ALIGNMENT = 8
+# updated_at of a dataset that has never been versioned
+NO_TIME = -2 ** 63
+# Strings are separated by NUL, so the whole section decodes in one call.
+SEPARATOR = '\0'
+# Unsigned typecodes an index column may be stored as, narrowest first
+INDEX_TYPES = [('B', 2 ** 8), ('H', 2 ** 16), ('I', 2 ** 32)]
+TYPECODES = {'B', 'H', 'I', 'q', 'd'}
+
+# Tables that columns hold indexes into: every distinct string, with the
+# offset of each in ``strings``, every distinct timestamp in microseconds,
+# and every distinct (latitude, longitude) pair, flattened, with NaN for a
+# branch that has no coordinates.
+STRINGS = 'strings'
+STRING_OFFSETS = 'string.offsets'
+TIMES = 'times'
+POINTS = 'points'
+# Banks are in id order; ``branch.bank`` is the position of a branch's bank.
+BANK_COLUMNS = ['bank.id', 'bank.name', 'bank.created_at', 'bank.updated_at']
+BRANCH_COLUMNS = [
+    'branch.ifsc', 'branch.bank', 'branch.branch', 'branch.address', 'branch.city', 'branch.district',
+    'branch.state', 'branch.point', 'branch.created_at', 'branch.updated_at',
+]
+REQUIRED_SECTIONS = {STRINGS, STRING_OFFSETS, TIMES, POINTS, *BANK_COLUMNS, *BRANCH_COLUMNS}
+BRANCH_STRING_FIELDS = ['ifsc', 'branch', 'address', 'city', 'district', 'state']
+
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class PackError(ValueError):
+    """Raised when a file is not a pack, or is corrupt."""
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def _section(name, typecode, values):
+    """``(name, typecode, bytes)`` of a section of ``values``."""
+    column = array(typecode, values)
+    if not LITTLE_ENDIAN:
+        column.byteswap()
+    return name, typecode, column.tobytes()
+
+
+def _index_section(name, values):
+    """A section of indexes, stored in the narrowest type that holds them."""
+    largest = max(values, default=0)
+    typecode = next(typecode for typecode, limit in INDEX_TYPES if largest < limit)
+    return _section(name, typecode, values)
+
+
+class _Interned(dict):
+    """Number each distinct value in the order it is first seen."""
+
+    def __call__(self, value):
+        return self.setdefault(value, len(self))
+
+
+def export(path, using=None):
+    """
+    Write the bank and branch tables of ``using`` (the router's read
+    database by default) to a pack at ``path``. The file is written next to
+    ``path`` and renamed over it when complete. Returns the PackInfo.
+    """
+    started = time.perf_counter()
+    using = using or router.db_for_read(Branch)
+    strings, times, points = _Interned(), _Interned(), _Interned()
+    version, updated = DatasetVersion.current(using)
+
+    columns = {name: [] for name in BANK_COLUMNS + BRANCH_COLUMNS}
+    bank_positions = {}
+    banks = Bank.objects.using(using).order_by('id').values_list('id', 'name', 'created_at', 'updated_at')
+    for position, (bank_id, name, created, modified) in enumerate(banks):
+        bank_positions[bank_id] = position
+        columns['bank.id'].append(bank_id)
+        columns['bank.name'].append(strings(name))
+        columns['bank.created_at'].append(times(to_micros(created)))
+        columns['bank.updated_at'].append(times(to_micros(modified)))
+
+    rows = Branch.objects.using(using).values_list(
+        *BRANCH_STRING_FIELDS, 'bank_id', 'latitude', 'longitude', 'created_at', 'updated_at',
+    )
+    # Sorted here rather than by the database, so that the order is the one
+    # Pack.find() searches by, whatever the database's collation.
+    for ifsc, branch, address, city, district, state, bank_id, latitude, longitude, created, modified in sorted(
+        rows.iterator(chunk_size=DEFAULT_BATCH_SIZE)
+    ):
+        for name, value in zip(BRANCH_STRING_FIELDS, (ifsc, branch, address, city, district, state)):
+            columns[f'branch.{name}'].append(strings(value))
+        columns['branch.bank'].append(bank_positions[bank_id])
+        columns['branch.point'].append(points((latitude, longitude)))
+        columns['branch.created_at'].append(times(to_micros(created)))
+        columns['branch.updated_at'].append(times(to_micros(modified)))
+
+    text = ''.join(value + SEPARATOR for value in strings).encode('utf-8')
+    if text.count(b'\0') != len(strings):
+        raise PackError('strings may not contain NUL characters')
+    if len(text) >= 2 ** 32:
+        raise PackError('strings take more than 4 GiB')
+    offsets = [0]
+    for value in strings:
+        offsets.append(offsets[-1] + len(value.encode('utf-8')) + 1)
+    nan = float('nan')
+
+    sections = [
+        (STRINGS, 'B', text),
+        _section(STRING_OFFSETS, 'I', offsets),
+        _section(TIMES, 'q', times),
+        _section(POINTS, 'd', [nan if value is None else value for point in points for value in point]),
+        _section('bank.id', 'q', columns['bank.id']),
+    ]
+    sections += [_index_section(name, columns[name]) for name in BANK_COLUMNS[1:] + BRANCH_COLUMNS]
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(sections), 0, version,
+        NO_TIME if updated is None else to_micros(updated),
+        len(columns['bank.id']), len(columns['branch.ifsc']), len(strings),
+    )
+    offset = _aligned(len(header) + SECTION.size * len(sections) + DIGEST_SIZE)
+    table = []
+    for name, typecode, data in sections:
+        table.append(SECTION.pack(name.encode('ascii'), typecode.encode('ascii'), offset, len(data), _digest(data)))
+        offset = _aligned(offset + len(data))
+    head = header + b''.join(table)
+
+    partial = f'{path}.partial'
+    with open(partial, 'wb') as file:
+        file.write(head + _digest(head))
+        for name, typecode, data in sections:
+            file.write(b'\0' * (_aligned(file.tell()) - file.tell()))
+            file.write(data)
+    os.replace(partial, path)
+
+    info = PackInfo.read(path)
+    info.elapsed = time.perf_counter() - started
+    return info
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class PackInfo:
+    """What a pack holds, from its header."""
+
+    def __init__(self, path, version, banks, branches, strings, nbytes):
+        self.path = path
+        self.version = version
+        self.banks = banks
+        self.branches = branches
+        self.strings = strings
+        self.nbytes = nbytes
+        self.elapsed = 0.0
+
+    @classmethod
+    def read(cls, path):
+        with Pack(path, verify=False) as pack:
+            return pack.info
+
+    def __str__(self):
+        return (
+            f'{self.banks} banks and {self.branches} branches, dataset version {self.version[0]}, '
+            f'{self.strings} distinct strings, {self.nbytes:,} bytes'
+        )
+
+
+class Pack:
+    """
+    A pack file, memory-mapped for reading.
+
+    ``column(name)`` is a column as a memoryview of the map and ``string(i)``
+    one string; nothing else is read from the file until it is asked for.
+    With ``verify`` every section's checksum is checked on opening. Close the
+    pack, or use it as a context manager, once done with its columns.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        self._views = []
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise PackError(f'{path} is empty')
+        self._data = memoryview(self._map)
+        self._views.append(self._data)
+        try:
+            self._read_header(verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self, verify):
+        data = self._data
+        if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+            raise PackError(f'{self.path} is not a pack file')
+        magic, format_version, count, _, version, updated, banks, branches, strings = HEADER.unpack_from(data)
+        if format_version != FORMAT_VERSION:
+            raise PackError(f'{self.path} has pack format {format_version}, not {FORMAT_VERSION}')
+        end = HEADER.size + SECTION.size * count
+        if len(data) < end + DIGEST_SIZE or _digest(data[:end]) != data[end:end + DIGEST_SIZE]:
+            raise PackError(f'{self.path} has a corrupt header')
+
+        self._sections = {}
+        for index in range(count):
+            name, typecode, offset, length, digest = SECTION.unpack_from(data, HEADER.size + SECTION.size * index)
+            name = name.rstrip(b'\0').decode('ascii')
+            typecode = typecode.decode('ascii')
+            if typecode not in TYPECODES:
+                raise PackError(f'{self.path} has a {name} section of unknown type {typecode!r}')
+            if offset + length > len(data):
+                raise PackError(f'{self.path} is truncated')
+            section = data[offset:offset + length]
+            self._views.append(section)
+            if verify and _digest(section) != digest:
+                raise PackError(f'{self.path} has a corrupt {name} section')
+            self._sections[name] = (typecode, section)
+        missing = REQUIRED_SECTIONS - set(self._sections)
+        if missing:
+            raise PackError(f'{self.path} has no {", ".join(sorted(missing))} section')
+
+        self.version = (version, None if updated == NO_TIME else from_micros(updated))
+        self.info = PackInfo(self.path, self.version, banks, branches, strings, len(data))
+        self._columns = {}
+
+    def __len__(self):
+        return self.info.branches
+
+    def column(self, name):
+        """A section as a sequence of numbers, read from the map."""
+        if name not in self._columns:
+            typecode, section = self._sections[name]
+            if LITTLE_ENDIAN:
+                column = section.cast(typecode)
+                self._views.append(column)
+            else:
+                column = array(typecode)
+                column.frombytes(section)
+                column.byteswap()
+            self._columns[name] = column
+        return self._columns[name]
+
+    def string(self, index):
+        offsets = self.column(STRING_OFFSETS)
+        return bytes(self._sections[STRINGS][1][offsets[index]:offsets[index + 1] - 1]).decode('utf-8')
+
+    def strings(self):
+        """Every string, in index order."""
+        return str(self._sections[STRINGS][1], 'utf-8').split(SEPARATOR)[:-1]
+
+    def times(self, name):
+        """A column of timestamps, in microseconds."""
+        return array('q', map(self.column(TIMES).__getitem__, self.column(name)))
+
+    def points(self):
+        """``(latitude, longitude)`` of every distinct point, or None for both."""
+        values = [None if value != value else value for value in self.column(POINTS)]
+        return list(zip(values[0::2], values[1::2]))
+
+    def find(self, ifsc):
+        """Row position of the branch with a normalized IFSC, or None."""
+        column = self.column('branch.ifsc')
+        low, high = 0, len(column)
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(column[middle]) < ifsc:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(column) and self.string(column[low]) == ifsc else None
+
+    def fingerprint(self):
+        """The fingerprint (see banks.snapshot) of the tables this pack was exported from."""
+        bank_times = self.times('bank.updated_at')
+        branch_times = self.times('branch.updated_at')
+        return (
+            len(bank_times), from_micros(max(bank_times)) if len(bank_times) else None,
+            len(branch_times), from_micros(max(branch_times)) if len(branch_times) else None,
+        )
+
+    def close(self):
+        self._columns = {}
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def restore(pack, using=DEFAULT_DB_ALIAS, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Replace the bank and branch tables of ``using`` with the rows of ``pack``,
+    keeping their timestamps, in one transaction. Returns an IngestResult.
+
+    The DatasetVersion becomes the pack's, so replicas restored from one pack
+    give the same HTTP validators, unless the database is already at that
+    version or later; then it is bumped like after any other load.
+    """
+    started = time.perf_counter()
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    def insert_sql(model, fields):
+        columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+        return (
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))})'
+        )
+
+    # Each distinct value is converted once and shared by the rows that use it.
+    strings = pack.strings()
+    times = [connection.ops.adapt_datetimefield_value(from_micros(micros)) for micros in pack.column(TIMES)]
+    points = pack.points()
+    bank_ids = pack.column('bank.id')
+    banks = [
+        (bank_id, strings[name], times[created], times[modified])
+        for bank_id, name, created, modified in zip(
+            bank_ids, pack.column('bank.name'), pack.column('bank.created_at'), pack.column('bank.updated_at'),
+        )
+    ]
+    columns = [pack.column(name) for name in BRANCH_COLUMNS]
+    branch_sql = insert_sql(Branch, [
+        'ifsc', 'bank', 'branch', 'address', 'city', 'district', 'state',
+        'latitude', 'longitude', 'created_at', 'updated_at',
+    ])
+    batches = 0
+    located = 0
+
+    with fts_suspended(using), transaction.atomic(using=using):
+        CSVIngestor(using=using).clear()
+        with connection.cursor() as cursor:
+            cursor.executemany(insert_sql(Bank, ['id', 'name', 'created_at', 'updated_at']), banks)
+            for start in range(0, len(pack), batch_size):
+                batch = []
+                for ifsc, bank, branch, address, city, district, state, point, created, modified in zip(
+                    *(column[start:start + batch_size] for column in columns)
+                ):
+                    latitude, longitude = points[point]
+                    located += latitude is not None
+                    batch.append((
+                        strings[ifsc], bank_ids[bank], strings[branch], strings[address],
+                        strings[city], strings[district], strings[state],
+                        latitude, longitude, times[created], times[modified],
+                    ))
+                cursor.executemany(branch_sql, batch)
+                batches += 1
+        restore_version(pack.version, using)
+
+    return IngestResult(
+        banks=len(banks),
+        branches=len(pack),
+        rejected=0,
+        batches=batches,
+        elapsed=time.perf_counter() - started,
+        located=located,
+    )
+
+
+def restore_version(version, using=DEFAULT_DB_ALIAS):
+    """Set the DatasetVersion to a pack's ``(version, updated_at)``, or bump it if it is not behind."""
+    number, updated = version
+    current = DatasetVersion.current(using)[0]
+    if number <= current:
+        DatasetVersion.bump(using)
+        return
+    versions = DatasetVersion.objects.using(using)
+    versions.get_or_create(id=1)
+    # update() leaves updated_at alone unless told, where save() would set it to now.
+    versions.filter(id=1).update(version=number, updated_at=updated or timezone.now())
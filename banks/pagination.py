@@ -0,0 +1,47 @@
+"""
+Opt-in keyset pagination for the branch list.
+
+List views page by page number unless the client asks for
+``?pagination=cursor``. That pages the rows in ``ifsc`` order, with
+opaque ``next``/``previous`` cursors in place of page numbers.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+PAGINATION_QUERY_PARAM = 'pagination'
+KEYSET_MODE = 'cursor'
+
+
+class BranchKeysetPagination(CursorPagination):
+    """
+    Keyset pagination over the IFSC primary key.
+
+    Each page is an indexed range scan starting after the last IFSC of the
+    previous page, so there is no COUNT(*) and no OFFSET, and deep pages cost
+    the same as the first one.
+    """
+    ordering = 'ifsc'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetPaginationMixin:
+    """
+    Let clients opt in to keyset pagination with ``?pagination=cursor``.
+
+    Without the parameter the view keeps its default page-number pagination.
+    """
+    keyset_pagination_class = BranchKeysetPagination
+
+    @property
+    def keyset_requested(self):
+        return self.request.query_params.get(PAGINATION_QUERY_PARAM) == KEYSET_MODE
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.keyset_requested:
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
@@ -0,0 +1,16 @@
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+
+
+class OperationsPermission(IsAdminUser):
+    """
+    Staff-only access to the operations endpoints, which expose per-process
+    cache, snapshot and profiling internals. ``BANKS_OPERATIONS['PUBLIC']``
+    opens them to every client, for deployments that keep them off the
+    public network.
+    """
+
+    def has_permission(self, request, view):
+        if getattr(settings, 'BANKS_OPERATIONS', {}).get('PUBLIC', False):
+            return True
+        return super().has_permission(request, view)
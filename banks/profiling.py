@@ -0,0 +1,255 @@
+"""
+Opt-in request profiling, enabled with ``BANKS_PROFILING = {'ENABLED': True}``.
+
+ProfilingMiddleware splits each request's time into phases: ``db`` (time in
+SQL queries), ``serialize`` (the rest of the view, which for these views is
+mostly building payloads) and ``render`` (encoding the DRF response). It
+also counts queries and response bytes. With SERVER_TIMING the phases are
+sent in a ``Server-Timing`` header, which browser dev tools show per
+request, and every request is added to per-view histograms served at
+``/api/metrics/``. A view that runs more queries than its budget is logged
+as a warning with its most repeated statement, which in an N+1 loop is the
+query run once per row.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('db', 'serialize', 'render', 'total')
+DURATION_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # Milliseconds
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_PROFILING', {})
+    return {
+        'ENABLED': config.get('ENABLED', False),
+        'SERVER_TIMING': config.get('SERVER_TIMING', True),
+        'QUERY_BUDGET': config.get('QUERY_BUDGET', 10),
+        'QUERY_BUDGETS': config.get('QUERY_BUDGETS', {}),
+    }
+
+
+class Histogram:
+    """Counts of values per bucket, Prometheus style: each bound is inclusive."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile; the maximum past the last bound."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'max': round(self.max, 3),
+            'p50': round(self.quantile(0.50), 3),
+            'p95': round(self.quantile(0.95), 3),
+            'p99': round(self.quantile(0.99), 3),
+            'buckets': buckets,
+        }
+
+
+class ViewMetrics:
+    """Histograms of one view's phases, query counts and response sizes."""
+
+    def __init__(self):
+        self.requests = 0
+        self.over_budget = 0
+        self.phases = {phase: Histogram(DURATION_BUCKETS) for phase in PHASES}
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.bytes = Histogram(BYTES_BUCKETS)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'over_budget': self.over_budget,
+            'phases_ms': {phase: histogram.as_dict() for phase, histogram in self.phases.items()},
+            'queries': self.queries.as_dict(),
+            'bytes': self.bytes.as_dict(),
+        }
+
+
+class Metrics:
+    """Per-view metrics of this process, shared by all threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, durations, queries, nbytes=None, over_budget=False):
+        with self._lock:
+            view = self._views.get(view_name)
+            if view is None:
+                view = self._views[view_name] = ViewMetrics()
+            view.requests += 1
+            view.over_budget += over_budget
+            for phase, seconds in durations.items():
+                view.phases[phase].add(seconds * 1000)
+            view.queries.add(queries)
+            if nbytes is not None:
+                view.bytes.add(nbytes)
+
+    def as_dict(self):
+        with self._lock:
+            return {name: view.as_dict() for name, view in sorted(self._views.items())}
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+metrics = Metrics()
+
+
+class Profile:
+    """Timings and queries of one request; also the execute wrapper that records them."""
+
+    def __init__(self):
+        self.start = self.view_start = time.perf_counter()
+        self.view_end = None
+        self.render_end = None
+        self.db_seconds = 0
+        self.queries = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def recording(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def durations(self, end):
+        view_end = self.view_end or end
+        view = view_end - self.view_start
+        return {
+            'db': self.db_seconds,
+            'serialize': max(view - self.db_seconds, 0),
+            'render': (self.render_end or view_end) - view_end,
+            'total': end - self.start,
+        }
+
+
+def server_timing(durations, queries):
+    entries = []
+    for phase, seconds in durations.items():
+        entry = f'{phase};dur={seconds * 1000:.3f}'
+        if phase == 'db':
+            entry += f';desc="{queries} queries"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests when ``BANKS_PROFILING['ENABLED']`` is set. Listed first
+    in MIDDLEWARE so that ``total`` covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Django runs a synchronous process_view of an async stack in a thread.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        profile = request._profile = Profile()
+        with profile.recording():
+            response = self.get_response(request)
+        return self.finish(request, response, profile, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+        profile = request._profile = Profile()
+        # Database connections are per thread, so the wrappers are installed
+        # in the thread that sync_to_async runs this request's queries in.
+        recording = await sync_to_async(profile.recording)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        return self.finish(request, response, profile, config)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_start = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.__class__.process_view(self, request, view_func, view_args, view_kwargs)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so render time starts here.
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_end = time.perf_counter()
+            response.add_post_render_callback(lambda response: setattr(profile, 'render_end', time.perf_counter()))
+        return response
+
+    def finish(self, request, response, profile, config):
+        durations = profile.durations(time.perf_counter())
+        match = request.resolver_match
+        view_name = (match.view_name or match._func_path) if match else 'unresolved'
+        budget = config['QUERY_BUDGETS'].get(view_name, config['QUERY_BUDGET'])
+        over_budget = budget is not None and profile.queries > budget
+        if over_budget:
+            sql, count = profile.statements.most_common(1)[0]
+            logger.warning(
+                '%s %s ran %d queries (budget %d); most repeated, %d times: %s',
+                request.method, view_name, profile.queries, budget, count, sql,
+            )
+        nbytes = None if response.streaming else len(response.content)
+        metrics.record(view_name, durations, profile.queries, nbytes, over_budget)
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(durations, profile.queries)
+        return response
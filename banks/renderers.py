@@ -0,0 +1,108 @@
+"""
+JSON rendering with orjson, when installed, and pre-encoded fragments.
+
+FastJSONRenderer produces the same bytes as DRF's JSONRenderer for the
+compact, non-ASCII-escaping output this project configures, falling back
+to it for anything else (an ``indent`` in the Accept header, for example).
+A Fragment is a payload dict that carries its own encoded JSON: the
+renderer splices those bytes into the response instead of encoding the
+dict again, so pages built from a FragmentList of cached Fragments (see
+banks.cache) are mostly joins of cached bytes.
+"""
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_stdlib_encoder = encoders.JSONEncoder(
+    ensure_ascii=False, allow_nan=not api_settings.STRICT_JSON, separators=(',', ':'),
+)
+
+
+def _escape(encoded):
+    # Like JSONRenderer, keep the output a strict subset of JavaScript.
+    return encoded.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def encode_stdlib(data):
+    return _escape(_stdlib_encoder.encode(data).encode('utf-8'))
+
+
+def encode_orjson(data):
+    # Dates and times go through DRF's encoder, which formats them differently.
+    return _escape(orjson.dumps(
+        data, default=_stdlib_encoder.default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    ))
+
+
+encode = encode_orjson if orjson is not None else encode_stdlib
+
+
+class Fragment(dict):
+    """
+    A payload dict together with its encoded JSON.
+
+    Fragments are shared between responses through the caches, so they must
+    not be modified once built.
+    """
+    __slots__ = ('encoded',)
+
+    def __init__(self, payload):
+        super().__init__(payload)
+        self.encoded = encode(payload)
+
+
+class FragmentList(list):
+    """
+    A list whose items are encoded one by one, so that Fragments in it, or
+    in dicts in it, are spliced in. Plain lists are encoded in one call.
+    """
+    __slots__ = ()
+
+
+SPLICED = (Fragment, FragmentList)
+
+
+def _splices(data):
+    for value in data.values():
+        if isinstance(value, SPLICED) or (isinstance(value, dict) and _splices(value)):
+            return True
+    return False
+
+
+def assemble(data, encode=encode):
+    """
+    Encode ``data``, splicing in the bytes of Fragments found directly or
+    through dicts and FragmentLists. Anything else is encoded as usual;
+    a Fragment is a dict, so the output is the same either way.
+    """
+    if isinstance(data, Fragment):
+        return data.encoded
+    if isinstance(data, FragmentList):
+        return b'[' + b','.join(assemble(item, encode) for item in data) + b']'
+    if isinstance(data, dict) and _splices(data) and all(isinstance(key, str) for key in data):
+        return b'{' + b','.join(
+            encode(key) + b':' + assemble(value, encode) for key, value in data.items()
+        ) + b'}'
+    return encode(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer, using orjson when it is installed
+    and splicing in pre-encoded Fragments.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        return assemble(data)
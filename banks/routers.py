@@ -0,0 +1,100 @@
+"""
+Primary/replica routing.
+
+ReplicaRouter sends reads to the aliases in ``BANKS_READ_REPLICAS`` and
+writes to ``default``. ReplicaMiddleware picks one replica per safe
+(GET, HEAD, OPTIONS) request, so that all of a response's queries, its
+DatasetVersion included, see the same point of a replica's history, and
+pins other requests to the primary so that they read their own writes.
+Code that writes and then reads, such as the data load commands, runs
+under ``use_primary()``; so does anything inside a transaction on the
+primary.
+"""
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_primary = ContextVar('banks_primary', default=False)
+_replica = ContextVar('banks_replica', default=None)
+_counter = itertools.count()
+
+
+def get_replicas():
+    return getattr(settings, 'BANKS_READ_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """Route reads to the primary inside the block; also usable as a decorator."""
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+def next_replica():
+    """The replica for the next request or query, in turn."""
+    replicas = get_replicas()
+    return replicas[next(_counter) % len(replicas)] if replicas else None
+
+
+@contextmanager
+def use_replica(alias):
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Reads from a replica unless pinned to the primary; writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _primary.get() or not get_replicas() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return _replica.get() or next_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+class ReplicaMiddleware:
+    """Choose a replica for each safe request and the primary for the rest."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def routing(self, request):
+        if request.method not in SAFE_METHODS:
+            return use_primary()
+        return use_replica(next_replica())
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.routing(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self.routing(request):
+            return await self.get_response(request)
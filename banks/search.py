@@ -0,0 +1,142 @@
+"""
+Indexed branch search by city, district and branch name.
+
+Prefix matching compares the lower-cased column against a range, which is
+answered from the ``LOWER(...)`` expression indexes on Branch. Substring
+matching uses the ``branches_fts`` trigram table created on SQLite by
+migration 0002; other backends, SQLite builds without FTS5 or the trigram
+tokenizer, where the migration skips the table, and terms shorter than a
+trigram fall back to ``icontains``.
+"""
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.functions import Lower
+
+
+SEARCH_FIELDS = ('city', 'district', 'branch')
+MATCH_PREFIX = 'prefix'
+MATCH_CONTAINS = 'contains'
+MATCH_MODES = (MATCH_PREFIX, MATCH_CONTAINS)
+
+FTS_TABLE = 'branches_fts'
+# Sorts after every character, so ``term <= value < term + RANGE_END`` is a prefix match.
+RANGE_END = '\U0010ffff'
+TRIGRAM = 3
+
+FTS_TRIGGERS = [
+    """CREATE TRIGGER branches_fts_insert AFTER INSERT ON branches BEGIN
+        INSERT INTO branches_fts(rowid, city, district, branch)
+        VALUES (new.rowid, new.city, new.district, new.branch);
+    END""",
+    """CREATE TRIGGER branches_fts_delete AFTER DELETE ON branches BEGIN
+        INSERT INTO branches_fts(branches_fts, rowid, city, district, branch)
+        VALUES ('delete', old.rowid, old.city, old.district, old.branch);
+    END""",
+    """CREATE TRIGGER branches_fts_update AFTER UPDATE ON branches BEGIN
+        INSERT INTO branches_fts(branches_fts, rowid, city, district, branch)
+        VALUES ('delete', old.rowid, old.city, old.district, old.branch);
+        INSERT INTO branches_fts(rowid, city, district, branch)
+        VALUES (new.rowid, new.city, new.district, new.branch);
+    END""",
+]
+FTS_TRIGGER_NAMES = ['branches_fts_insert', 'branches_fts_delete', 'branches_fts_update']
+
+_fts_tables = {}
+
+
+def normalize_term(term):
+    return term.strip().lower()
+
+
+def has_fts(using=DEFAULT_DB_ALIAS):
+    """Whether the trigram table exists on the ``using`` database."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def prefix_filter(queryset, field, term):
+    """Rows whose ``field`` starts with ``term``, ignoring case."""
+    term = normalize_term(term)
+    if connections[queryset.db].vendor != 'sqlite':
+        return queryset.filter(**{f'{field}__istartswith': term})
+    alias = f'_{field}_lower'
+    return queryset.alias(**{alias: Lower(field)}).filter(**{
+        f'{alias}__gte': term,
+        f'{alias}__lt': term + RANGE_END,
+    })
+
+
+def contains_filter(queryset, field, term, fts=None):
+    """Rows whose ``field`` contains ``term``, ignoring case."""
+    term = normalize_term(term)
+    if fts is None:
+        fts = has_fts(queryset.db)
+    if not fts or len(term) < TRIGRAM:
+        return queryset.filter(**{f'{field}__icontains': term})
+    phrase = '"{}"'.format(term.replace('"', '""'))
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[f'"{table}".rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'],
+        params=[f'{field}:{phrase}'],
+    )
+
+
+def search_branches(queryset, terms, match=MATCH_PREFIX, fts=None):
+    """
+    Filter ``queryset`` by every ``{field: term}`` in ``terms``.
+
+    ``match`` is MATCH_PREFIX or MATCH_CONTAINS. Async callers pass ``fts``
+    (from has_fts) so that building the queryset does not touch the database.
+    """
+    if match not in MATCH_MODES:
+        raise ValueError(f'match must be one of {", ".join(MATCH_MODES)}')
+    for field, term in terms.items():
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f'cannot search on {field}')
+        if match == MATCH_PREFIX:
+            queryset = prefix_filter(queryset, field, term)
+        else:
+            if fts is None:
+                fts = has_fts(queryset.db)
+            queryset = contains_filter(queryset, field, term, fts=fts)
+    return queryset
+
+
+def rebuild_fts(using=DEFAULT_DB_ALIAS):
+    """Rebuild the trigram table from the branches table."""
+    if not has_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+@contextmanager
+def fts_suspended(using=DEFAULT_DB_ALIAS):
+    """
+    Drop the sync triggers for the duration of a bulk load, then rebuild.
+
+    Rebuilding once is several times faster than maintaining the index row
+    by row while a full dataset is inserted.
+    """
+    if not has_fts(using):
+        yield
+        return
+    with connections[using].cursor() as cursor:
+        for name in FTS_TRIGGER_NAMES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        with connections[using].cursor() as cursor:
+            for statement in FTS_TRIGGERS:
+                cursor.execute(statement)
+        rebuild_fts(using)
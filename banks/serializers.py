@@ -1,3 +1,6 @@
+from functools import partial
+from operator import itemgetter
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Bank, Branch
 
@@ -32,11 +35,120 @@ class BranchDetailSerializer(serializers.ModelSerializer):
 
 
 class BankWithBranchesSerializer(serializers.ModelSerializer):
-    """Serializer for Bank model with branches."""
-    branches = BranchListSerializer(many=True, read_only=True)
-    branch_count = serializers.IntegerField(source='branches.count', read_only=True)
+    """
+    Serializer for Bank model with branch counts and a capped list of branches.
+    
+    The counts are annotations and ``states``, ``cities`` and ``branch_sample``
+    are attributes set by BankSummaryView, so serializing even the largest bank
+    is a bounded amount of work with no per-branch queries.
+    """
+    branch_count = serializers.IntegerField(read_only=True)
+    state_count = serializers.IntegerField(read_only=True)
+    city_count = serializers.IntegerField(read_only=True)
+    states = serializers.ListField(child=serializers.DictField(), read_only=True)
+    cities = serializers.ListField(child=serializers.DictField(), read_only=True)
+    branches = BranchListSerializer(source='branch_sample', many=True, read_only=True)
     
     class Meta:
         model = Bank
-        fields = ['id', 'name', 'branch_count', 'branches', 'created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'branch_count', 'state_count', 'city_count',
+            'states', 'cities', 'branches', 'created_at', 'updated_at',
+        ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+def datetime_value(value, tzinfo=None):
+    """
+    Render a datetime exactly as DRF's DateTimeField does, in ``tzinfo`` or
+    the current time zone.
+    """
+    if not value:
+        return None
+    value = value.astimezone(tzinfo or timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _render(getters, row, tzinfo):
+    return {
+        name: get(row) if convert is None else convert(get(row), tzinfo)
+        for name, get, convert in getters
+    }
+
+
+class RowSerializer:
+    """
+    Build the payload of a ModelSerializer from ``.values()`` rows.
+
+    ``fields`` lists ``(name, lookup)`` or ``(name, lookup, convert)`` in the
+    output order, where ``convert(value, tzinfo)`` formats the raw value; a
+    nested RowSerializer in place of the lookup renders the related object
+    from ``<name>__<lookup>`` columns. The getters are built once, so
+    rendering a row is a dict lookup per field instead of DRF's per-field
+    ``get_attribute``/``to_representation`` calls, and the current time zone
+    is looked up once per call rather than once per datetime. Each instance
+    must render the same output as the ModelSerializer it mirrors.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.columns = []
+        self.getters = self._compile(fields, '')
+
+    def _compile(self, fields, prefix):
+        getters = []
+        for name, source, *convert in fields:
+            if isinstance(source, RowSerializer):
+                nested = self._compile(source.fields, f'{prefix}{name}__')
+                getters.append((name, lambda row: row, partial(_render, nested)))
+                continue
+            column = prefix + source
+            self.columns.append(column)
+            getters.append((name, itemgetter(column), convert[0] if convert else None))
+        return getters
+
+    def values(self, queryset):
+        """``queryset`` as rows with the columns this serializer reads."""
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row, tzinfo=None):
+        return _render(self.getters, row, tzinfo or timezone.get_current_timezone())
+
+    def serialize(self, rows):
+        tzinfo = timezone.get_current_timezone()
+        return [_render(self.getters, row, tzinfo) for row in rows]
+
+
+# Mirrors BankSerializer
+BANK_ROW = RowSerializer([
+    ('id', 'id'),
+    ('name', 'name'),
+    ('created_at', 'created_at', datetime_value),
+    ('updated_at', 'updated_at', datetime_value),
+])
+
+# Mirrors BranchListSerializer
+BRANCH_LIST_ROW = RowSerializer([
+    ('ifsc', 'ifsc'),
+    ('branch', 'branch'),
+    ('city', 'city'),
+    ('district', 'district'),
+    ('state', 'state'),
+    ('bank_name', 'bank__name'),
+    ('bank_id', 'bank_id'),
+])
+
+# Mirrors BranchDetailSerializer
+BRANCH_DETAIL_ROW = RowSerializer([
+    ('ifsc', 'ifsc'),
+    ('branch', 'branch'),
+    ('address', 'address'),
+    ('city', 'city'),
+    ('district', 'district'),
+    ('state', 'state'),
+    ('bank', BANK_ROW),
+    ('created_at', 'created_at', datetime_value),
+    ('updated_at', 'updated_at', datetime_value),
+])
@@ -0,0 +1,147 @@
+"""
+Response cache shared by every process, on one of Django's CACHES.
+
+The in-process caches of banks.cache are per worker: each one warms its
+own, and is cleared by the first request that sees a newer dataset version
+(see banks.conditional.request_version). With
+``BANKS_SHARED_CACHE['ENABLED']`` the detail, list and search endpoints
+also keep their payloads in ``CACHES[ALIAS]``, Redis or memcached across
+nodes, or a FileBasedCache directory for the workers of one host (see
+CACHE_URL in bank_api/database.py).
+
+Keys are namespaced by the DatasetVersion a request is validated against,
+so the version bump after a data load or a saved row retires every entry at
+once and old entries expire on their own.
+
+A missing key is computed once. Threads of a process wait on a lock for
+the key, and processes that lose the ``cache.add()`` of the key's lock
+entry poll for the value for up to WAIT seconds before computing it
+themselves.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from .cache import MISSING
+
+
+# Seconds between checks for a value another process is computing
+POLL_INTERVAL = 0.02
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_SHARED_CACHE', {})
+    return {
+        'ENABLED': config.get('ENABLED', False),
+        'ALIAS': config.get('ALIAS', 'default'),
+        'TIMEOUT': config.get('TIMEOUT', 3600),
+        'LOCK_TIMEOUT': config.get('LOCK_TIMEOUT', 10),
+        'WAIT': config.get('WAIT', 5),
+    }
+
+
+def make_key(kind, key, version):
+    """Cache key of ``key`` of ``kind`` under the DatasetVersion ``(version, updated_at)``."""
+    number, updated_at = version
+    stamp = int(updated_at.timestamp() * 1000000) if updated_at is not None else 0
+    digest = hashlib.md5(str(key).encode('utf-8')).hexdigest()
+    return f'banks:{number}.{stamp}:{kind}:{digest}'
+
+
+class SharedCache:
+    """Versioned get-or-compute on a Django cache, computing each missing key once."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.version = None
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def observe(self, version):
+        """Record the newest dataset version requests were served under, for stats()."""
+        # Only newer: replicas can lag behind.
+        with self._lock:
+            if self.version is None or version[0] > self.version[0]:
+                self.version = version
+
+    @contextmanager
+    def key_lock(self, key):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_set(self, kind, key, compute, version):
+        """
+        The value cached for ``key`` of ``kind`` under the dataset ``version``,
+        or ``compute()``, cached and returned. None is cached like any other
+        value; values must be picklable.
+        """
+        config = get_config()
+        self.observe(version)
+        cache = caches[config['ALIAS']]
+        cache_key = make_key(kind, key, version)
+        value = cache.get(cache_key, MISSING)
+        if value is not MISSING:
+            self.count('hits')
+            return value
+
+        with self.key_lock(cache_key):
+            value = cache.get(cache_key, MISSING)
+            if value is MISSING:
+                lock_key = f'{cache_key}:lock'
+                if cache.add(lock_key, 1, config['LOCK_TIMEOUT']):
+                    try:
+                        return self.compute(cache, cache_key, compute, config)
+                    finally:
+                        cache.delete(lock_key)
+                value = self.wait(cache, cache_key, config['WAIT'])
+                if value is MISSING:
+                    # The process holding the lock is slow or has died.
+                    return self.compute(cache, cache_key, compute, config)
+            self.count('coalesced')
+            return value
+
+    def compute(self, cache, cache_key, compute, config):
+        value = compute()
+        cache.set(cache_key, value, config['TIMEOUT'])
+        self.count('misses')
+        return value
+
+    def wait(self, cache, cache_key, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = cache.get(cache_key, MISSING)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    def stats(self):
+        config = get_config()
+        with self._lock:
+            return {
+                'enabled': config['ENABLED'],
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'version': self.version[0] if self.version is not None else None,
+            }
+
+
+shared_cache = SharedCache()
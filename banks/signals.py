@@ -0,0 +1,80 @@
+"""
+Signals for keeping derived data in step with the bank and branch tables.
+"""
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from . import autocomplete, facets, geo, snapshot
+from .conditional import schedule_bump
+from .cache import BRANCH_LIST_FRAGMENT, branch_cache, fragment_cache
+from .models import Bank, Branch, DatasetVersion
+from .validators import normalize_ifsc
+
+
+# Sent by the data load commands after a load or refresh has been committed.
+# ``summary`` is the RefreshSummary of a refresh, or None after a full reload.
+# ``swapped`` is True when the load already wrote its facets and its new
+# DatasetVersion: a load into a new SQLite file (see banks.sqlite) or from a
+# pack file (see banks.pack).
+dataset_loaded = Signal()
+
+
+@receiver([post_save, post_delete], sender=Branch)
+def invalidate_branch(sender, instance, using=None, **kwargs):
+    key = normalize_ifsc(instance.ifsc)
+    for cache, cache_key in ((branch_cache, key), (fragment_cache, (BRANCH_LIST_FRAGMENT, key))):
+        cache.delete(cache_key)
+        # A concurrent reader may re-cache the old row before the write commits.
+        transaction.on_commit(partial(cache.delete, cache_key))
+    schedule_bump(using)
+
+
+@receiver([post_save, post_delete], sender=Bank)
+def invalidate_bank(sender, instance, using=None, **kwargs):
+    # Every cached branch payload embeds its bank.
+    for cache in (branch_cache, fragment_cache):
+        cache.clear()
+        transaction.on_commit(cache.clear)
+    schedule_bump(using)
+
+
+@receiver(dataset_loaded)
+def invalidate_dataset(sender, **kwargs):
+    branch_cache.clear()
+    fragment_cache.clear()
+
+
+@receiver(dataset_loaded)
+def rebuild_facets(sender, summary=None, swapped=False, **kwargs):
+    if not swapped and (summary is None or summary.has_changes):
+        facets.rebuild_facets()
+
+
+@receiver(dataset_loaded)
+def swap_snapshot(sender, summary=None, **kwargs):
+    # Other processes pick the new data up on their next fingerprint check.
+    if snapshot.get_config()[0] and (summary is None or summary.has_changes):
+        snapshot.load()
+
+
+# Connected after the facets and the snapshot, so the new version is only
+# visible once the data it describes is in place.
+@receiver(dataset_loaded)
+def bump_dataset_version(sender, summary=None, swapped=False, **kwargs):
+    if not swapped and (summary is None or summary.has_changes):
+        DatasetVersion.bump()
+
+
+# After the bump, so the patched index carries the new version and other
+# requests in this process do not rebuild it from scratch.
+@receiver(dataset_loaded)
+def update_autocomplete(sender, summary=None, **kwargs):
+    if summary is None or summary.has_changes:
+        autocomplete.dataset_changed(summary)
+
+
+@receiver(dataset_loaded)
+def update_geo(sender, summary=None, **kwargs):
+    if summary is None or summary.has_changes:
+        geo.dataset_changed()
@@ -0,0 +1,362 @@
+"""
+Read-only in-memory snapshot of the bank and branch tables.
+
+With ``BANKS_SNAPSHOT['ENABLED']`` the read endpoints answer from a Snapshot
+instead of the database. Branch columns are stored separately (lists of
+strings, with city, district and state interned, and arrays of integers for
+bank positions and timestamps), indexed by IFSC, by bank and by city.
+
+Each process loads the snapshot on first use and checks a fingerprint of
+the tables every ``CHECK_INTERVAL`` seconds; when it changes, a new snapshot
+is built while the old one keeps serving and then swapped in with a single
+assignment. The data load commands swap it immediately in their own process
+(see banks.signals). Snapshots are read from ``BANKS_SNAPSHOT['PACK']``
+instead of the database while that pack holds the same data (see banks.pack).
+"""
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from django.db.models import Count, Max
+from .models import Bank, Branch, DatasetVersion
+from .search import MATCH_PREFIX, RANGE_END, SEARCH_FIELDS, normalize_term
+from .serializers import datetime_value
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+BRANCH_COLUMNS = ('ifsc', 'bank_id', 'branch', 'address', 'city', 'district', 'state', 'created_at', 'updated_at')
+
+
+def to_micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def format_micros(value):
+    """Format a timestamp the way DRF's DateTimeField does."""
+    return datetime_value(EPOCH + timedelta(microseconds=value))
+
+
+def fingerprint(using=None):
+    """Row counts and latest modification times of both tables."""
+    banks = Bank.objects.using(using).order_by().aggregate(count=Count('id'), modified=Max('updated_at'))
+    branches = Branch.objects.using(using).order_by().aggregate(count=Count('ifsc'), modified=Max('updated_at'))
+    return (banks['count'], banks['modified'], branches['count'], branches['modified'])
+
+
+class PayloadList:
+    """A lazy sequence of payloads for row positions, for paginating without building every payload."""
+    __slots__ = ('rows', 'build')
+
+    def __init__(self, rows, build):
+        self.rows = rows
+        self.build = build
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.build(row) for row in self.rows[index]]
+        return self.build(self.rows[index])
+
+
+class Snapshot:
+    """
+    Columnar copy of the bank and branch tables.
+
+    Branch row ``i`` is ``ifsc[i]``, ``branch[i]``, ... ; rows are stored in
+    IFSC order. ``version`` is the DatasetVersion the snapshot was built
+    from, for HTTP validators. ``by_bank`` lists row positions in the endpoints' default
+    order (bank name, then branch name) and ``bank_ranges`` maps a bank id
+    to its slice of it. ``city_keys``/``city_rows`` are row positions sorted
+    by lower-cased city for prefix search.
+    """
+    DATA_SLOTS = (
+        'bank_ids', 'bank_payloads', 'bank_positions',
+        'ifsc', 'bank', 'branch', 'address', 'city', 'district', 'state', 'created_at', 'updated_at',
+        'ifsc_index', 'by_bank', 'bank_ranges', 'city_keys', 'city_rows',
+    )
+    __slots__ = DATA_SLOTS + ('fingerprint', 'version', 'source', 'loaded_at', 'build_seconds', 'nbytes')
+
+    def __init__(self, using=None, pack=None):
+        """
+        Copy the tables of ``using``, or the columns of ``pack``, a Pack (see
+        banks.pack) that holds the same data; the fingerprint and version
+        are read from ``using`` either way.
+        """
+        started = time.perf_counter()
+        # One database for every query, so that they agree with each other.
+        using = using or router.db_for_read(Branch)
+        self.fingerprint = fingerprint(using)
+        self.version = DatasetVersion.current(using)
+        if pack is None:
+            self.source = 'database'
+            self._read_database(using)
+        else:
+            self.source = 'pack'
+            self._read_pack(pack)
+        self._index()
+        self.nbytes = self._measure()
+        self.loaded_at = time.monotonic()
+        self.build_seconds = time.perf_counter() - started
+
+    def _set_banks(self, banks):
+        """Bank columns from ``(id, name, created_at, updated_at)`` in name order, timestamps in microseconds."""
+        self.bank_ids = array('q', [bank[0] for bank in banks])
+        self.bank_positions = {bank_id: position for position, bank_id in enumerate(self.bank_ids)}
+        self.bank_payloads = [
+            {'id': bank_id, 'name': name, 'created_at': format_micros(created), 'updated_at': format_micros(updated)}
+            for bank_id, name, created, updated in banks
+        ]
+
+    def _read_database(self, using):
+        banks = Bank.objects.using(using).order_by('name', 'id').values_list('id', 'name', 'created_at', 'updated_at')
+        self._set_banks([
+            (bank_id, name, to_micros(created), to_micros(updated)) for bank_id, name, created, updated in banks
+        ])
+
+        self.ifsc, self.branch, self.address = [], [], []
+        self.city, self.district, self.state = [], [], []
+        self.bank = array('l')
+        self.created_at, self.updated_at = array('q'), array('q')
+        names = {}
+        intern = lambda value: names.setdefault(value, value)
+        rows = Branch.objects.using(using).order_by('ifsc').values_list(*BRANCH_COLUMNS)
+        for ifsc, bank_id, branch, address, city, district, state, created, updated in rows.iterator(chunk_size=5000):
+            self.ifsc.append(ifsc)
+            self.bank.append(self.bank_positions[bank_id])
+            self.branch.append(branch)
+            self.address.append(address)
+            self.city.append(intern(city))
+            self.district.append(intern(district))
+            self.state.append(intern(state))
+            self.created_at.append(to_micros(created))
+            self.updated_at.append(to_micros(updated))
+
+    def _read_pack(self, pack):
+        # Every string of the pack is decoded once and shared by the rows that use it.
+        strings = pack.strings()
+        pack_banks = list(zip(
+            pack.column('bank.id'), map(strings.__getitem__, pack.column('bank.name')),
+            pack.times('bank.created_at'), pack.times('bank.updated_at'),
+        ))
+        # The pack keeps banks in id order, the snapshot in name order.
+        order = sorted(range(len(pack_banks)), key=lambda index: (pack_banks[index][1], pack_banks[index][0]))
+        self._set_banks([pack_banks[index] for index in order])
+        positions = [0] * len(order)
+        for position, index in enumerate(order):
+            positions[index] = position
+
+        for name in ('ifsc', 'branch', 'address', 'city', 'district', 'state'):
+            setattr(self, name, list(map(strings.__getitem__, pack.column(f'branch.{name}'))))
+        self.bank = array('l', map(positions.__getitem__, pack.column('branch.bank')))
+        self.created_at = pack.times('branch.created_at')
+        self.updated_at = pack.times('branch.updated_at')
+
+    def _index(self):
+        self.ifsc_index = {ifsc: row for row, ifsc in enumerate(self.ifsc)}
+        # Banks are numbered in name order, so sorting by position sorts by bank name.
+        self.by_bank = array('l', sorted(
+            range(len(self.ifsc)), key=lambda row: (self.bank[row], self.branch[row], self.ifsc[row])
+        ))
+        self.bank_ranges = {}
+        for index, row in enumerate(self.by_bank):
+            bank_id = self.bank_ids[self.bank[row]]
+            start, _ = self.bank_ranges.get(bank_id, (index, index))
+            self.bank_ranges[bank_id] = (start, index + 1)
+
+        lowered = {}
+        keys = [lowered.setdefault(city, city.lower()) for city in self.city]
+        city_order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.city_keys = [keys[row] for row in city_order]
+        self.city_rows = array('l', city_order)
+
+    def _measure(self):
+        """Approximate bytes held, counting every shared string once."""
+        seen = set()
+        total = 0
+        for name in self.DATA_SLOTS:
+            container = getattr(self, name)
+            total += sys.getsizeof(container)
+            if isinstance(container, dict):
+                values = list(container.keys()) + list(container.values())
+            elif isinstance(container, list):
+                values = container
+            else:
+                continue
+            for value in values:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        return total
+
+    def __len__(self):
+        return len(self.ifsc)
+
+    def bank_payload(self, bank_id):
+        """BankSerializer payload for ``bank_id``, or None."""
+        position = self.bank_positions.get(bank_id)
+        return dict(self.bank_payloads[position]) if position is not None else None
+
+    def bank_list(self):
+        return [dict(payload) for payload in self.bank_payloads]
+
+    def branch_payload(self, ifsc):
+        """BranchDetailSerializer payload for a normalized IFSC, or None."""
+        row = self.ifsc_index.get(ifsc)
+        if row is None:
+            return None
+        return {
+            'ifsc': self.ifsc[row],
+            'branch': self.branch[row],
+            'address': self.address[row],
+            'city': self.city[row],
+            'district': self.district[row],
+            'state': self.state[row],
+            'bank': dict(self.bank_payloads[self.bank[row]]),
+            'created_at': format_micros(self.created_at[row]),
+            'updated_at': format_micros(self.updated_at[row]),
+        }
+
+    def branch_list_payload(self, row):
+        """BranchListSerializer payload for row position ``row``."""
+        bank = self.bank_payloads[self.bank[row]]
+        return {
+            'ifsc': self.ifsc[row],
+            'branch': self.branch[row],
+            'city': self.city[row],
+            'district': self.district[row],
+            'state': self.state[row],
+            'bank_name': bank['name'],
+            'bank_id': bank['id'],
+        }
+
+    def branch_list(self, bank_id=None):
+        """Lazy BranchListSerializer payloads of all branches, or of one bank's."""
+        if bank_id is None:
+            rows = self.by_bank
+        else:
+            start, end = self.bank_ranges.get(bank_id, (0, 0))
+            rows = self.by_bank[start:end]
+        return PayloadList(rows, self.branch_list_payload)
+
+    def search(self, terms, match=MATCH_PREFIX):
+        """
+        BranchListSerializer payloads matching ``terms`` as search_branches
+        would, or None when the search needs the database (substring match,
+        or no city term to narrow it with the city index).
+        """
+        if match != MATCH_PREFIX or 'city' not in terms:
+            return None
+        prefix = normalize_term(terms['city'])
+        start = bisect_left(self.city_keys, prefix)
+        end = bisect_left(self.city_keys, prefix + RANGE_END, start)
+        rows = self.city_rows[start:end]
+        for field in SEARCH_FIELDS:
+            if field != 'city' and field in terms:
+                column = getattr(self, field)
+                term = normalize_term(terms[field])
+                rows = [row for row in rows if column[row].lower().startswith(term)]
+        rows = sorted(rows, key=lambda row: (self.bank[row], self.branch[row], self.ifsc[row]))
+        return [self.branch_list_payload(row) for row in rows]
+
+    def stats(self):
+        return {
+            'source': self.source,
+            'banks': len(self.bank_ids),
+            'branches': len(self),
+            'bytes': self.nbytes,
+            'bytes_per_branch': round(self.nbytes / len(self)) if len(self) else 0,
+            'build_seconds': round(self.build_seconds, 3),
+            'age_seconds': round(time.monotonic() - self.loaded_at, 1),
+        }
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_SNAPSHOT', {})
+    return config.get('ENABLED', False), config.get('CHECK_INTERVAL', 30)
+
+
+def read_pack(path, using=None):
+    """
+    A Snapshot read from the pack at ``path``, or None when the pack is
+    missing or unreadable, or does not hold the data ``using`` holds.
+    """
+    # banks.pack builds on this module, so it is only imported when used.
+    from .pack import Pack
+    try:
+        with Pack(path) as pack:
+            if pack.fingerprint() != fingerprint(using or router.db_for_read(Branch)):
+                return None
+            return Snapshot(using, pack=pack)
+    except (OSError, ValueError):
+        return None
+
+
+def load(using=None):
+    """
+    Build a snapshot and swap it in: from ``BANKS_SNAPSHOT['PACK']`` when that
+    pack holds the database's data, as after load_pack, and otherwise from
+    the database.
+    """
+    global _snapshot, _checked_at
+    path = getattr(settings, 'BANKS_SNAPSHOT', {}).get('PACK')
+    snapshot = read_pack(path, using) if path else None
+    if snapshot is None:
+        snapshot = Snapshot(using)
+    _snapshot, _checked_at = snapshot, time.monotonic()
+    return snapshot
+
+
+def get_snapshot():
+    """
+    Return the current Snapshot, or None when snapshot serving is disabled.
+
+    Loads the first snapshot, and rebuilds it when the tables' fingerprint
+    has changed since the last check. While one thread rebuilds, the others
+    keep serving the previous snapshot.
+    """
+    global _checked_at
+    enabled, interval = get_config()
+    if not enabled:
+        return None
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < interval:
+        return snapshot
+    if not _lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        snapshot = _snapshot
+        if snapshot is None or fingerprint() != snapshot.fingerprint:
+            snapshot = load()
+        _checked_at = time.monotonic()
+        return snapshot
+    finally:
+        _lock.release()
+
+
+async def aget_snapshot():
+    """Async get_snapshot; only leaves the event loop when a check is due."""
+    enabled, interval = get_config()
+    if not enabled:
+        return None
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - _checked_at >= interval:
+        snapshot = await sync_to_async(get_snapshot)()
+    return snapshot
+
+
+def discard():
+    global _snapshot
+    _snapshot = None
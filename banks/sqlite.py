@@ -0,0 +1,139 @@
+"""
+SQLite tuning for serving reads, and reloads that swap in a new file.
+
+Every SQLite connection gets ``BANKS_SQLITE['PRAGMAS']`` when it opens. The
+defaults switch the file to WAL journaling, so readers keep reading while a
+load writes, with ``synchronous=NORMAL`` (durable at each checkpoint rather
+than each commit), a 64 MiB page cache and memory-mapped reads. Serving
+processes can set ``QUERY_ONLY`` to refuse writes, and open the file with
+``immutable=1`` (``DATABASE_URL=sqlite:////path/db.sqlite3?immutable=1``),
+which skips all locking, as long as every load uses ``load_real_data --swap``.
+
+swap_load() runs a load against a copy of the database and then points the
+database path, a symbolic link, at the copy with one rename. Connections
+that are already open keep reading the previous file (SQLite resolves the
+link, so each file has its own WAL), and new connections open the new one.
+"""
+import glob
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -65536,  # Negative sizes are in KiB
+    'mmap_size': 268435456,
+    'temp_store': 'memory',
+    'busy_timeout': 5000,  # Milliseconds
+}
+# Previous files kept after a swap, for connections still reading them
+KEEP_PREVIOUS = 1
+
+
+def get_config():
+    config = getattr(settings, 'BANKS_SQLITE', {})
+    return {
+        'PRAGMAS': config.get('PRAGMAS', DEFAULT_PRAGMAS),
+        'QUERY_ONLY': config.get('QUERY_ONLY', False),
+    }
+
+
+def database_path(settings_dict):
+    """Filesystem path of a SQLite database, or None when it is in memory."""
+    name = str(settings_dict['NAME'])
+    if name.startswith('file:'):
+        parts = urlsplit(name)
+        if 'mode=memory' in parts.query:
+            return None
+        name = parts.path
+    return None if name in ('', ':memory:') else name
+
+
+def is_immutable(settings_dict):
+    name = str(settings_dict['NAME'])
+    return name.startswith('file:') and 'immutable=1' in urlsplit(name).query
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    config = get_config()
+    pragmas = dict(config['PRAGMAS'])
+    if config['QUERY_ONLY'] or is_immutable(connection.settings_dict):
+        # The journal mode is stored in the file; only writers set it.
+        pragmas.pop('journal_mode', None)
+    if config['QUERY_ONLY']:
+        pragmas['query_only'] = 1
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def database_alias(alias, name, template=DEFAULT_DB_ALIAS):
+    """A temporary connection alias for the SQLite file ``name``, configured like ``template``."""
+    connections.settings[alias] = {**connections[template].settings_dict, 'NAME': name}
+    try:
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def swap_load(load, using=DEFAULT_DB_ALIAS):
+    """
+    Copy the ``using`` database to a new file, call ``load(alias)`` with a
+    connection alias for the copy, and swap the copy in. Writes made to the
+    database between the copy and the swap are lost, so nothing else should
+    write during a swap load. Returns what ``load`` returns.
+    """
+    connection = connections[using]
+    path = database_path(connection.settings_dict)
+    if connection.vendor != 'sqlite' or path is None:
+        raise ValueError('Only file-based SQLite databases can be swapped')
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    # Versions are named by time to the microsecond, so they sort in order.
+    now = time.time_ns() // 1000
+    target = os.path.join(directory, f'{name}.{time.strftime("%Y%m%d%H%M%S", time.localtime(now // 1000000))}{now % 1000000:06d}')
+
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM INTO %s', [target])
+    with database_alias(f'{using}_swap', target, using) as alias:
+        result = load(alias)
+        # Fold the WAL back into the file, so it is complete on its own.
+        with connections[alias].cursor() as cursor:
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    link = os.path.join(directory, f'.{name}.swap')
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(target), link)
+    os.replace(link, path)
+    connection.close()
+    remove_previous(path, target)
+    return result
+
+
+def remove_previous(path, current):
+    """Delete the files replaced by earlier swaps, keeping the newest KEEP_PREVIOUS."""
+    previous = sorted(
+        (candidate for candidate in glob.glob(f'{glob.escape(path)}.*')
+         if candidate != current and candidate[len(path) + 1:].isdigit()),
+        reverse=True,
+    )
+    stale = [filename + suffix for filename in previous[KEEP_PREVIOUS:] for suffix in ('', '-wal', '-shm')]
+    if previous:
+        # The plain file replaced by the first swap had a WAL named after the link.
+        stale += [path + '-wal', path + '-shm']
+    for filename in stale:
+        if os.path.exists(filename):
+            os.remove(filename)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # API overview
@@ -9,9 +9,34 @@ urlpatterns = [
     path('banks/', views.BankListView.as_view(), name='bank-list'),
     path('banks/<int:id>/', views.BankDetailView.as_view(), name='bank-detail'),
     path('banks/<int:bank_id>/branches/', views.BankBranchesView.as_view(), name='bank-branches'),
+    path('banks/<int:id>/summary/', views.BankSummaryView.as_view(), name='bank-summary'),
+    path('banks/by-code/<str:code>/', views.bank_by_code, name='bank-by-code'),
     
     # Branches endpoints - put search before the IFSC detail endpoint
     path('branches/', views.BranchListView.as_view(), name='branch-list'),
     path('branches/search/', views.branch_search, name='branch-search'),
+    path('branches/export/', views.branch_export, name='branch-export'),
+    path('branches/batch/', views.branch_batch_lookup, name='branch-batch'),
+    path('branches/nearby/', views.branch_nearby, name='branch-nearby'),
     path('branches/<str:ifsc>/', views.BranchDetailView.as_view(), name='branch-detail'),
+    
+    # Facets for dropdowns, precomputed at load time
+    path('facets/banks/', views.bank_facets, name='facet-banks'),
+    path('facets/states/', views.state_facets, name='facet-states'),
+    path('facets/districts/', views.district_facets, name='facet-districts'),
+    path('facets/cities/', views.city_facets, name='facet-cities'),
+    
+    # Typo-tolerant autocomplete from an in-memory index
+    path('autocomplete/', views.autocomplete_suggestions, name='autocomplete'),
+    
+    # Cache, snapshot and profiling statistics
+    path('cache/stats/', views.cache_stats, name='cache-stats'),
+    path('snapshot/stats/', views.snapshot_stats, name='snapshot-stats'),
+    path('metrics/', views.request_metrics, name='request-metrics'),
+    
+    # Async read endpoints for ASGI deployments
+    path('async/banks/', async_views.bank_list, name='async-bank-list'),
+    path('async/banks/<int:id>/', async_views.bank_detail, name='async-bank-detail'),
+    path('async/branches/search/', async_views.branch_search, name='async-branch-search'),
+    path('async/branches/<str:ifsc>/', async_views.branch_detail, name='async-branch-detail'),
 ]
@@ -0,0 +1,45 @@
+"""
+Validation helpers for IFSC codes.
+
+An IFSC is 11 characters: a 4-letter bank code, a literal 0, then a
+6-character alphanumeric branch code. Lookups check the structure first, so
+malformed codes are answered without touching the cache or the database.
+"""
+import re
+
+
+IFSC_RE = re.compile(r'^[A-Z]{4}0[A-Z0-9]{6}$')
+BANK_CODE_RE = re.compile(r'^[A-Z]{4}$')
+# The start of an IFSC: part of the bank code, or the bank code, the 0 and part of the branch code
+IFSC_PREFIX_RE = re.compile(r'^(?:[A-Z]{1,4}|[A-Z]{4}0[A-Z0-9]{0,6})$')
+
+
+def normalize_ifsc(ifsc):
+    """IFSC codes are stored upper-case; accept any case and stray whitespace."""
+    return ifsc.strip().upper()
+
+
+def is_valid_ifsc(ifsc):
+    """Whether an already normalized code has the structure of an IFSC."""
+    return IFSC_RE.match(ifsc) is not None
+
+
+def is_valid_bank_code(code):
+    """Whether an already normalized code has the structure of the first four characters of an IFSC."""
+    return BANK_CODE_RE.match(code) is not None
+
+
+def parse_ifsc_prefix(prefix):
+    """Normalize the start of an IFSC, raising ValueError if no IFSC could start with it."""
+    prefix = normalize_ifsc(prefix)
+    if IFSC_PREFIX_RE.match(prefix) is None:
+        raise ValueError(prefix)
+    return prefix
+
+
+def prefix_range(prefix):
+    """
+    ``(start, end)`` such that the codes starting with ``prefix`` are those
+    with ``start <= code < end``, a range scan of an index on the codes.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
@@ -1,12 +1,55 @@
+from datetime import datetime, time, timezone as dt_timezone
 from rest_framework import generics, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.utils.decorators import method_decorator
+from django.urls import reverse
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, quote_etag
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from . import autocomplete, facets, geo, profiling, snapshot
+from .cache import (
+    BANK_FRAGMENT,
+    BRANCH_LIST_FRAGMENT,
+    branch_cache,
+    get_bank_payload,
+    get_branch_payloads,
+    get_fragments,
+)
+from .conditional import (
+    autocomplete_conditional,
+    bank_conditional,
+    branch_conditional,
+    check_version,
+    dataset_conditional,
+    facet_conditional,
+    geo_conditional,
+    public_cache,
+    request_branch_payload,
+    request_data,
+    request_payload,
+    search_conditional,
+)
+from .export import EXPORTERS, CSVRenderer, NDJSONRenderer, export_etag, export_queryset
+from .filters import BranchFilterSet, FilterBackend, FilterError
 from .models import Bank, Branch
+from .pagination import KeysetPaginationMixin
+from .permissions import OperationsPermission
+from .renderers import FragmentList
+from .search import MATCH_MODES, MATCH_PREFIX, SEARCH_FIELDS, search_branches
+from .shared_cache import shared_cache
+from .validators import is_valid_bank_code, is_valid_ifsc, normalize_ifsc
 from .serializers import (
+    BANK_ROW,
+    BRANCH_LIST_ROW,
     BankSerializer, 
     BankWithBranchesSerializer,
     BranchListSerializer, 
@@ -14,6 +57,7 @@ from .serializers import (
 )
 
 
+@method_decorator(dataset_conditional, name='dispatch')
 class BankListView(generics.ListAPIView):
     """
     List all banks.
@@ -23,7 +67,18 @@ class BankListView(generics.ListAPIView):
     queryset = Bank.objects.all()
     serializer_class = BankSerializer
 
+    def list(self, request, *args, **kwargs):
+        current = snapshot.get_snapshot()
+        if current is not None:
+            return self.get_paginated_response(self.paginate_queryset(current.bank_list()))
+        return Response(request_data(request, 'bank-list', self.build_page))
+    
+    def build_page(self):
+        page = self.paginate_queryset(BANK_ROW.values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(get_fragments(BANK_FRAGMENT, 'id', page, BANK_ROW)).data
+
 
+@method_decorator(bank_conditional, name='dispatch')
 class BankDetailView(generics.RetrieveAPIView):
     """
     Retrieve a specific bank.
@@ -34,30 +89,137 @@ class BankDetailView(generics.RetrieveAPIView):
     serializer_class = BankSerializer
     lookup_field = 'id'
 
+    def retrieve(self, request, *args, **kwargs):
+        payload = request_payload(request, get_bank_payload, kwargs[self.lookup_field])
+        if payload is None:
+            raise NotFound()
+        return Response(payload)
 
-class BankBranchesView(generics.ListAPIView):
+
+@method_decorator(dataset_conditional, name='dispatch')
+class BankSummaryView(generics.RetrieveAPIView):
+    """
+    Summarize a specific bank.
+    
+    Returns the bank with its branch, state and city counts, branch counts per
+    state and for its largest cities, and the first branches by IFSC. The full
+    branch list is available, paginated, at branches_url.
+    """
+    serializer_class = BankWithBranchesSerializer
+    lookup_field = 'id'
+    default_branch_limit = 20
+    default_city_limit = 20
+    max_limit = 100
+    
+    def get_queryset(self):
+        return Bank.objects.annotate(
+            branch_count=Count('branches'),
+            state_count=Count('branches__state', distinct=True),
+            city_count=Count('branches__city', distinct=True),
+        )
+    
+    def get_limit(self, name, default):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            value = default
+        return max(0, min(value, self.max_limit))
+    
+    def get_object(self):
+        bank = super().get_object()
+        branches = bank.branches.order_by()
+        bank.states = list(
+            branches.values('state').annotate(branch_count=Count('ifsc')).order_by('-branch_count', 'state')
+        )
+        bank.cities = list(
+            branches.values('city', 'state').annotate(branch_count=Count('ifsc'))
+            .order_by('-branch_count', 'city', 'state')[:self.get_limit('city_limit', self.default_city_limit)]
+        )
+        # The reverse manager attaches ``bank`` to each branch, so bank_name needs no extra query.
+        bank.branch_sample = list(
+            bank.branches.order_by('ifsc')[:self.get_limit('branch_limit', self.default_branch_limit)]
+        )
+        return bank
+    
+    def retrieve(self, request, *args, **kwargs):
+        return Response(request_data(request, 'bank-summary', lambda: self.build_summary(request, kwargs)))
+    
+    def build_summary(self, request, kwargs):
+        data = self.get_serializer(self.get_object()).data
+        url = reverse('bank-branches', kwargs={'bank_id': kwargs[self.lookup_field]})
+        data['branches_url'] = request.build_absolute_uri(f'{url}?pagination=cursor')
+        return data
+
+
+class BranchRowListMixin(KeysetPaginationMixin):
+    """
+    List branches from the snapshot when it is enabled and the view's
+    get_snapshot_rows() returns them, and otherwise from ``.values()`` rows
+    rendered by BRANCH_LIST_ROW instead of model instances and
+    BranchListSerializer, reusing cached fragments of rows seen before.
+    Filtered or sorted lists (see banks.filters) always use the database.
+    """
+    filter_backends = [FilterBackend]
+    filterset_class = BranchFilterSet
+    
+    def get_snapshot_rows(self, current):
+        """Payloads of the unfiltered list in ``current``, or None to list from the database."""
+        return None
+    
+    def list(self, request, *args, **kwargs):
+        filterset = FilterBackend().get_filterset(request, self)
+        if self.keyset_requested and filterset.ordering():
+            raise FilterError('ordering is not supported with pagination=cursor, which is in IFSC order')
+        current = snapshot.get_snapshot()
+        if current is not None and not self.keyset_requested and not filterset.is_active():
+            rows = self.get_snapshot_rows(current)
+            if rows is not None:
+                return self.get_paginated_response(self.paginate_queryset(rows))
+        return Response(request_data(request, 'branch-list', self.build_page))
+    
+    def build_page(self):
+        page = self.paginate_queryset(BRANCH_LIST_ROW.values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(get_fragments(BRANCH_LIST_FRAGMENT, 'ifsc', page, BRANCH_LIST_ROW)).data
+
+
+@method_decorator(dataset_conditional, name='dispatch')
+class BankBranchesView(BranchRowListMixin, generics.ListAPIView):
     """
     List all branches for a specific bank.
     
-    Returns a paginated list of all branches belonging to a specific bank.
+    Returns a paginated list of all branches belonging to a specific bank,
+    optionally filtered by state, district and city and sorted with ordering.
+    Pass pagination=cursor for keyset pagination ordered by IFSC.
     """
     serializer_class = BranchListSerializer
+    filterset_exclude = ('bank',)
     
     def get_queryset(self):
         bank_id = self.kwargs['bank_id']
-        return Branch.objects.filter(bank_id=bank_id).select_related('bank')
+        return Branch.objects.filter(bank_id=bank_id)
+    
+    def get_snapshot_rows(self, current):
+        return current.branch_list(self.kwargs['bank_id'])
 
 
-class BranchListView(generics.ListAPIView):
+@method_decorator(dataset_conditional, name='dispatch')
+class BranchListView(BranchRowListMixin, generics.ListAPIView):
     """
     List all branches.
     
-    Returns a paginated list of all branches in the system with basic information.
+    Returns a paginated list of all branches in the system with basic information,
+    optionally filtered by bank, state, district and city and sorted with ordering.
+    Pass pagination=cursor for keyset pagination ordered by IFSC, which has no
+    count query and a constant cost per page.
     """
-    queryset = Branch.objects.select_related('bank').all()
+    queryset = Branch.objects.all()
     serializer_class = BranchListSerializer
+    
+    def get_snapshot_rows(self, current):
+        return current.branch_list()
 
 
+@method_decorator(branch_conditional, name='dispatch')
 class BranchDetailView(generics.RetrieveAPIView):
     """
     Retrieve a specific branch.
@@ -68,12 +230,30 @@ class BranchDetailView(generics.RetrieveAPIView):
     serializer_class = BranchDetailSerializer
     lookup_field = 'ifsc'
 
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the snapshot or the IFSC cache; the ORM is only hit on a cache miss,
+        # and malformed codes are answered without either.
+        payload = request_branch_payload(request, kwargs[self.lookup_field])
+        if payload is None:
+            raise NotFound()
+        return Response(payload)
+
 
 @swagger_auto_schema(
     method='get',
     manual_parameters=[
         openapi.Parameter('ifsc', openapi.IN_QUERY, description="Search by IFSC code", type=openapi.TYPE_STRING),
-        openapi.Parameter('city', openapi.IN_QUERY, description="Search by city name", type=openapi.TYPE_STRING),
+        openapi.Parameter(
+            'city', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+            description="Search by city name. Matched as a prefix unless match=contains; earlier versions "
+                        "matched a substring by default",
+        ),
+        openapi.Parameter('district', openapi.IN_QUERY, description="Search by district name", type=openapi.TYPE_STRING),
+        openapi.Parameter('branch', openapi.IN_QUERY, description="Search by branch name", type=openapi.TYPE_STRING),
+        openapi.Parameter(
+            'match', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(MATCH_MODES), default=MATCH_PREFIX,
+            description="How city, district and branch are matched: case-insensitive prefix (default) or substring",
+        ),
     ],
     responses={
         200: openapi.Response(
@@ -100,45 +280,523 @@ class BranchDetailView(generics.RetrieveAPIView):
         404: "Not Found - No branches found"
     }
 )
+@search_conditional
 @api_view(['GET'])
 def branch_search(request):
     """
-    Search branches by IFSC code or city.
+    Search branches by IFSC code, city, district or branch name.
     
-    Search for branches using either IFSC code (exact match) or city name (partial match).
-    At least one search parameter (ifsc or city) must be provided.
+    Search for branches using either IFSC code (exact match) or any combination of
+    city, district and branch name. Names are matched case-insensitively by prefix,
+    or by substring with match=contains. City used to match a substring by default;
+    clients relying on that must now pass match=contains. At least one search
+    parameter must be provided.
     """
     ifsc = request.GET.get('ifsc')
-    city = request.GET.get('city')
+    terms = {
+        field: request.GET[field]
+        for field in SEARCH_FIELDS
+        if request.GET.get(field, '').strip()
+    }
+    match = request.GET.get('match', MATCH_PREFIX)
     
-    if not ifsc and not city:
+    if not ifsc and not terms:
         return Response(
-            {'error': 'Please provide either ifsc or city parameter'}, 
+            {'error': f'Please provide one of: {", ".join(("ifsc",) + SEARCH_FIELDS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if match not in MATCH_MODES:
+        return Response(
+            {'error': f'match must be one of: {", ".join(MATCH_MODES)}'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    queryset = Branch.objects.select_related('bank')
-    
+    # If searching by IFSC, return single result
     if ifsc:
-        queryset = queryset.filter(ifsc__iexact=ifsc)
-    elif city:
-        queryset = queryset.filter(city__icontains=city)
+        payload = request_branch_payload(request, ifsc)
+        if payload is None:
+            return Response(
+                {'message': 'No branches found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({'branch': payload})
     
-    if not queryset.exists():
+    current = snapshot.get_snapshot()
+    results = current.search(terms, match) if current is not None else None
+    if results is None:
+        def build():
+            branches = search_branches(Branch.objects.all(), terms, match)
+            return get_fragments(BRANCH_LIST_FRAGMENT, 'ifsc', BRANCH_LIST_ROW.values(branches), BRANCH_LIST_ROW)
+        results = request_data(request, 'branch-search', build)
+    
+    if not results:
         return Response(
             {'message': 'No branches found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # If searching by IFSC, return single result
-    if ifsc:
-        branch = queryset.first()
-        serializer = BranchDetailSerializer(branch)
-        return Response({'branch': serializer.data})
+    # If searching by name, return list of results
+    return Response({'branches': results})
+
+
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['ifsc'],
+        properties={
+            'ifsc': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+        },
+    ),
+    responses={
+        200: openapi.Response(
+            description="One result per submitted code, in request order",
+            examples={
+                "application/json": {
+                    "count": 3,
+                    "found": 1,
+                    "not_found": 1,
+                    "invalid": 1,
+                    "results": [
+                        {"ifsc": "SBIN0000001", "status": "found", "branch": {"ifsc": "SBIN0000001", "branch": "Mumbai Main Branch"}},
+                        {"ifsc": "SBIN0999999", "status": "not_found"},
+                        {"ifsc": "12345", "status": "invalid"}
+                    ]
+                }
+            }
+        ),
+        400: "Bad Request - Missing or too many IFSC codes",
+    }
+)
+@api_view(['POST'])
+def branch_batch_lookup(request):
+    """
+    Look up many branches by IFSC code at once.
     
-    # If searching by city, return list of results
-    serializer = BranchListSerializer(queryset, many=True)
-    return Response({'branches': serializer.data})
+    Accepts {"ifsc": [...]} with up to BANKS_BATCH_LOOKUP_MAX codes and resolves them
+    with a single query. Each code gets a result with status found, not_found or invalid.
+    """
+    limit = getattr(settings, 'BANKS_BATCH_LOOKUP_MAX', 1000)
+    codes = request.data.get('ifsc') if isinstance(request.data, dict) else None
+    
+    if not isinstance(codes, list) or not codes:
+        return Response(
+            {'error': 'Please provide a non-empty list of IFSC codes in the ifsc field'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(codes) > limit:
+        return Response(
+            {'error': f'At most {limit} IFSC codes can be looked up per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    normalized = [
+        normalize_ifsc(code) if isinstance(code, str) else None
+        for code in codes
+    ]
+    valid = {code for code in normalized if code is not None and is_valid_ifsc(code)}
+    check_version(request)
+    payloads = get_branch_payloads(sorted(valid))
+    
+    results = FragmentList()
+    counts = {'found': 0, 'not_found': 0, 'invalid': 0}
+    for code, key in zip(codes, normalized):
+        if key not in valid:
+            result = {'ifsc': code, 'status': 'invalid'}
+        elif payloads[key] is None:
+            result = {'ifsc': code, 'status': 'not_found'}
+        else:
+            result = {'ifsc': code, 'status': 'found', 'branch': payloads[key]}
+        counts[result['status']] += 1
+        results.append(result)
+    
+    return Response({'count': len(results), **counts, 'results': results})
+
+
+def parse_since(value):
+    """Parse an ISO 8601 date or datetime; naive values are taken as UTC."""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('format', openapi.IN_QUERY, description="Output format", type=openapi.TYPE_STRING, enum=list(EXPORTERS), default='ndjson'),
+        openapi.Parameter('bank', openapi.IN_QUERY, description="Only branches of this bank id", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('state', openapi.IN_QUERY, description="Only branches in this state", type=openapi.TYPE_STRING),
+        openapi.Parameter('since', openapi.IN_QUERY, description="Only branches updated at or after this ISO 8601 date or datetime", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: "Stream of branches, one per line (NDJSON) or row (CSV), ordered by IFSC",
+        304: "Not Modified - the export has not changed since the given ETag or date",
+        400: "Bad Request - Invalid filter value",
+    }
+)
+@public_cache
+@api_view(['GET'])
+@renderer_classes([NDJSONRenderer, CSVRenderer])
+def branch_export(request):
+    """
+    Export all branches.
+    
+    Streams every branch, optionally filtered by bank, state or last update, as
+    NDJSON (default) or CSV. Responses carry ETag and Last-Modified headers so an
+    unchanged export can be revalidated with a 304.
+    """
+    bank = request.GET.get('bank')
+    state = request.GET.get('state')
+    since = request.GET.get('since')
+    
+    try:
+        bank = int(bank) if bank else None
+        since = parse_since(since) if since else None
+    except ValueError:
+        return Response(
+            {'error': 'bank must be an integer and since an ISO 8601 date or datetime'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    fmt = request.accepted_renderer.format
+    queryset = export_queryset(bank_id=bank, state=state, since=since)
+    etag, last_modified = export_etag(queryset, fmt)
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    response = StreamingHttpResponse(
+        EXPORTERS[fmt](queryset),
+        content_type=f'{request.accepted_renderer.media_type}; charset=utf-8'
+    )
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if fmt == 'csv':
+        response['Content-Disposition'] = 'attachment; filename="branches.csv"'
+    return response
+
+
+@facet_conditional
+@api_view(['GET'])
+def bank_facets(request):
+    """
+    Branch counts per bank.
+    
+    Served from precomputed facets rebuilt by the data load commands.
+    """
+    return Response({'banks': facets.get_snapshot().banks})
+
+
+@facet_conditional
+@api_view(['GET'])
+def state_facets(request):
+    """
+    Distinct states with their branch counts.
+    
+    Served from precomputed facets rebuilt by the data load commands.
+    """
+    return Response({'states': facets.get_snapshot().states})
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('state', openapi.IN_QUERY, description="Only districts in this state", type=openapi.TYPE_STRING),
+    ]
+)
+@facet_conditional
+@api_view(['GET'])
+def district_facets(request):
+    """
+    Distinct districts with their branch counts.
+    
+    Served from precomputed facets rebuilt by the data load commands.
+    """
+    state = request.GET.get('state') or None
+    return Response({'districts': facets.get_snapshot().get_districts(state)})
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('state', openapi.IN_QUERY, description="Only cities in this state", type=openapi.TYPE_STRING),
+        openapi.Parameter('district', openapi.IN_QUERY, description="Only cities in this district", type=openapi.TYPE_STRING),
+    ]
+)
+@facet_conditional
+@api_view(['GET'])
+def city_facets(request):
+    """
+    Distinct cities with their branch counts.
+    
+    Served from precomputed facets rebuilt by the data load commands.
+    """
+    state = request.GET.get('state') or None
+    district = request.GET.get('district') or None
+    return Response({'cities': facets.get_snapshot().get_cities(state, district)})
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(
+            description="The banks whose IFSCs start with the code, largest first",
+            examples={
+                "application/json": {
+                    "code": "HDFC",
+                    "banks": [{"id": 2, "name": "HDFC Bank", "branch_count": 5234}],
+                    "branches_url": "http://localhost:8000/api/branches/?ifsc_prefix=HDFC0&pagination=cursor"
+                }
+            }
+        ),
+        400: "Bad Request - The code is not four letters",
+        404: "Not Found - No branch has an IFSC starting with the code",
+    }
+)
+@facet_conditional
+@api_view(['GET'])
+def bank_by_code(request, code):
+    """
+    Find the bank of a bank code.
+    
+    The code is the first four letters of an IFSC. Served from precomputed facets
+    rebuilt by the data load commands; branches_url lists the code's branches in
+    IFSC order.
+    """
+    code = normalize_ifsc(code)
+    if not is_valid_bank_code(code):
+        return Response(
+            {'error': 'code must be the four letters an IFSC starts with'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    banks = facets.get_snapshot().get_banks_by_code(code)
+    if not banks:
+        return Response({'message': 'No bank found'}, status=status.HTTP_404_NOT_FOUND)
+    url = reverse('branch-list')
+    return Response({
+        'code': code,
+        'banks': banks,
+        'branches_url': request.build_absolute_uri(f'{url}?ifsc_prefix={code}0&pagination=cursor'),
+    })
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Text typed so far", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=10,
+            description=f"Number of suggestions, at most {autocomplete.MAX_LIMIT}",
+        ),
+        openapi.Parameter(
+            'types', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+            description=f"Comma-separated kinds to suggest: {', '.join(autocomplete.KINDS)} (default: all)",
+        ),
+    ],
+    responses={
+        200: openapi.Response(
+            description="Suggestions, best first",
+            examples={
+                "application/json": {
+                    "query": "hdfc kora",
+                    "suggestions": [
+                        {
+                            "type": "branch",
+                            "text": "KORAMANGALA",
+                            "ifsc": "HDFC0000053",
+                            "bank": "HDFC Bank",
+                            "city": "BANGALORE"
+                        }
+                    ]
+                }
+            }
+        ),
+        400: "Bad Request - Missing q or unknown types"
+    }
+)
+@autocomplete_conditional
+@api_view(['GET'])
+def autocomplete_suggestions(request):
+    """
+    Suggestions for a bank, city, district or branch name as it is typed.
+    
+    Every word is matched as a prefix, or within one or two typos when it
+    matches nothing; a branch also matches its bank and city names. Served
+    from an in-memory index, see banks.autocomplete.
+    """
+    query = request.GET.get('q', '')
+    if not query.strip():
+        return Response({'error': 'Please provide the q parameter'}, status=status.HTTP_400_BAD_REQUEST)
+    types = request.GET.get('types')
+    kinds = [kind.strip() for kind in types.split(',') if kind.strip()] if types else autocomplete.KINDS
+    unknown = sorted(set(kinds) - set(autocomplete.KINDS))
+    if unknown:
+        return Response(
+            {'error': f'types must be a comma-separated list of: {", ".join(autocomplete.KINDS)}'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, autocomplete.MAX_LIMIT))
+    return Response({'query': query, 'suggestions': autocomplete.get_index().search(query, limit, kinds)})
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('lat', openapi.IN_QUERY, description="Latitude in degrees", type=openapi.TYPE_NUMBER, required=True),
+        openapi.Parameter('lon', openapi.IN_QUERY, description="Longitude in degrees", type=openapi.TYPE_NUMBER, required=True),
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=10,
+            description=f"Number of branches, at most {geo.MAX_LIMIT}",
+        ),
+        openapi.Parameter(
+            'radius_km', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+            description="Only branches within this many kilometres",
+        ),
+    ],
+    responses={
+        200: openapi.Response(
+            description="Branches, nearest first",
+            examples={
+                "application/json": {
+                    "count": 1,
+                    "branches": [
+                        {
+                            "ifsc": "SBIN0000001",
+                            "branch": "Mumbai Main Branch",
+                            "city": "Mumbai",
+                            "district": "Mumbai",
+                            "state": "Maharashtra",
+                            "bank_name": "State Bank of India",
+                            "bank_id": 1,
+                            "latitude": 18.9388,
+                            "longitude": 72.8354,
+                            "distance_km": 1.204
+                        }
+                    ]
+                }
+            }
+        ),
+        400: "Bad Request - Missing or invalid coordinates or radius"
+    }
+)
+@geo_conditional
+@api_view(['GET'])
+def branch_nearby(request):
+    """
+    Branches nearest to a point.
+    
+    Returns up to limit branches nearest to lat and lon, optionally only those
+    within radius_km, with their distance in kilometres. Only branches located
+    by the data load commands' gazetteer are found; served from an in-memory
+    spatial index, see banks.geo.
+    """
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+    except (KeyError, ValueError):
+        lat = lon = None
+    if lat is None or not geo.valid_coordinates(lat, lon):
+        return Response(
+            {'error': 'Please provide lat and lon in degrees'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    radius = request.GET.get('radius_km')
+    if radius:
+        try:
+            radius = float(radius)
+        except ValueError:
+            radius = -1
+        if not radius > 0:
+            return Response(
+                {'error': 'radius_km must be a positive number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    else:
+        radius = None
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, geo.MAX_LIMIT))
+    branches = geo.get_index().nearest(lat, lon, limit, radius)
+    return Response({'count': len(branches), 'branches': branches})
+
+
+@api_view(['GET'])
+@permission_classes([OperationsPermission])
+def cache_stats(request):
+    """
+    IFSC lookup cache statistics.
+    
+    Returns hit and miss counters and the current size of the IFSC lookup cache,
+    and under shared the counters of this process's use of the shared cache.
+    """
+    return Response({**branch_cache.stats(), 'shared': shared_cache.stats()})
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(
+            description="Snapshot size and age",
+            examples={
+                "application/json": {
+                    "enabled": True,
+                    "source": "database",
+                    "banks": 170,
+                    "branches": 127857,
+                    "bytes": 61000000,
+                    "bytes_per_branch": 477,
+                    "build_seconds": 2.1,
+                    "age_seconds": 12.5
+                }
+            }
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([OperationsPermission])
+def snapshot_stats(request):
+    """
+    In-memory snapshot statistics.
+    
+    Returns whether the read endpoints are served from the snapshot and, if so,
+    whether it was read from the database or a pack file, its row counts,
+    approximate memory use per branch and age.
+    """
+    current = snapshot.get_snapshot()
+    if current is None:
+        return Response({'enabled': False})
+    return Response({'enabled': True, **current.stats()})
+
+
+@api_view(['GET'])
+@permission_classes([OperationsPermission])
+def request_metrics(request):
+    """
+    Request profiling metrics.
+    
+    Returns per-view histograms of time spent in the database, serialization and
+    rendering, and of query counts and response sizes, when BANKS_PROFILING is
+    enabled. The counters are per process and reset on restart.
+    """
+    if not profiling.get_config()['ENABLED']:
+        return Response({'enabled': False})
+    return Response({'enabled': True, 'views': profiling.metrics.as_dict()})
 
 
 @swagger_auto_schema(
@@ -151,13 +809,27 @@ def branch_search(request):
                     "Banks": {
                         "List all banks": "/api/banks/",
                         "Bank details": "/api/banks/{id}/",
-                        "Bank branches": "/api/banks/{id}/branches/"
+                        "Bank branches": "/api/banks/{id}/branches/",
+                        "Bank summary": "/api/banks/{id}/summary/"
                     },
                     "Branches": {
                         "List all branches": "/api/branches/",
                         "Branch details": "/api/branches/{id}/",
                         "Search by IFSC": "/api/branches/search/?ifsc={ifsc_code}",
-                        "Search by city": "/api/branches/search/?city={city_name}"
+                        "Search by city": "/api/branches/search/?city={city_name}",
+                        "Batch IFSC lookup (POST)": "/api/branches/batch/"
+                    },
+                    "Facets": {
+                        "Branch counts per bank": "/api/facets/banks/",
+                        "States": "/api/facets/states/",
+                        "Districts": "/api/facets/districts/?state={state}",
+                        "Cities": "/api/facets/cities/?state={state}&district={district}"
+                    },
+                    "Async (ASGI)": {
+                        "List all banks": "/api/async/banks/",
+                        "Bank details": "/api/async/banks/{id}/",
+                        "Branch details": "/api/async/branches/{ifsc_code}/",
+                        "Search": "/api/async/branches/search/?city={city_name}"
                     }
                 }
             }
@@ -175,13 +847,35 @@ def api_overview(request):
         'Banks': {
             'List all banks': '/api/banks/',
             'Bank details': '/api/banks/{id}/',
-            'Bank branches': '/api/banks/{id}/branches/'
+            'Bank branches': '/api/banks/{id}/branches/',
+            'Bank summary': '/api/banks/{id}/summary/',
+            'Bank by IFSC code': '/api/banks/by-code/{code}/'
         },
         'Branches': {
             'List all branches': '/api/branches/',
+            'Filter and sort branches': '/api/branches/?bank={bank_id}&state={state}&ordering=city',
+            'Branches by IFSC prefix': '/api/branches/?ifsc_prefix={prefix}',
             'Branch details': '/api/branches/{ifsc_code}/',
             'Search by IFSC': '/api/branches/search/?ifsc={ifsc_code}',
-            'Search by city': '/api/branches/search/?city={city_name}'
+            'Search by city': '/api/branches/search/?city={city_name}',
+            'Nearest branches': '/api/branches/nearby/?lat={latitude}&lon={longitude}',
+            'Batch IFSC lookup (POST)': '/api/branches/batch/',
+            'Export branches': '/api/branches/export/?format={ndjson|csv}&bank={bank_id}&state={state}&since={iso_datetime}'
+        },
+        'Facets': {
+            'Branch counts per bank': '/api/facets/banks/',
+            'States': '/api/facets/states/',
+            'Districts': '/api/facets/districts/?state={state}',
+            'Cities': '/api/facets/cities/?state={state}&district={district}'
+        },
+        'Autocomplete': {
+            'Suggest names as they are typed': '/api/autocomplete/?q={text}'
+        },
+        'Async (ASGI)': {
+            'List all banks': '/api/async/banks/',
+            'Bank details': '/api/async/banks/{id}/',
+            'Branch details': '/api/async/branches/{ifsc_code}/',
+            'Search': '/api/async/branches/search/?city={city_name}'
         }
     }
     return Response(api_urls)
@@ -1,4 +1,9 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -60,6 +65,43 @@ class BankAPITest(TestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['branch'], 'Mumbai Branch')
         self.assertEqual(response.data['results'][0]['bank_name'], 'State Bank of India')
+    
+    def test_bank_summary_api(self):
+        """Test GET /api/banks/{id}/summary/ returns bounded, aggregated data."""
+        for number, city in enumerate(['Pune', 'Pune', 'Nagpur'], start=2):
+            Branch.objects.create(
+                ifsc=f'SBIN000000{number}', bank=self.bank1, branch=f'{city} Branch',
+                address=f'1 Road, {city}', city=city, district=city, state='Maharashtra'
+            )
+        url = reverse('bank-summary', kwargs={'id': self.bank1.id})
+        
+        # The dataset version for the ETag, the bank with its counts, states, cities and branches
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'branch_limit': 2, 'city_limit': 1})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['branch_count'], 4)
+        self.assertEqual(response.data['state_count'], 1)
+        self.assertEqual(response.data['city_count'], 3)
+        self.assertEqual(response.data['states'], [{'state': 'Maharashtra', 'branch_count': 4}])
+        self.assertEqual(response.data['cities'], [{'city': 'Pune', 'state': 'Maharashtra', 'branch_count': 2}])
+        self.assertEqual([b['ifsc'] for b in response.data['branches']], ['SBIN0000001', 'SBIN0000002'])
+        self.assertEqual(response.data['branches'][0]['bank_name'], 'State Bank of India')
+        self.assertIn('/api/banks/1/branches/?pagination=cursor', response.data['branches_url'])
+    
+    def test_bank_summary_not_found(self):
+        """Test GET /api/banks/{id}/summary/ for an unknown bank."""
+        response = self.client.get(reverse('bank-summary', kwargs={'id': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_bank_branches_cursor_pagination(self):
+        """Test GET /api/banks/{id}/branches/?pagination=cursor"""
+        url = reverse('bank-branches', kwargs={'bank_id': self.bank2.id})
+        response = self.client.get(url, {'pagination': 'cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([b['ifsc'] for b in response.data['results']], ['HDFC0000001'])
+        self.assertIsNone(response.data['next'])
 
 
 class BranchAPITest(TestCase):
@@ -96,6 +138,21 @@ class BranchAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
     
+    def test_branch_list_cursor_pagination(self):
+        """Test GET /api/branches/?pagination=cursor walks every branch by IFSC without counting."""
+        url = reverse('branch-list')
+        # The dataset version for the ETag, then the page itself
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'pagination': 'cursor', 'page_size': 1})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(response.data['results'][0]['ifsc'], 'TEST0000001')
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['ifsc'], 'TEST0000002')
+        self.assertIsNone(response.data['next'])
+    
     def test_branch_detail_api(self):
         """Test GET /api/branches/{ifsc}/"""
         url = reverse('branch-detail', kwargs={'ifsc': self.branch1.ifsc})
@@ -130,7 +187,7 @@ class BranchAPITest(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('error', response.data)
+        self.assertEqual(response.data['error'], 'Please provide one of: ifsc, city, district, branch')
     
     def test_branch_search_not_found(self):
         """Test branch search with non-existent data."""
@@ -140,6 +197,74 @@ class BranchAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn('message', response.data)
 
+    
+    def test_malformed_ifsc_is_not_looked_up(self):
+        """Test a code that cannot be an IFSC is a 404 without touching the cache or database."""
+        with self.assertNumQueries(0):
+            detail = self.client.get(reverse('branch-detail', kwargs={'ifsc': 'TEST000001'}))
+            search = self.client.get(reverse('branch-search'), {'ifsc': 'TEST1000001'})
+        
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(search.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('message', search.data)
+
+class BranchBatchLookupTest(TestCase):
+    """Test cases for the batch IFSC lookup endpoint."""
+    
+    def setUp(self):
+        from banks.cache import branch_cache
+        branch_cache.clear()
+        self.client = APIClient()
+        self.url = reverse('branch-batch')
+        bank = Bank.objects.create(id=1, name='Test Bank')
+        for n in range(1, 4):
+            Branch.objects.create(
+                ifsc=f'TEST000000{n}', bank=bank, branch=f'Branch {n}', address='Address',
+                city='Mumbai', district='Mumbai', state='Maharashtra'
+            )
+    
+    def test_batch_lookup(self):
+        """Test found, not found and invalid codes come back in request order."""
+        codes = [' test0000002', 'TEST0999999', 'NOPE', 'TEST0000001', 42]
+        with self.assertNumQueries(2):  # the dataset version and the branches
+            response = self.client.post(self.url, {'ifsc': codes}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['count'], response.data['found'], response.data['not_found'], response.data['invalid']),
+            (5, 2, 1, 2)
+        )
+        results = response.data['results']
+        self.assertEqual([result['ifsc'] for result in results], codes)
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['found', 'not_found', 'invalid', 'found', 'invalid']
+        )
+        self.assertEqual(results[0]['branch']['ifsc'], 'TEST0000002')
+        self.assertEqual(results[0]['branch']['bank']['name'], 'Test Bank')
+        
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, {'ifsc': codes}, format='json')
+        self.assertEqual(response.data['found'], 2)
+    
+    def test_batch_lookup_chunks_queries(self):
+        """Test uncached codes are fetched LOOKUP_CHUNK_SIZE at a time."""
+        codes = ['TEST0000001', 'TEST0000002', 'TEST0999999']
+        with mock.patch('banks.cache.LOOKUP_CHUNK_SIZE', 2), self.assertNumQueries(3):
+            response = self.client.post(self.url, {'ifsc': codes}, format='json')
+        self.assertEqual(response.data['found'], 2)
+        self.assertEqual(response.data['not_found'], 1)
+    
+    def test_batch_lookup_bad_request(self):
+        """Test missing, empty and oversized code lists are rejected."""
+        for body in ({}, {'ifsc': []}, {'ifsc': 'TEST0000001'}):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        with self.settings(BANKS_BATCH_LOOKUP_MAX=2):
+            response = self.client.post(self.url, {'ifsc': ['TEST0000001'] * 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class APIOverviewTest(TestCase):
     """Test cases for API overview endpoint."""
@@ -155,3 +280,92 @@ class APIOverviewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('Banks', response.data)
         self.assertIn('Branches', response.data)
+        self.assertIn('/api/branches/export/', response.data['Branches']['Export branches'])
+
+
+class OperationsEndpointTest(TestCase):
+    """Test cases for access to the operations endpoints."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.urls = [reverse(name) for name in ('cache-stats', 'snapshot-stats', 'request-metrics')]
+    
+    def test_staff_only(self):
+        """Test anonymous and non-staff clients are refused."""
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN, url)
+        self.client.force_authenticate(User.objects.create_user('user'))
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN, url)
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+    
+    @override_settings(BANKS_OPERATIONS={'PUBLIC': True})
+    def test_public(self):
+        """Test BANKS_OPERATIONS['PUBLIC'] opens them to every client."""
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+
+
+class BranchExportTest(TestCase):
+    """Test cases for the streaming branch export."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.bank1 = Bank.objects.create(id=1, name='State Bank of India')
+        self.bank2 = Bank.objects.create(id=2, name='HDFC Bank')
+        for ifsc, bank, city, state in [
+            ('SBIN0000002', self.bank1, 'Delhi', 'Delhi'),
+            ('SBIN0000001', self.bank1, 'Mumbai', 'Maharashtra'),
+            ('HDFC0000001', self.bank2, 'Pune', 'Maharashtra'),
+        ]:
+            Branch.objects.create(
+                ifsc=ifsc, bank=bank, branch=f'{city} Branch', address=f'1 Road, {city}',
+                city=city, district=city, state=state
+            )
+        self.url = reverse('branch-export')
+    
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+    
+    def test_export_ndjson(self):
+        """Test GET /api/branches/export/ streams NDJSON in IFSC order."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['ifsc'] for row in rows], ['HDFC0000001', 'SBIN0000001', 'SBIN0000002'])
+        self.assertEqual(rows[0]['bank_name'], 'HDFC Bank')
+        self.assertEqual(rows[0]['bank_id'], 2)
+    
+    def test_export_csv_with_filters(self):
+        """Test CSV output filtered by bank, state and since."""
+        response = self.client.get(self.url, {'format': 'csv', 'bank': 1, 'state': 'Maharashtra', 'since': '2000-01-01'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['ifsc'] for row in rows], ['SBIN0000001'])
+        self.assertEqual(rows[0]['bank_name'], 'State Bank of India')
+        
+        response = self.client.get(self.url, {'since': '2999-01-01T00:00:00Z'})
+        self.assertEqual(self.read(response), '')
+        
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_export_conditional_requests(self):
+        """Test unchanged exports return 304 and changes produce a new ETag."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        Branch.objects.filter(ifsc='SBIN0000002').delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import snapshot
+from banks.cache import branch_cache
+from banks.models import Branch
+
+
+class AsyncReadEndpointTest(TestCase):
+    """Test cases for the async read endpoints."""
+
+    def setUp(self):
+        branch_cache.clear()
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        call_command('init_data', stdout=StringIO())
+
+    async def assertSameAsSync(self, sync_name, async_name, kwargs=None, params=None):
+        expected = await self.sync_get(reverse(sync_name, kwargs=kwargs), params)
+        response = await self.async_client.get(reverse(async_name, kwargs=kwargs), params or {})
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        return response
+
+    async def sync_get(self, url, params):
+        return await sync_to_async(self.client.get)(url, params or {})
+
+    async def test_bank_list_and_detail(self):
+        """Test GET /api/async/banks/ and /api/async/banks/{id}/ match the sync endpoints."""
+        response = await self.assertSameAsSync('bank-list', 'async-bank-list')
+        self.assertEqual(response.json()['count'], 5)
+        await self.assertSameAsSync('bank-list', 'async-bank-list', params={'page': 9})
+        await self.assertSameAsSync('bank-detail', 'async-bank-detail', kwargs={'id': 1})
+        await self.assertSameAsSync('bank-detail', 'async-bank-detail', kwargs={'id': 999})
+
+    async def test_branch_detail(self):
+        """Test GET /api/async/branches/{ifsc}/ matches the sync endpoint."""
+        response = await self.assertSameAsSync(
+            'branch-detail', 'async-branch-detail', kwargs={'ifsc': 'SBIN0000001'}
+        )
+        self.assertEqual(response.json()['bank']['name'], 'State Bank of India')
+        response = await self.assertSameAsSync(
+            'branch-detail', 'async-branch-detail', kwargs={'ifsc': 'SBIN0999999'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_branch_search(self):
+        """Test GET /api/async/branches/search/ matches the sync endpoint."""
+        for params in (
+            {'ifsc': 'SBIN0000001'},
+            {'city': 'mum'},
+            {'city': 'umba', 'match': 'contains'},
+            {'city': 'Nowhere'},
+            {'city': 'Mumbai', 'match': 'fuzzy'},
+            {},
+        ):
+            await self.assertSameAsSync('branch-search', 'async-branch-search', params=params)
+
+    async def test_conditional_requests(self):
+        """Test the async endpoints send the sync validators and answer them with a 304."""
+        for name, kwargs, params in (
+            ('bank-list', None, None),
+            ('bank-detail', {'id': 1}, None),
+            ('branch-detail', {'ifsc': 'SBIN0000001'}, None),
+            ('branch-search', None, {'city': 'mum'}),
+        ):
+            expected = await self.sync_get(reverse(name, kwargs=kwargs), params)
+            response = await self.async_client.get(reverse(f'async-{name}', kwargs=kwargs), params or {})
+            self.assertEqual(response['ETag'], expected['ETag'], name)
+            self.assertEqual(response['Cache-Control'], expected['Cache-Control'], name)
+            response = await self.async_client.get(
+                reverse(f'async-{name}', kwargs=kwargs), params or {}, headers={'If-None-Match': response['ETag']},
+            )
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, name)
+
+    async def test_cache_hits_stay_on_the_event_loop(self):
+        """Test detail lookups answered from the caches neither query nor run in a thread."""
+        urls = [
+            reverse('async-bank-detail', kwargs={'id': 1}),
+            reverse('async-branch-detail', kwargs={'ifsc': 'SBIN0000001'}),
+            reverse('async-branch-search') + '?ifsc=SBIN0000001',
+        ]
+        for url in urls:
+            await self.async_client.get(url)
+        # The async ORM and synchronous middleware hooks go through these modules' sync_to_async.
+        hop = mock.Mock(side_effect=AssertionError('left the event loop'))
+        with mock.patch.object(branch_cache, 'check_interval', 3600), \
+                mock.patch('banks.conditional.sync_to_async', hop), \
+                mock.patch('banks.async_views.sync_to_async', hop), \
+                mock.patch('django.db.models.query.sync_to_async', hop), \
+                mock.patch('django.utils.deprecation.sync_to_async', hop), \
+                mock.patch('django.core.handlers.base.sync_to_async', hop):
+            for url in urls:
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+    @override_settings(BANKS_SNAPSHOT={'ENABLED': True, 'CHECK_INTERVAL': 3600})
+    async def test_snapshot(self):
+        """Test the async endpoints are answered from the snapshot when it is enabled."""
+        await sync_to_async(snapshot.load)()
+        self.addCleanup(snapshot.discard)
+        await self.assertSameAsSync('bank-list', 'async-bank-list')
+        await self.assertSameAsSync('branch-search', 'async-branch-search', params={'city': 'mum'})
+        await sync_to_async(Branch.objects.filter(city='Mumbai').delete)()
+        response = await self.async_client.get(reverse('async-branch-search'), {'city': 'mum'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,108 @@
+import random
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import autocomplete
+from banks.models import Branch
+
+
+class AutocompleteTest(TestCase):
+    """Test cases for the autocomplete endpoint and its index."""
+
+    def setUp(self):
+        autocomplete.discard()
+        self.client = APIClient()
+        self.url = reverse('autocomplete')
+        call_command('init_data', stdout=StringIO())
+
+    def tearDown(self):
+        autocomplete.discard()
+
+    def suggest(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['suggestions']
+
+    def test_prefix(self):
+        """Test a prefix suggests the bank before its branches."""
+        suggestions = self.suggest('hdf')
+        self.assertEqual(suggestions[0], {'type': 'bank', 'text': 'HDFC Bank', 'id': 2, 'branch_count': 2})
+        self.assertEqual({s['ifsc'] for s in suggestions[1:]}, {'HDFC0000001', 'HDFC0000002'})
+
+    def test_typo(self):
+        """Test a word that matches nothing is matched within one typo."""
+        suggestions = self.suggest('bangalre')
+        self.assertEqual(
+            suggestions[0],
+            {'type': 'city', 'text': 'Bangalore', 'district': 'Bangalore', 'state': 'Karnataka', 'branch_count': 1},
+        )
+        self.assertEqual(self.suggest('bnk'), [])  # too short for typos
+
+    def test_context(self):
+        """Test a branch matches words of its bank and city names."""
+        suggestions = self.suggest('hdfc kora')
+        self.assertEqual(
+            suggestions,
+            [{'type': 'branch', 'text': 'Bangalore Koramangala', 'ifsc': 'HDFC0000001',
+              'bank': 'HDFC Bank', 'city': 'Bangalore'}],
+        )
+        self.assertEqual(self.suggest('hdfc chenai')[0]['ifsc'], 'HDFC0000002')
+
+    def test_types_and_limit(self):
+        """Test types narrows the kinds suggested and limit the count."""
+        suggestions = self.suggest('bank', types='branch,bank')
+        self.assertTrue(suggestions)
+        self.assertTrue(all(s['type'] in ('bank', 'branch') for s in suggestions))
+        self.assertEqual(len(self.suggest('bank', limit=2)), 2)
+        self.assertEqual(len(self.suggest('bank', limit='x', types='bank')), 5)  # default 10, five banks
+
+    def test_invalid_parameters(self):
+        """Test a missing q or an unknown type is a 400."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+        response = self.client.get(self.url, {'q': '  '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'q': 'hdfc', 'types': 'bank,atm'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_updates_index(self):
+        """Test a refresh patches the index in place rather than rebuilding it."""
+        Branch.objects.create(
+            ifsc='HDFC0000009', bank_id=2, branch='Chennai T Nagar', address='T Nagar, Chennai',
+            city='Chennai', district='Chennai', state='Tamil Nadu'
+        )
+        response = self.client.get(self.url, {'q': 'nagar'})
+        self.assertEqual({s['ifsc'] for s in response.data['suggestions']}, {'HDFC0000002', 'HDFC0000009'})
+        index = autocomplete._index
+
+        call_command('init_data', refresh=True, stdout=StringIO())  # deletes HDFC0000009
+        self.assertIs(autocomplete._index, index)
+        self.assertEqual([s['ifsc'] for s in self.suggest('nagar')], ['HDFC0000002'])
+        self.assertEqual(self.suggest('chennai', types='city')[0]['branch_count'], 1)
+        repeat = self.client.get(self.url, {'q': 'nagar'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, status.HTTP_200_OK)
+
+
+class DistanceTest(SimpleTestCase):
+    """Test cases for the edit distance used for typos."""
+
+    def test_prefix_distance(self):
+        self.assertEqual(autocomplete.prefix_distance('mumbay', 'mumbai', 2), 1)
+        self.assertEqual(autocomplete.prefix_distance('bangalre', 'bangalore', 2), 1)
+        self.assertEqual(autocomplete.prefix_distance('kormng', 'koramangala', 2), 2)
+        self.assertGreater(autocomplete.prefix_distance('delhi', 'chennai', 2), 2)
+
+    def test_within_one_matches_prefix_distance(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            word = ''.join(rng.choice('abc') for _ in range(rng.randint(1, 6)))
+            other = ''.join(rng.choice('abc') for _ in range(rng.randint(1, 8)))
+            self.assertEqual(
+                autocomplete.within_one(word, other),
+                autocomplete.prefix_distance(word, other, 1) <= 1,
+                (word, other),
+            )
@@ -0,0 +1,40 @@
+from django.test import TestCase
+from banks import urls
+from banks.bench import SUITES, Timing, compare, endpoint_cases, load_synthetic, results_dict
+from banks.models import Branch
+
+
+class BenchmarkSuiteTest(TestCase):
+    """Test cases for the endpoint and loader benchmark suites."""
+
+    def setUp(self):
+        load_synthetic(banks=5, branches=300)
+
+    def test_every_endpoint_is_covered(self):
+        """Test the endpoint suite has a case for every URL in banks.urls."""
+        covered = {name for name, *_ in endpoint_cases()}
+        self.assertEqual(covered, {pattern.name for pattern in urls.urlpatterns})
+
+    def test_suites_run(self):
+        """Test every endpoint answers without an error and the loaders leave the data in place."""
+        timings = SUITES['endpoints'](1)
+        self.assertEqual(len(timings), len(endpoint_cases()))
+        timings = SUITES['loaders'](1)
+        self.assertEqual([timing.name for timing in timings][-1], 'full load x300')
+        self.assertEqual(Branch.objects.count(), 300)
+
+
+class BaselineTest(TestCase):
+    """Test cases for comparing results with a saved baseline."""
+
+    def test_compare(self):
+        """Test only slowdowns past both the tolerance and the minimum delta are reported."""
+        baseline = {'results': results_dict({'endpoints': [
+            Timing('slow', [0.010]), Timing('noisy', [0.0001]), Timing('steady', [0.010]),
+        ]})}
+        results = {'endpoints': [
+            Timing('slow', [0.020]), Timing('noisy', [0.0003]), Timing('steady', [0.011]), Timing('new', [1.0]),
+        ]}
+        regressions = compare(baseline, results, metric='p50', tolerance=0.25, min_delta=0.0005)
+        self.assertEqual([regression.case for regression in regressions], ['slow'])
+        self.assertEqual(str(regressions[0]), 'endpoints: slow: p50 10.000 ms -> 20.000 ms (+100%)')
@@ -0,0 +1,129 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks.cache import MISSING, LRUCache, branch_cache
+from banks.models import Bank, Branch, DatasetVersion
+
+
+class LRUCacheTest(TestCase):
+    """Test cases for the LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted first."""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """Test entries older than the TTL are treated as misses."""
+        cache = LRUCache(ttl=10)
+        with mock.patch('banks.cache.time.monotonic', return_value=100):
+            cache.set('a', None)
+            self.assertIsNone(cache.get('a'))
+        with mock.patch('banks.cache.time.monotonic', return_value=111):
+            self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_observe_clears_on_newer_versions(self):
+        """Test entries are dropped when a newer dataset version is seen, and only then."""
+        cache = LRUCache()
+        cache.observe((2, None))
+        cache.set('a', 1)
+        cache.observe((1, None))  # a replica lagging behind
+        self.assertEqual(cache.get('a'), 1)
+        cache.observe((3, None))
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.version, (3, None))
+
+
+class BranchCacheTest(TestCase):
+    """Test cases for the IFSC lookup cache."""
+
+    def setUp(self):
+        self.client = APIClient()
+        branch_cache.clear()
+        self.bank = Bank.objects.create(id=1, name='Test Bank')
+        self.branch = Branch.objects.create(
+            ifsc='TEST0000001',
+            bank=self.bank,
+            branch='Mumbai Branch',
+            address='123 Test Street, Mumbai',
+            city='Mumbai',
+            district='Greater Mumbai',
+            state='Maharashtra'
+        )
+        self.url = reverse('branch-detail', kwargs={'ifsc': 'TEST0000001'})
+
+    def test_repeat_lookups_skip_the_database(self):
+        """Test a cached IFSC, in any case, is served without queries."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('branch-detail', kwargs={'ifsc': 'test0000001'}))
+            search = self.client.get(reverse('branch-search'), {'ifsc': 'TEST0000001'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['branch'], 'Mumbai Branch')
+        self.assertEqual(search.data['branch'], response.data)
+
+    def test_unknown_codes_are_cached(self):
+        """Test not-found results are cached too."""
+        url = reverse('branch-detail', kwargs={'ifsc': 'NONE0000000'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_saves_invalidate_entries(self):
+        """Test branch and bank saves drop stale payloads."""
+        self.client.get(self.url)
+        self.branch.branch = 'Fort Branch'
+        self.branch.save()
+        self.assertEqual(self.client.get(self.url).data['branch'], 'Fort Branch')
+
+        self.bank.name = 'Renamed Bank'
+        self.bank.save()
+        self.assertEqual(self.client.get(self.url).data['bank']['name'], 'Renamed Bank')
+
+    def test_data_load_clears_cache(self):
+        """Test the load commands invalidate the whole cache."""
+        self.client.get(self.url)
+        call_command('init_data', stdout=StringIO())
+
+        self.assertEqual(len(branch_cache), 0)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_changes_from_other_processes_clear_cache(self):
+        """Test a change made without this process's signals is seen once the version moves."""
+        self.client.get(self.url)
+        # QuerySet.update() sends no signals, as for a load run by another process.
+        Branch.objects.filter(pk=self.branch.pk).update(branch='Fort Branch')
+        DatasetVersion.bump()
+
+        with mock.patch.object(branch_cache, 'check_interval', 3600):
+            self.assertEqual(self.client.get(self.url).data['branch'], 'Mumbai Branch')
+        with mock.patch.object(branch_cache, 'check_interval', 0):
+            self.assertEqual(self.client.get(self.url).data['branch'], 'Fort Branch')
+
+    def test_cache_stats_endpoint(self):
+        """Test GET /api/cache/stats/"""
+        before = branch_cache.stats()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        response = self.client.get(reverse('cache-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hits'] - before['hits'], 1)
+        self.assertEqual(response.data['misses'] - before['misses'], 1)
+        self.assertEqual(response.data['size'], 1)
@@ -0,0 +1,89 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import facets
+from banks.cache import branch_cache, fragment_cache
+from banks.models import Branch, DatasetVersion
+
+
+@override_settings(BANKS_HTTP_CACHE={'MAX_AGE': 120})
+class ConditionalRequestTest(TestCase):
+    """Test cases for ETag, Last-Modified and Cache-Control on read endpoints."""
+
+    def setUp(self):
+        branch_cache.clear()
+        fragment_cache.clear()
+        facets.invalidate()
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match is answered without running the view."""
+        url = reverse('branch-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=120')
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):  # the dataset version
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(repeat['Cache-Control'], 'public, max-age=120')
+
+        repeat = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_version_bumps_on_change(self):
+        """Test model saves and data loads each move the dataset ETag."""
+        url = reverse('bank-list')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for branch in Branch.objects.all()[:3]:
+                branch.save()
+        bumps = [callback for callback in callbacks if getattr(callback, 'func', None) == DatasetVersion.bump]
+        self.assertEqual(len(bumps), 1)  # one bump per transaction
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed['ETag'], etag)
+
+        version = DatasetVersion.current()[0]
+        call_command('init_data', refresh=True, stdout=StringIO())
+        self.assertEqual(DatasetVersion.current()[0], version)  # nothing changed
+        Branch.objects.filter(ifsc='SBIN0000001').delete()
+        call_command('init_data', refresh=True, stdout=StringIO())
+        self.assertEqual(DatasetVersion.current()[0], version + 1)
+
+    def test_detail_etag(self):
+        """Test detail ETags follow the branch and are shared with IFSC search."""
+        url = reverse('branch-detail', kwargs={'ifsc': 'SBIN0000001'})
+        response = self.client.get(url)
+        search = self.client.get(reverse('branch-search'), {'ifsc': 'SBIN0000001'})
+        self.assertEqual(search['ETag'], response['ETag'])
+
+        with self.assertNumQueries(0):
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Branch.objects.get(ifsc='SBIN0000001').save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_missing_detail_has_no_validators(self):
+        """Test 404s carry neither an ETag nor a Cache-Control header."""
+        response = self.client.get(reverse('branch-detail', kwargs={'ifsc': 'SBIN0999999'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Cache-Control', response)
+
+    def test_facets_not_modified(self):
+        """Test facet responses are validated by the facet snapshot's version."""
+        url = reverse('facet-states')
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
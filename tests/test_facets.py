@@ -0,0 +1,65 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import facets
+from banks.models import Bank, Branch, Facet
+
+
+class FacetTest(TestCase):
+    """Test cases for precomputed facets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+
+    def test_load_rebuilds_facets(self):
+        """Test the load commands fill the facets table."""
+        self.assertEqual(Facet.objects.filter(kind=Facet.BANK).count(), 5)
+        self.assertEqual(Facet.objects.get(kind=Facet.STATE, state='Maharashtra').branch_count, 2)
+
+    def test_facet_endpoints(self):
+        """Test GET /api/facets/... are served from the snapshot without queries."""
+        facets.get_snapshot()
+        with self.assertNumQueries(0):
+            banks = self.client.get(reverse('facet-banks'))
+            states = self.client.get(reverse('facet-states'))
+            districts = self.client.get(reverse('facet-districts'), {'state': 'Maharashtra'})
+            cities = self.client.get(reverse('facet-cities'), {'state': 'Maharashtra', 'district': 'Pune'})
+
+        self.assertEqual(banks.status_code, status.HTTP_200_OK)
+        self.assertIn({'id': 1, 'name': 'State Bank of India', 'branch_count': 2}, banks.data['banks'])
+        self.assertEqual(len(states.data['states']), 9)
+        self.assertEqual(
+            [row['district'] for row in districts.data['districts']], ['Mumbai', 'Pune']
+        )
+        self.assertEqual(
+            cities.data['cities'], [{'state': 'Maharashtra', 'district': 'Pune', 'city': 'Pune', 'branch_count': 1}]
+        )
+
+    def test_bank_by_code(self):
+        """Test GET /api/banks/by-code/{code}/ is served from the snapshot without queries."""
+        self.assertEqual(Facet.objects.get(kind=Facet.CODE, code='HDFC').branch_count, 2)
+        facets.get_snapshot()
+        with self.assertNumQueries(0):
+            found = self.client.get(reverse('bank-by-code', kwargs={'code': 'hdfc'}))
+            unknown = self.client.get(reverse('bank-by-code', kwargs={'code': 'ABCD'}))
+            malformed = self.client.get(reverse('bank-by-code', kwargs={'code': 'HDFC0'}))
+
+        self.assertEqual(found.status_code, status.HTTP_200_OK)
+        self.assertEqual(found.data['banks'], [{'id': 2, 'name': 'HDFC Bank', 'branch_count': 2}])
+        self.assertTrue(found.data['branches_url'].endswith('/branches/?ifsc_prefix=HDFC0&pagination=cursor'))
+        self.assertEqual(unknown.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(malformed.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_updates_facets(self):
+        """Test a refresh that changes data rebuilds the facets."""
+        Branch.objects.filter(bank_id=5).delete()
+        Bank.objects.filter(id=5).delete()
+        call_command('rebuild_facets', stdout=StringIO())
+        self.assertEqual(len(self.client.get(reverse('facet-banks')).data['banks']), 4)
+
+        call_command('init_data', refresh=True, stdout=StringIO())
+        self.assertEqual(len(self.client.get(reverse('facet-banks')).data['banks']), 5)
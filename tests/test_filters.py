@@ -0,0 +1,133 @@
+import itertools
+import re
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import snapshot
+from banks.cache import branch_cache, fragment_cache
+from banks.filters import BranchFilterSet
+from banks.models import Branch
+from banks.serializers import BRANCH_LIST_ROW
+
+
+# A plan step reading the whole branches table rather than an index range.
+FULL_SCAN = re.compile(r'\bSCAN branches\b(?! USING (COVERING )?INDEX)')
+
+
+class BranchFilterTest(TestCase):
+    """Test cases for filtering and sorting the branch list endpoints."""
+
+    def setUp(self):
+        snapshot.discard()
+        branch_cache.clear()
+        fragment_cache.clear()
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+        Branch.objects.create(
+            ifsc='SBIN0000009', bank_id=1, branch='Andheri Branch', address='Andheri, Mumbai',
+            city='Mumbai', district='Mumbai', state='Maharashtra'
+        )
+
+    def tearDown(self):
+        snapshot.discard()
+
+    def ifscs(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [branch['ifsc'] for branch in response.data['results']]
+
+    def test_combined_filters(self):
+        """Test bank, state, district and city filters combine."""
+        url = reverse('branch-list')
+        self.assertEqual(self.ifscs(url, {'bank': 1, 'state': 'Maharashtra'}), ['SBIN0000009', 'SBIN0000001'])
+        self.assertEqual(self.ifscs(url, {'bank': 1, 'city': 'Delhi'}), ['SBIN0000002'])
+        self.assertEqual(
+            self.ifscs(url, {'state': 'Maharashtra', 'district': 'Pune', 'city': 'Pune'}), ['ICIC0000001'],
+        )
+        self.assertEqual(self.ifscs(url, {'bank': 2, 'state': 'Maharashtra'}), [])
+        self.assertEqual(self.ifscs(url, {'state': ' '}), self.ifscs(url, {}))
+
+    def test_ordering(self):
+        """Test ordering sorts by one or more fields, with IFSC breaking ties."""
+        url = reverse('branch-list')
+        params = {'state': 'Maharashtra', 'ordering': '-city,branch'}
+        self.assertEqual(self.ifscs(url, params), ['ICIC0000001', 'SBIN0000009', 'SBIN0000001'])
+        params = {'bank': 1, 'ordering': 'city'}
+        self.assertEqual(self.ifscs(url, params), ['SBIN0000002', 'SBIN0000001', 'SBIN0000009'])
+
+    def test_bank_branches(self):
+        """Test the bank branches endpoint filters within its bank."""
+        url = reverse('bank-branches', kwargs={'bank_id': 1})
+        self.assertEqual(self.ifscs(url, {'city': 'Mumbai', 'ordering': '-ifsc'}), ['SBIN0000009', 'SBIN0000001'])
+        self.assertEqual(len(self.ifscs(url, {'bank': 2})), 3)  # the URL's bank wins
+
+    def test_cursor_pagination(self):
+        """Test filters apply to cursor pages, which cannot be reordered."""
+        url = reverse('branch-list')
+        params = {'pagination': 'cursor', 'bank': 1, 'state': 'Maharashtra'}
+        self.assertEqual(self.ifscs(url, params), ['SBIN0000001', 'SBIN0000009'])
+        response = self.client.get(url, {'pagination': 'cursor', 'ordering': 'city'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ifsc_prefix(self):
+        """Test ifsc_prefix matches the IFSCs starting with it, case-insensitively."""
+        url = reverse('branch-list')
+        self.assertEqual(self.ifscs(url, {'ifsc_prefix': 'sbin0', 'ordering': 'ifsc'}), [
+            'SBIN0000001', 'SBIN0000002', 'SBIN0000009',
+        ])
+        self.assertEqual(self.ifscs(url, {'ifsc_prefix': 'SBIN0000009'}), ['SBIN0000009'])
+        self.assertEqual(self.ifscs(url, {'ifsc_prefix': 'H', 'city': 'Chennai'}), ['HDFC0000002'])
+        self.assertEqual(self.ifscs(url, {'ifsc_prefix': 'SBIN00001'}), [])
+
+    def test_invalid_parameters(self):
+        """Test a malformed filter or an unknown ordering is a 400."""
+        for params in ({'bank': 'sbi'}, {'ordering': 'address'}, {'ordering': 'city,'},
+                       {'ifsc_prefix': 'SB1'}, {'ifsc_prefix': 'SBIN1'}):
+            response = self.client.get(reverse('branch-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+    def test_snapshot_falls_back_when_filtered(self):
+        """Test filtered lists are served from the database when the snapshot is on."""
+        url = reverse('branch-list')
+        expected = self.ifscs(url, {'city': 'Mumbai'})
+        with self.settings(BANKS_SNAPSHOT={'ENABLED': True, 'CHECK_INTERVAL': 3600}):
+            snapshot.load()
+            self.assertEqual(self.ifscs(url, {'city': 'Mumbai'}), expected)
+            self.assertEqual(len(self.ifscs(url, {})), 11)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Reads SQLite query plans')
+class FilterPlanTest(TestCase):
+    """Test every filter combination is answered from an index, using EXPLAIN."""
+
+    def plan(self, params):
+        queryset = BRANCH_LIST_ROW.values(BranchFilterSet(params).filter(Branch.objects.all()))
+        return queryset.explain()
+
+    def test_no_full_scans(self):
+        names = list(BranchFilterSet.filters)
+        values = {'bank': '1', 'state': 'Maharashtra', 'district': 'Mumbai', 'city': 'Mumbai', 'ifsc_prefix': 'SBIN0'}
+        for size in range(1, len(names) + 1):
+            for combo in itertools.combinations(names, size):
+                for ordering in ('', 'ifsc', 'branch', '-city', 'bank'):
+                    params = {name: values[name] for name in combo}
+                    params['ordering'] = ordering
+                    plan = self.plan(params)
+                    self.assertIsNone(FULL_SCAN.search(plan), (params, plan))
+
+    def test_composite_indexes(self):
+        cases = [
+            ({'bank': '1', 'state': 'Maharashtra'}, 'branches_bank_state_idx'),
+            ({'bank': '1', 'city': 'Mumbai'}, 'branches_bank_city_idx'),
+            ({'state': 'Maharashtra', 'district': 'Mumbai', 'city': 'Mumbai'}, 'branches_state_place_idx'),
+        ]
+        for params, index in cases:
+            for ordering in ('', 'branch'):
+                plan = self.plan({**params, 'ordering': ordering})
+                self.assertIn(f'USING INDEX {index}', plan, (params, ordering))
@@ -0,0 +1,187 @@
+import os
+import random
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import geo
+from banks.bench import nearest_scan
+from banks.ingest import CSVIngestor, DatasetRefresher, validate_rows
+from banks.models import Bank, Branch
+
+
+GAZETTEER = """state,district,city,latitude,longitude
+Maharashtra,Mumbai,Mumbai,19.0760,72.8777
+Maharashtra,Pune,Pune,18.5204,73.8567
+Maharashtra,Thane,,19.2183,72.9781
+Karnataka,Bangalore Urban,Bangalore,12.9716,77.5946
+"""
+
+
+def write(directory, name, text):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return path
+
+
+def csv_row(ifsc, city, district, state, bank_id=1):
+    return {
+        'ifsc': ifsc, 'bank_id': str(bank_id), 'branch': f'{city} Branch', 'address': city,
+        'city': city, 'district': district, 'state': state, 'bank_name': 'STATE BANK OF INDIA',
+    }
+
+
+class GazetteerTest(SimpleTestCase):
+    """Test cases for locating branches with a gazetteer."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.gazetteer = geo.Gazetteer.load(write(self.directory, 'places.csv', GAZETTEER))
+
+    def test_locate(self):
+        self.assertEqual(self.gazetteer.locate('MUMBAI', ' Mumbai ', 'maharashtra'), (19.0760, 72.8777))
+        # The city in another district of its state, then the district alone.
+        self.assertEqual(self.gazetteer.locate('Pune', 'Pune City', 'Maharashtra'), (18.5204, 73.8567))
+        self.assertEqual(self.gazetteer.locate('Kalyan', 'Thane', 'Maharashtra'), (19.2183, 72.9781))
+        self.assertEqual(self.gazetteer.locate('Pune', 'Pune', 'Karnataka'), (None, None))
+
+    def test_invalid_files(self):
+        for text in ('state,city,latitude\n', 'state,district,city,latitude,longitude\nGoa,Goa,Panaji,95,73\n'):
+            with self.assertRaises(ValueError):
+                geo.Gazetteer.load(write(self.directory, 'bad.csv', text))
+
+    def test_haversine(self):
+        self.assertAlmostEqual(geo.haversine(19.0760, 72.8777, 12.9716, 77.5946), 845, delta=2)
+        self.assertAlmostEqual(geo.chord_km(geo.chord_squared(845)), 845)
+
+
+class GeoIndexTest(SimpleTestCase):
+    """Test cases for nearest-branch queries on the spatial index."""
+
+    def setUp(self):
+        rng = random.Random(1)
+        places = [(rng.uniform(8, 36), rng.uniform(68, 97)) for _ in range(300)]
+        self.rows = []
+        for number in range(2000):
+            lat, lon = rng.choice(places) if number % 2 else (rng.uniform(8, 36), rng.uniform(68, 97))
+            self.rows.append((f'TEST{number:07d}', 'Branch', 'City', 'District', 'State', 1, lat, lon))
+        self.points = [(row[0], row[6], row[7]) for row in self.rows]
+        self.index = geo.GeoIndex((1, None), self.rows, {1: 'TEST BANK'})
+        self.queries = [(rng.uniform(5, 40), rng.uniform(65, 100)) for _ in range(50)] + [(-33.9, 151.2)]
+
+    def test_matches_scan(self):
+        """Test the index finds the same branches as a haversine scan of every branch."""
+        for lat, lon in self.queries:
+            for limit, radius in ((1, None), (10, None), (25, None), (100, 150)):
+                results = self.index.nearest(lat, lon, limit, radius)
+                expected = nearest_scan(self.points, lat, lon, limit, radius)
+                self.assertEqual([result['ifsc'] for result in results], expected, (lat, lon, limit, radius))
+                distances = [result['distance_km'] for result in results]
+                self.assertEqual(distances, sorted(distances))
+
+    def test_payload(self):
+        result = self.index.nearest(*self.rows[0][6:], limit=1)[0]
+        self.assertEqual(result['ifsc'], 'TEST0000000')
+        self.assertEqual(result['bank_name'], 'TEST BANK')
+        self.assertEqual(result['distance_km'], 0)
+        self.assertEqual(geo.GeoIndex((0, None), [], {}).nearest(0, 0), [])
+
+
+class NearbyEndpointTest(TestCase):
+    """Test cases for GET /api/branches/nearby/ and loading coordinates."""
+
+    def setUp(self):
+        geo.discard()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.gazetteer_path = write(self.directory, 'places.csv', GAZETTEER)
+        self.client = APIClient()
+        self.url = reverse('branch-nearby')
+        rows = [
+            csv_row('SBIN0000001', 'Mumbai', 'Mumbai', 'Maharashtra'),
+            csv_row('SBIN0000002', 'Pune', 'Pune', 'Maharashtra'),
+            csv_row('SBIN0000003', 'Bangalore', 'Bangalore Urban', 'Karnataka'),
+            csv_row('SBIN0000004', 'Kalyan', 'Thane', 'Maharashtra'),
+            csv_row('SBIN0000005', 'Panaji', 'North Goa', 'Goa'),
+        ]
+        result = CSVIngestor(gazetteer=geo.Gazetteer.load(self.gazetteer_path)).ingest(
+            validate_rows(enumerate(rows, start=2))
+        )
+        self.assertEqual(result.located, 4)
+
+    def tearDown(self):
+        geo.discard()
+
+    def nearest_ifscs(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [branch['ifsc'] for branch in response.data['branches']]
+
+    def test_nearest(self):
+        response = self.client.get(self.url, {'lat': 19.0, 'lon': 72.9, 'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [branch['ifsc'] for branch in response.data['branches']],
+            ['SBIN0000001', 'SBIN0000004', 'SBIN0000002'],
+        )
+        first = response.data['branches'][0]
+        self.assertEqual((first['latitude'], first['longitude']), (19.0760, 72.8777))
+        self.assertEqual(first['bank_name'], 'STATE BANK OF INDIA')
+        self.assertAlmostEqual(first['distance_km'], geo.haversine(19.0, 72.9, 19.0760, 72.8777), places=2)
+        self.assertIn('ETag', response)
+
+    def test_radius(self):
+        self.assertEqual(
+            self.nearest_ifscs(lat=19.0, lon=72.9, radius_km=200), ['SBIN0000001', 'SBIN0000004', 'SBIN0000002'],
+        )
+        response = self.client.get(self.url, {'lat': 0, 'lon': 0, 'radius_km': 10})
+        self.assertEqual(response.data, {'count': 0, 'branches': []})
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'lat': 19}, {'lat': 'north', 'lon': 72}, {'lat': 91, 'lon': 72},
+                       {'lat': 19, 'lon': 72, 'radius_km': '-5'}, {'lat': 19, 'lon': 72, 'radius_km': 'far'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+    def test_refresh_relocates_branches(self):
+        """Test a refresh with a changed gazetteer updates coordinates, and the index follows."""
+        lines = ['ifsc,bank_id,branch,address,city,district,state,bank_name'] + [
+            ','.join(map(str, [*branch, 'STATE BANK OF INDIA']))
+            for branch in Branch.objects.order_by('ifsc').values_list(
+                'ifsc', 'bank_id', 'branch', 'address', 'city', 'district', 'state',
+            )
+        ]
+        csv_path = write(self.directory, 'branches.csv', '\n'.join(lines))
+        self.assertEqual(self.nearest_ifscs(lat=15.5, lon=73.8, limit=1), ['SBIN0000002'])
+
+        write(self.directory, 'places.csv', GAZETTEER + 'Goa,North Goa,Panaji,15.4909,73.8278\n')
+        summary = DatasetRefresher(gazetteer=geo.Gazetteer.load(self.gazetteer_path), dry_run=True).load(csv_path)
+        self.assertEqual(summary.branches_updated, ['SBIN0000005'])
+        call_command('load_real_data', file=csv_path, refresh=True, gazetteer=self.gazetteer_path, stdout=StringIO())
+        self.assertEqual(self.nearest_ifscs(lat=15.5, lon=73.8, limit=1), ['SBIN0000005'])
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'load_real_data', file=csv_path, gazetteer=os.path.join(self.directory, 'missing.csv'), stdout=StringIO(),
+            )
+        self.assertEqual(Bank.objects.count(), 1)
+
+    def test_refresh_without_gazetteer_keeps_coordinates(self):
+        """Test a refresh without a gazetteer leaves stored coordinates alone."""
+        rows = [
+            csv_row(*values)
+            for values in Branch.objects.order_by('ifsc').values_list('ifsc', 'city', 'district', 'state')
+        ]
+        summary = DatasetRefresher().refresh(validate_rows(enumerate(rows, start=2)))
+        self.assertEqual((len(summary.branches_updated), summary.unchanged), (0, 5))
+        self.assertEqual(Branch.objects.filter(latitude__isnull=False).count(), 4)
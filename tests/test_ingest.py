@@ -0,0 +1,263 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from banks.ingest import (
+    CSV_FIELDS, CSVIngestor, DatasetRefresher, IngestError, ParallelValidator, RowError, clean_row, split_records,
+    validate_file, validate_rows,
+)
+from banks.models import Bank, Branch
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def make_row(ifsc, bank_id=1, bank_name='Test Bank', city='Mumbai', **extra):
+    row = {
+        'ifsc': ifsc,
+        'bank_id': str(bank_id),
+        'branch': f'{city} Branch',
+        'address': f'1 Main Road, {city}',
+        'city': city,
+        'district': city,
+        'state': 'Maharashtra',
+        'bank_name': bank_name,
+    }
+    row.update(extra)
+    return row
+
+
+class CleanRowTest(TestCase):
+    """Test cases for CSV row validation."""
+
+    def test_clean_row_normalises_values(self):
+        """Test whitespace is stripped and IFSC upper-cased."""
+        cleaned = clean_row(make_row(' test0000001 ', branch=' Fort '))
+        self.assertEqual(cleaned['ifsc'], 'TEST0000001')
+        self.assertEqual(cleaned['branch'], 'Fort')
+        self.assertEqual(cleaned['bank_id'], 1)
+
+    def test_clean_row_rejects_bad_values(self):
+        """Test invalid bank ids, malformed IFSCs and over-long fields are rejected."""
+        with self.assertRaises(RowError):
+            clean_row(make_row('TEST0000001', bank_id='abc'))
+        with self.assertRaises(RowError):
+            clean_row(make_row('TEST0000001', state='x' * 27))
+        with self.assertRaises(RowError):
+            clean_row(make_row(''))
+        for ifsc in ('TEST000001', 'TEST1000001', 'TE5T0000001'):
+            with self.assertRaisesRegex(RowError, 'invalid ifsc'):
+                clean_row(make_row(ifsc))
+
+
+class CSVIngestorTest(TestCase):
+    """Test cases for the batched CSV ingestor."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'branches.csv')
+        self.rejects_path = os.path.join(self.tmpdir.name, 'rejects.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ingest_in_batches(self):
+        """Test rows are written in batches and existing data is replaced."""
+        Bank.objects.create(id=99, name='Old Bank')
+        rows = [make_row(f'TEST000000{i}', city=f'City{i}') for i in range(5)]
+        rows.append(make_row('OTHR0000001', bank_id=2, bank_name='Other Bank'))
+        write_csv(self.csv_path, rows)
+
+        batches = []
+        result = CSVIngestor(batch_size=2, on_batch=batches.append).load(self.csv_path)
+
+        self.assertEqual(result.banks, 2)
+        self.assertEqual(result.branches, 6)
+        self.assertEqual(result.batches, 3)
+        self.assertEqual([stats.rows for stats in batches], [2, 2, 2])
+        self.assertEqual(Branch.objects.count(), 6)
+        self.assertFalse(Bank.objects.filter(id=99).exists())
+        self.assertEqual(Branch.objects.get(ifsc='OTHR0000001').bank.name, 'Other Bank')
+
+    def test_rejected_rows_go_to_side_file(self):
+        """Test invalid and duplicate rows are written to the rejects file."""
+        write_csv(self.csv_path, [
+            make_row('TEST0000001'),
+            make_row('TEST0000002', bank_id='not-a-number'),
+            make_row('TEST0000001'),
+        ])
+
+        result = CSVIngestor(rejects_path=self.rejects_path).load(self.csv_path)
+
+        self.assertEqual(result.branches, 1)
+        self.assertEqual(result.rejected, 2)
+        with open(self.rejects_path, newline='', encoding='utf-8') as file:
+            rejected = list(csv.DictReader(file))
+        self.assertEqual([row['line'] for row in rejected], ['3', '4'])
+        self.assertIn('invalid bank_id', rejected[0]['error'])
+        self.assertIn('duplicate ifsc', rejected[1]['error'])
+
+    def test_load_real_data_command(self):
+        """Test the management command reports batches and totals."""
+        write_csv(self.csv_path, [make_row('TEST0000001'), make_row('TEST0000002')])
+        out = StringIO()
+
+        call_command('load_real_data', file=self.csv_path, batch_size=1,
+                     rejects=self.rejects_path, stdout=out)
+
+        self.assertIn('Batch 2: 1 branches', out.getvalue())
+        self.assertIn('Successfully loaded 1 banks and 2 branches', out.getvalue())
+        self.assertFalse(os.path.exists(self.rejects_path))
+
+
+    def test_failed_load_reports_committed_rows(self):
+        """Test a load failing partway reports the batches it left in the tables."""
+        rows = [make_row(f'TEST000000{i}') for i in range(5)]
+
+        def validated(path, validator=None):
+            yield from validate_rows(enumerate(rows, start=2))
+            raise OSError('disk went away')
+
+        with mock.patch('banks.ingest.validate_file', validated):
+            with self.assertRaisesRegex(IngestError, 'disk went away') as caught:
+                CSVIngestor(batch_size=2).load(self.csv_path)
+            self.assertEqual((caught.exception.result.branches, caught.exception.result.batches), (4, 2))
+            self.assertEqual(Branch.objects.count(), 4)
+
+            write_csv(self.csv_path, [])
+            message = 'Load failed after committing 1 banks and 3 branches in 1 batches: disk went away'
+            with self.assertRaisesRegex(CommandError, message):
+                call_command('load_real_data', file=self.csv_path, batch_size=3, stdout=StringIO())
+
+class ParallelValidatorTest(TestCase):
+    """Test cases for parsing and validating a CSV file in worker processes."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.csv_path = os.path.join(self.tmpdir.name, 'branches.csv')
+        rows = [make_row(f'TEST{i:07d}', city=f'City{i % 7}') for i in range(200)]
+        rows[10]['address'] = 'Shop 4,\n"Market" Road\r\nMumbai'
+        rows[11]['bank_id'] = 'abc'
+        rows[50]['address'] = '"' + '\n' * 30 + '"'
+        rows[60]['address'] = 'Old Mill\rStation Road'
+        rows[51]['ifsc'] = rows[3]['ifsc']
+        rows[120]['state'] = 'x' * 27
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_FIELDS, lineterminator='\r\n')
+            writer.writeheader()
+            writer.writerows(rows[:150])
+            file.write('TEST0999998,1,Short Row\r\n')
+            file.write('TEST0999999,1,Long,Row,Mumbai,Mumbai,Maharashtra,Test Bank,extra\r\n')
+            writer.writerows(rows[150:])
+
+    def test_matches_sequential_read(self):
+        """Test every chunking yields the rows, line numbers and errors of a sequential read."""
+        expected = list(validate_file(self.csv_path))
+        self.assertEqual(len(expected), 202)
+        for chunk_bytes in (1, 100, 1000, 1 << 20):
+            validator = ParallelValidator(workers=2, chunk_bytes=chunk_bytes)
+            self.assertEqual(list(validator.validate(self.csv_path)), expected, chunk_bytes)
+            self.assertEqual(validator.rows, 202)
+
+    def test_split_records(self):
+        fieldnames, ranges = split_records(self.csv_path, 1000)
+        self.assertEqual(fieldnames, CSV_FIELDS)
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual(ranges[0][2], 1)
+        for (_, end, _), (start, _, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.csv_path))
+
+        empty = os.path.join(self.tmpdir.name, 'empty.csv')
+        write_csv(empty, [])
+        self.assertEqual(list(ParallelValidator(workers=2).validate(empty)), [])
+
+    def test_load_real_data_workers(self):
+        """Test a load with workers stores the same data and rejects as a sequential one."""
+        sequential_rejects = os.path.join(self.tmpdir.name, 'sequential.rejects.csv')
+        parallel_rejects = os.path.join(self.tmpdir.name, 'parallel.rejects.csv')
+
+        def branches():
+            return list(Branch.objects.order_by('ifsc').values_list(*CSV_FIELDS[:-1]))
+
+        call_command('load_real_data', file=self.csv_path, rejects=sequential_rejects, stdout=StringIO())
+        expected = branches()
+
+        out = StringIO()
+        call_command('load_real_data', file=self.csv_path, rejects=parallel_rejects, workers=2, stdout=out)
+        self.assertIn('Validator: parsed 202 rows', out.getvalue())
+        self.assertEqual(branches(), expected)
+        with open(sequential_rejects, 'rb') as sequential, open(parallel_rejects, 'rb') as parallel:
+            self.assertEqual(parallel.read(), sequential.read())
+
+        call_command('load_real_data', file=self.csv_path, refresh=True, workers=0, stdout=out)
+        self.assertIn('0 created, 0 updated, 0 deleted, 198 unchanged', out.getvalue())
+
+
+class DatasetRefresherTest(TestCase):
+    """Test cases for the diff-based refresh."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'branches.csv')
+        write_csv(self.csv_path, [
+            make_row('TEST0000001', city='Mumbai'),
+            make_row('TEST0000002', city='Delhi'),
+            make_row('OLDB0000001', bank_id=2, bank_name='Old Bank'),
+        ])
+        CSVIngestor().load(self.csv_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_refresh_applies_only_changes(self):
+        """Test inserts, updates and deletes are detected by IFSC and bank id."""
+        untouched = Branch.objects.get(ifsc='TEST0000001').updated_at
+        write_csv(self.csv_path, [
+            make_row('TEST0000001', city='Mumbai', bank_name='Renamed Bank'),
+            make_row('TEST0000002', city='Delhi', bank_name='Renamed Bank', address='9 New Road, Delhi'),
+            make_row('TEST0000003', city='Pune', bank_name='Renamed Bank'),
+        ])
+
+        summary = DatasetRefresher().load(self.csv_path)
+
+        self.assertEqual(summary.branches_created, ['TEST0000003'])
+        self.assertEqual(summary.branches_updated, ['TEST0000002'])
+        self.assertEqual(summary.branches_deleted, ['OLDB0000001'])
+        self.assertEqual(summary.banks_updated, [1])
+        self.assertEqual(summary.banks_deleted, [2])
+        self.assertEqual(summary.unchanged, 1)
+        self.assertEqual(Branch.objects.get(ifsc='TEST0000002').address, '9 New Road, Delhi')
+        self.assertEqual(Branch.objects.get(ifsc='TEST0000001').updated_at, untouched)
+        self.assertEqual(Bank.objects.get(id=1).name, 'Renamed Bank')
+        self.assertFalse(Bank.objects.filter(id=2).exists())
+
+    def test_refresh_dry_run(self):
+        """Test a dry run reports changes without writing them."""
+        write_csv(self.csv_path, [make_row('TEST0000001', city='Mumbai')])
+        out = StringIO()
+
+        call_command('load_real_data', file=self.csv_path, refresh=True, dry_run=True, stdout=out)
+
+        self.assertIn('Dry run', out.getvalue())
+        self.assertIn('2 deleted', out.getvalue())
+        self.assertEqual(Branch.objects.count(), 3)
+
+    def test_init_data_refresh_is_idempotent(self):
+        """Test refreshing the sample data twice makes no further changes."""
+        call_command('init_data', stdout=StringIO())
+        out = StringIO()
+
+        call_command('init_data', refresh=True, stdout=out)
+
+        self.assertIn('0 created, 0 updated, 0 deleted, 10 unchanged', out.getvalue())
+        self.assertEqual(Branch.objects.count(), 10)
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from banks import snapshot
+from banks.models import Bank, Branch, DatasetVersion
+from banks.pack import Pack, PackError, export
+
+
+BRANCH_VALUES = ['ifsc', 'bank_id', 'branch', 'address', 'city', 'district', 'state',
+                 'latitude', 'longitude', 'created_at', 'updated_at']
+
+
+class PackTest(TestCase):
+    """Test cases for exporting the tables to a pack file and restoring them."""
+
+    def setUp(self):
+        snapshot.discard()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'banks.pack')
+        call_command('init_data', stdout=StringIO())
+        Branch.objects.create(
+            ifsc='SBIN0000009', bank_id=1, branch='Andheri Branch', address='Shop 4,\nMarol Naka – Andheri',
+            city='Mumbai', district='Mumbai', state='Maharashtra', latitude=19.1136, longitude=72.8697,
+        )
+
+    def tearDown(self):
+        snapshot.discard()
+
+    def tables(self):
+        return (
+            list(Bank.objects.order_by('id').values_list('id', 'name', 'created_at', 'updated_at')),
+            list(Branch.objects.order_by('ifsc').values_list(*BRANCH_VALUES)),
+            DatasetVersion.current(),
+        )
+
+    def test_round_trip(self):
+        """Test load_pack restores both tables, their timestamps and the dataset version."""
+        expected = self.tables()
+        out = StringIO()
+        call_command('export_pack', file=self.path, stdout=out)
+        self.assertIn('5 banks and 11 branches', out.getvalue())
+
+        Branch.objects.all().delete()
+        Bank.objects.all().delete()
+        DatasetVersion.objects.all().delete()
+        out = StringIO()
+        call_command('load_pack', file=self.path, stdout=out)
+        self.assertIn('Successfully loaded 5 banks and 11 branches', out.getvalue())
+        self.assertEqual(self.tables(), expected)
+
+        # A database already at the pack's version or later is bumped instead.
+        call_command('load_pack', file=self.path, stdout=StringIO())
+        self.assertEqual(DatasetVersion.current()[0], expected[2][0] + 1)
+
+    def test_pack_columns(self):
+        export(self.path)
+        with Pack(self.path) as pack:
+            self.assertEqual(len(pack), 11)
+            row = pack.find('SBIN0000009')
+            self.assertEqual(pack.string(pack.column('branch.address')[row]), 'Shop 4,\nMarol Naka – Andheri')
+            self.assertEqual(pack.points()[pack.column('branch.point')[row]], (19.1136, 72.8697))
+            self.assertIsNone(pack.find('SBIN0000010'))
+            self.assertIsNone(pack.find('AAAA0000000'))
+            # Interned strings: one Mumbai for every branch in it.
+            cities = pack.column('branch.city')
+            self.assertEqual(len({cities[pack.find(ifsc)] for ifsc in ('SBIN0000001', 'SBIN0000009')}), 1)
+            self.assertEqual(pack.fingerprint(), snapshot.fingerprint())
+
+    def test_corrupt_pack(self):
+        """Test a damaged or foreign file is refused."""
+        export(self.path)
+        with open(self.path, 'rb') as file:
+            data = bytearray(file.read())
+        data[-3] ^= 0xFF
+        with open(self.path, 'wb') as file:
+            file.write(data)
+        with self.assertRaisesRegex(PackError, 'corrupt branch.updated_at section'):
+            Pack(self.path)
+        Pack(self.path, verify=False).close()
+        with self.assertRaisesRegex(CommandError, 'Could not read the pack'):
+            call_command('load_pack', file=self.path, stdout=StringIO())
+
+        with open(self.path, 'wb') as file:
+            file.write(b'ifsc,bank_id\n')
+        with self.assertRaisesRegex(PackError, 'not a pack file'):
+            Pack(self.path)
+
+    def test_snapshot_from_pack(self):
+        """Test the in-memory snapshot reads a matching pack and ignores a stale one."""
+        export(self.path)
+        from_database = snapshot.Snapshot()
+        with Pack(self.path) as pack:
+            from_pack = snapshot.Snapshot(pack=pack)
+        self.assertEqual(from_pack.bank_list(), from_database.bank_list())
+        self.assertEqual(list(from_pack.branch_list()), list(from_database.branch_list()))
+        self.assertEqual(from_pack.branch_payload('SBIN0000009'), from_database.branch_payload('SBIN0000009'))
+        self.assertEqual(from_pack.search({'city': 'mum'}), from_database.search({'city': 'mum'}))
+
+        with self.settings(BANKS_SNAPSHOT={'ENABLED': True, 'PACK': self.path}):
+            self.assertEqual(snapshot.load().source, 'pack')
+            Branch.objects.filter(ifsc='SBIN0000009').delete()
+            self.assertEqual(snapshot.load().source, 'database')
+
+    @override_settings(BANKS_SNAPSHOT={'ENABLED': True, 'PACK': '/nonexistent/banks.pack'})
+    def test_missing_pack(self):
+        self.assertEqual(snapshot.load().source, 'database')
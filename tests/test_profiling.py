@@ -0,0 +1,81 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from banks.cache import branch_cache, fragment_cache
+from banks.profiling import Histogram, metrics
+
+
+PROFILING_ON = {'ENABLED': True, 'QUERY_BUDGET': 10}
+
+
+class HistogramTest(TestCase):
+    """Test cases for the profiling histograms."""
+
+    def test_buckets_and_quantiles(self):
+        """Test values land in inclusive buckets and quantiles report bucket bounds."""
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 4, 7, 50):
+            histogram.add(value)
+        data = histogram.as_dict()
+        self.assertEqual(data['buckets'], {'1': 2, '5': 2, '10': 1, '+Inf': 1})
+        self.assertEqual((data['p50'], data['p95'], data['max']), (5, 50, 50))
+
+
+@override_settings(BANKS_PROFILING=PROFILING_ON)
+class ProfilingMiddlewareTest(TestCase):
+    """Test cases for the request profiling middleware."""
+
+    def setUp(self):
+        metrics.clear()
+        branch_cache.clear()
+        fragment_cache.clear()
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+
+    def test_server_timing(self):
+        """Test responses carry their phases and query count."""
+        response = self.client.get(reverse('bank-summary', kwargs={'id': 1}))
+        phases = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(phases, ['db', 'serialize', 'render', 'total'])
+        self.assertIn('desc="5 queries"', response['Server-Timing'])
+
+        response = self.client.get(reverse('async-bank-detail', kwargs={'id': 1}))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])  # the version was just checked
+
+    async def test_asgi_queries(self):
+        """Test queries run by async views under ASGI are counted."""
+        response = await self.async_client.get(reverse('async-bank-detail', kwargs={'id': 1}))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    def test_metrics_endpoint(self):
+        """Test requests are aggregated per view."""
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        for _ in range(3):
+            self.client.get(reverse('branch-detail', kwargs={'ifsc': 'SBIN0000001'}))
+        views = self.client.get(reverse('request-metrics')).data['views']
+        detail = views['branch-detail']
+        self.assertEqual(detail['requests'], 3)
+        self.assertEqual(detail['queries']['count'], 3)
+        self.assertEqual(detail['queries']['sum'], 2)  # the version and the branch; later lookups hit the IFSC cache
+        self.assertEqual(detail['bytes']['count'], 3)
+        self.assertEqual(detail['phases_ms']['total']['count'], 3)
+
+    def test_query_budget(self):
+        """Test a view over its query budget is logged with its most repeated query."""
+        budgets = {**PROFILING_ON, 'QUERY_BUDGETS': {'bank-summary': 2}}
+        with self.settings(BANKS_PROFILING=budgets), self.assertLogs('banks.profiling', 'WARNING') as logs:
+            self.client.get(reverse('bank-summary', kwargs={'id': 1}))
+        self.assertIn('GET bank-summary ran 5 queries (budget 2)', logs.output[0])
+        self.assertEqual(metrics.as_dict()['bank-summary']['over_budget'], 1)
+
+    @override_settings(BANKS_PROFILING={'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is recorded or added unless profiling is enabled."""
+        response = self.client.get(reverse('bank-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        self.assertEqual(self.client.get(reverse('request-metrics')).data, {'enabled': False})
+        self.assertEqual(metrics.as_dict(), {})
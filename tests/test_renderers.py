@@ -0,0 +1,93 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from banks import renderers
+from banks.cache import fragment_cache
+from banks.models import Branch, DatasetVersion
+from banks.renderers import FastJSONRenderer, Fragment, FragmentList
+
+
+PAYLOAD = {
+    'count': 2,
+    'next': None,
+    'ratio': 0.25,
+    'amount': Decimal('1.50'),
+    'when': datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=dt_timezone.utc),
+    'results': [
+        {'ifsc': 'SBIN0000001', 'branch': 'Bāndra   "West"', 'tags': ['a', 'b']},
+        {'ifsc': 'SBIN0000002', 'branch': 'Fort', 'tags': []},
+    ],
+    1: 'integer key',
+}
+
+
+class FastJSONRendererTest(TestCase):
+    """Test cases for the fast JSON renderer and fragments."""
+
+    def test_matches_drf_renderer(self):
+        """Test output is byte-identical to JSONRenderer with either backend."""
+        expected = JSONRenderer().render(PAYLOAD)
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), expected)
+        self.assertEqual(renderers.assemble(PAYLOAD, renderers.encode_stdlib), expected)
+
+    def test_fragments_are_spliced(self):
+        """Test Fragments render their stored bytes and match plain dicts."""
+        results = FragmentList(Fragment(row) for row in PAYLOAD['results'])
+        data = {'count': 2, 'results': results, 'first': {'branch': results[0]}}
+        expected = JSONRenderer().render({'count': 2, 'results': PAYLOAD['results'], 'first': {'branch': PAYLOAD['results'][0]}})
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+
+        results[0].encoded = b'"spliced"'
+        self.assertEqual(FastJSONRenderer().render(results[0]), b'"spliced"')
+
+    def test_indent_falls_back(self):
+        """Test an indent in the Accept header is honoured."""
+        rendered = FastJSONRenderer().render(PAYLOAD, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render(PAYLOAD, 'application/json; indent=2'))
+
+
+class FragmentCacheTest(TestCase):
+    """Test cases for list pages assembled from cached fragments."""
+
+    def setUp(self):
+        fragment_cache.clear()
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+
+    def test_pages_reuse_fragments(self):
+        """Test list pages cache row fragments and stay correct after a change."""
+        url = reverse('branch-list')
+        first = self.client.get(url)
+        self.assertEqual(first.content, JSONRenderer().render(first.data))
+        self.assertEqual(len(fragment_cache), 10)
+
+        second = self.client.get(url)
+        self.assertIs(second.data['results'][0], first.data['results'][0])
+
+        branch = Branch.objects.get(ifsc=first.data['results'][0]['ifsc'])
+        branch.city = 'Renamed'
+        branch.save()
+        third = self.client.get(reverse('branch-search'), {'city': 'renamed'})
+        self.assertEqual(third.data['branches'][0]['ifsc'], branch.ifsc)
+        fourth = self.client.get(url)
+        self.assertEqual(fourth.data['results'][0]['city'], 'Renamed')
+
+    def test_changes_from_other_processes_clear_fragments(self):
+        """Test a change made without this process's signals never goes out under the new ETag."""
+        url = reverse('branch-list')
+        first = self.client.get(url)
+        ifsc = first.data['results'][0]['ifsc']
+        # QuerySet.update() sends no signals, as for a load run by another process.
+        Branch.objects.filter(ifsc=ifsc).update(city='Renamed')
+        DatasetVersion.bump()
+
+        second = self.client.get(url)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.data['results'][0]['city'], 'Renamed')
+        search = self.client.get(reverse('branch-search'), {'city': 'renamed'})
+        self.assertEqual(search.data['branches'][0]['city'], 'Renamed')
@@ -0,0 +1,102 @@
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks.ingest import CSVIngestor, validate_rows
+from banks.models import Bank, Branch
+from banks import search
+from banks.search import MATCH_CONTAINS, MATCH_PREFIX, has_fts, search_branches
+from tests.test_ingest import make_row
+
+
+class BranchSearchTest(TestCase):
+    """Test cases for indexed city, district and branch name search."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.bank = Bank.objects.create(id=1, name='Test Bank')
+        for ifsc, branch, city, district in [
+            ('TEST0000001', 'Fort Branch', 'Mumbai', 'Greater Mumbai'),
+            ('TEST0000002', 'Vashi Branch', 'Navi Mumbai', 'Thane'),
+            ('TEST0000003', 'Camp Branch', 'Pune', 'Pune'),
+        ]:
+            Branch.objects.create(
+                ifsc=ifsc, bank=self.bank, branch=branch, address='1 Main Road',
+                city=city, district=district, state='Maharashtra'
+            )
+        self.url = reverse('branch-search')
+
+    def search(self, terms, match):
+        return sorted(search_branches(Branch.objects.all(), terms, match).values_list('ifsc', flat=True))
+
+    def test_prefix_match_ignores_case(self):
+        """Test prefix matching is case-insensitive and anchored at the start."""
+        self.assertEqual(self.search({'city': 'mum'}, MATCH_PREFIX), ['TEST0000001'])
+        self.assertEqual(self.search({'city': 'NAVI M'}, MATCH_PREFIX), ['TEST0000002'])
+        self.assertEqual(self.search({'city': 'umbai'}, MATCH_PREFIX), [])
+
+    def test_contains_match(self):
+        """Test substring matching, through the trigram index and the short-term fallback."""
+        self.assertEqual(self.search({'city': 'umba'}, MATCH_CONTAINS), ['TEST0000001', 'TEST0000002'])
+        self.assertEqual(self.search({'city': 'un'}, MATCH_CONTAINS), ['TEST0000003'])
+        self.assertEqual(
+            self.search({'city': 'mumbai', 'district': 'thane'}, MATCH_CONTAINS), ['TEST0000002']
+        )
+
+    def test_trigram_index_follows_writes(self):
+        """Test the trigram index tracks saves, deletes and bulk loads."""
+        branch = Branch.objects.get(ifsc='TEST0000003')
+        branch.city = 'Pimpri'
+        branch.save()
+        self.assertEqual(self.search({'city': 'mpri'}, MATCH_CONTAINS), ['TEST0000003'])
+        self.assertEqual(self.search({'city': 'pune'}, MATCH_CONTAINS), [])
+
+        branch.delete()
+        self.assertEqual(self.search({'city': 'mpri'}, MATCH_CONTAINS), [])
+
+        CSVIngestor().ingest(validate_rows([(2, make_row('LOAD0000001', city='Nagpur'))]))
+        self.assertEqual(self.search({'city': 'agpu'}, MATCH_CONTAINS), ['LOAD0000001'])
+        self.assertEqual(self.search({'city': 'umba'}, MATCH_CONTAINS), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Trigram index is SQLite only')
+    def test_without_fts5(self):
+        """Test a SQLite build without FTS5 migrates without the index and searches with icontains."""
+        migration = import_module('banks.migrations.0002_search_indexes')
+        self.addCleanup(search._fts_tables.clear)
+        with connection.cursor() as cursor, mock.patch.object(migration, 'fts_supported', return_value=False):
+            editor = SimpleNamespace(connection=connection, execute=cursor.execute)
+            migration.drop_fts(None, editor)
+            migration.create_fts(None, editor)
+        search._fts_tables.clear()
+        self.assertFalse(has_fts())
+        self.assertEqual(self.search({'city': 'umba'}, MATCH_CONTAINS), ['TEST0000001', 'TEST0000002'])
+        CSVIngestor().ingest(validate_rows([(2, make_row('LOAD0000001', city='Nagpur'))]))
+        self.assertEqual(self.search({'city': 'agpu'}, MATCH_CONTAINS), ['LOAD0000001'])
+
+    def test_prefix_match_uses_index(self):
+        """Test the prefix range is answered from the LOWER(city) index."""
+        queryset = search_branches(Branch.objects.order_by(), {'city': 'mum'}, MATCH_PREFIX)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('branches_city_lower_idx', plan)
+
+    def test_search_api(self):
+        """Test GET /api/branches/search/ with district, branch and match parameters."""
+        response = self.client.get(self.url, {'city': 'mumbai', 'match': 'contains'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['branches']), 2)
+
+        response = self.client.get(self.url, {'district': 'thane'})
+        self.assertEqual([b['ifsc'] for b in response.data['branches']], ['TEST0000002'])
+
+        response = self.client.get(self.url, {'branch': 'camp'})
+        self.assertEqual([b['ifsc'] for b in response.data['branches']], ['TEST0000003'])
+
+        response = self.client.get(self.url, {'city': 'mumbai', 'match': 'fuzzy'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
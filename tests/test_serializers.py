@@ -0,0 +1,46 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from banks.models import Bank, Branch
+from banks.serializers import (
+    BANK_ROW,
+    BRANCH_DETAIL_ROW,
+    BRANCH_LIST_ROW,
+    BankSerializer,
+    BranchDetailSerializer,
+    BranchListSerializer,
+)
+
+
+class RowSerializerTest(TestCase):
+    """Test cases for the row serializers that mirror the ModelSerializers."""
+
+    def setUp(self):
+        call_command('init_data', stdout=StringIO())
+        Bank.objects.create(id=6, name='Bänk "Ünicode"')
+        Branch.objects.create(
+            ifsc='UNIC0000001', bank_id=6, branch='Chennai Anna Salai', address='1 Anna Salai, Chennai\n',
+            city='Chennai', district='Chennai', state='Tamil Nadu'
+        )
+
+    def assertSameBytes(self, row_serializer, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(row_serializer.serialize(row_serializer.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_output_is_identical(self):
+        """Test the rendered JSON is byte-identical to the ModelSerializers'."""
+        self.assertSameBytes(BANK_ROW, BankSerializer, Bank.objects.all())
+        self.assertSameBytes(BRANCH_LIST_ROW, BranchListSerializer, Branch.objects.select_related('bank'))
+        self.assertSameBytes(BRANCH_DETAIL_ROW, BranchDetailSerializer, Branch.objects.select_related('bank'))
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_output_is_identical_in_local_time(self):
+        """Test datetimes follow the current time zone like DRF's DateTimeField."""
+        self.assertSameBytes(BRANCH_DETAIL_ROW, BranchDetailSerializer, Branch.objects.select_related('bank'))
+
+    def test_single_query(self):
+        """Test related bank fields come from the same query."""
+        with self.assertNumQueries(1):
+            BRANCH_DETAIL_ROW.serialize(BRANCH_DETAIL_ROW.values(Branch.objects.all()))
@@ -0,0 +1,142 @@
+import tempfile
+import threading
+import time
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks.cache import branch_cache, fragment_cache
+from banks.models import Bank, Branch, DatasetVersion
+from banks.shared_cache import MISSING, SharedCache, make_key, shared_cache
+
+
+def file_cache(test):
+    """Run ``test`` with the shared cache enabled on a fresh FileBasedCache."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    test.enterContext(override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        },
+        BANKS_SHARED_CACHE={'ENABLED': True, 'ALIAS': 'shared', 'WAIT': 1},
+    ))
+    return caches['shared']
+
+
+class SharedCacheTest(SimpleTestCase):
+    """Test cases for versioned keys and coalescing in the shared cache."""
+
+    def setUp(self):
+        self.cache = file_cache(self)
+        self.shared = SharedCache()
+        self.version = (3, timezone.now())
+        self.computed = []
+
+    def compute(self, value='payload', delay=0):
+        def compute():
+            self.computed.append(value)
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_versions_namespace_keys(self):
+        self.assertEqual(self.shared.get_or_set('bank', 1, self.compute(), self.version), 'payload')
+        self.assertEqual(self.shared.get_or_set('bank', 1, self.compute('other'), self.version), 'payload')
+        newer = (4, timezone.now())
+        self.assertEqual(self.shared.get_or_set('bank', 1, self.compute('new'), newer), 'new')
+        self.assertIsNone(self.shared.get_or_set('bank', 2, lambda: None, newer))
+        self.assertIsNone(self.shared.get_or_set('bank', 2, self.compute(), newer))
+        self.assertEqual(self.computed, ['payload', 'new'])
+        self.assertEqual((self.shared.hits, self.shared.misses), (2, 3))
+
+    def test_threads_compute_once(self):
+        """Test concurrent misses of one key in a process run a single computation."""
+        results = []
+
+        def worker():
+            results.append(self.shared.get_or_set('branch-list', '/api/branches/', self.compute(delay=0.1), self.version))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['payload'] * 8)
+        self.assertEqual(self.computed, ['payload'])
+        self.assertEqual(self.shared.misses, 1)
+
+    def test_waits_for_another_process(self):
+        """Test a key another process is computing is waited for, and computed when it never arrives."""
+        key = make_key('bank', 1, self.version)
+        self.cache.add(f'{key}:lock', 1)
+        threading.Timer(0.1, self.cache.set, [key, 'theirs']).start()
+        self.assertEqual(self.shared.get_or_set('bank', 1, self.compute(), self.version), 'theirs')
+        self.assertEqual(self.computed, [])
+        self.assertEqual(self.shared.coalesced, 1)
+
+        key = make_key('bank', 2, self.version)
+        self.cache.add(f'{key}:lock', 1)
+        self.assertEqual(self.shared.get_or_set('bank', 2, self.compute(), self.version), 'payload')
+        self.assertEqual(self.cache.get(key, MISSING), 'payload')
+
+    def test_stats_keep_the_newest_version(self):
+        self.shared.observe(self.version)
+        self.shared.observe((2, None))  # a replica that lags behind
+        self.assertEqual(self.shared.stats()['version'], 3)
+        self.shared.observe((4, timezone.now()))
+        self.assertEqual(self.shared.stats()['version'], 4)
+
+
+class SharedCacheAPITest(TestCase):
+    """Test cases for the read endpoints on the shared cache."""
+
+    def setUp(self):
+        file_cache(self)
+        shared_cache.version = None
+        branch_cache.clear()
+        fragment_cache.clear()
+        self.client = APIClient()
+        bank = Bank.objects.create(id=1, name='STATE BANK OF INDIA')
+        Branch.objects.create(
+            ifsc='SBIN0000001', bank=bank, branch='Mumbai Main', address='Fort',
+            city='Mumbai', district='Mumbai', state='Maharashtra',
+        )
+        DatasetVersion.bump()
+
+    def test_cached_responses(self):
+        """Test repeated requests only read the dataset version."""
+        for url in (
+            reverse('branch-list'),
+            reverse('bank-list'),
+            reverse('bank-summary', kwargs={'id': 1}),
+            reverse('branch-detail', kwargs={'ifsc': 'SBIN0000001'}),
+            reverse('branch-search') + '?city=mum',
+            reverse('async-bank-list'),
+            reverse('async-bank-detail', kwargs={'id': 1}),
+            reverse('async-branch-detail', kwargs={'ifsc': 'SBIN0000001'}),
+            reverse('async-branch-search') + '?city=mum',
+        ):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            branch_cache.clear()
+            fragment_cache.clear()
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second.content, first.content, url)
+
+    def test_other_processes_writes(self):
+        """Test a write by another process, which bumps the version, is seen by the next request."""
+        detail = reverse('branch-detail', kwargs={'ifsc': 'SBIN0000001'})
+        self.assertEqual(self.client.get(detail).data['branch'], 'Mumbai Main')
+        self.assertEqual(self.client.get(reverse('branch-list')).data['results'][0]['branch'], 'Mumbai Main')
+        # Without signals, as seen from this process.
+        Branch.objects.filter(ifsc='SBIN0000001').update(branch='Fort Branch')
+        DatasetVersion.bump()
+        self.assertEqual(self.client.get(detail).data['branch'], 'Fort Branch')
+        self.assertEqual(self.client.get(reverse('branch-list')).data['results'][0]['branch'], 'Fort Branch')
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        self.assertEqual(self.client.get(reverse('cache-stats')).data['shared']['version'], 2)
@@ -0,0 +1,95 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from banks import snapshot
+from banks.cache import branch_cache
+from banks.models import Bank, Branch
+
+
+SNAPSHOT_ON = {'ENABLED': True, 'CHECK_INTERVAL': 3600}
+SNAPSHOT_ALWAYS_CHECK = {'ENABLED': True, 'CHECK_INTERVAL': 0}
+
+
+class SnapshotTest(TestCase):
+    """Test cases for serving reads from the in-memory snapshot."""
+
+    def setUp(self):
+        snapshot.discard()
+        branch_cache.clear()
+        self.client = APIClient()
+        call_command('init_data', stdout=StringIO())
+        Branch.objects.create(
+            ifsc='SBIN0000009', bank_id=1, branch='Andheri Branch', address='Andheri, Mumbai',
+            city='Mumbai', district='Mumbai', state='Maharashtra'
+        )
+
+    def tearDown(self):
+        snapshot.discard()
+
+    def assertSameResponses(self, requests):
+        expected = [self.client.get(url, params) for url, params in requests]
+        with self.settings(BANKS_SNAPSHOT=SNAPSHOT_ON):
+            snapshot.load()
+            with self.assertNumQueries(0):
+                actual = [self.client.get(url, params) for url, params in requests]
+        for (url, params), before, after in zip(requests, expected, actual):
+            self.assertEqual(after.status_code, before.status_code, (url, params))
+            self.assertEqual(after.json(), before.json(), (url, params))
+
+    def test_responses_match_database(self):
+        """Test every snapshot-backed endpoint returns what the database path returns."""
+        self.assertSameResponses([
+            (reverse('bank-list'), {}),
+            (reverse('bank-list'), {'page': 2}),
+            (reverse('bank-detail', kwargs={'id': 1}), {}),
+            (reverse('bank-detail', kwargs={'id': 999}), {}),
+            (reverse('bank-branches', kwargs={'bank_id': 1}), {}),
+            (reverse('bank-branches', kwargs={'bank_id': 999}), {}),
+            (reverse('branch-list'), {}),
+            (reverse('branch-detail', kwargs={'ifsc': 'sbin0000009'}), {}),
+            (reverse('branch-detail', kwargs={'ifsc': 'SBIN0999999'}), {}),
+            (reverse('branch-search'), {'ifsc': 'SBIN0000001'}),
+            (reverse('branch-search'), {'city': 'mum'}),
+            (reverse('branch-search'), {'city': 'Mumbai', 'branch': 'and'}),
+            (reverse('branch-search'), {'city': 'Nowhere'}),
+        ])
+
+    @override_settings(BANKS_SNAPSHOT=SNAPSHOT_ON)
+    def test_fallbacks_use_database(self):
+        """Test cursor pages and substring search still go to the database."""
+        snapshot.load()
+        response = self.client.get(reverse('branch-list'), {'pagination': 'cursor'})
+        self.assertEqual(response.data['results'][0]['ifsc'], 'HDFC0000001')
+        response = self.client.get(reverse('branch-search'), {'branch': 'andh'})
+        self.assertEqual(response.data['branches'][0]['ifsc'], 'SBIN0000009')
+
+    @override_settings(BANKS_SNAPSHOT=SNAPSHOT_ALWAYS_CHECK)
+    def test_swap_on_change(self):
+        """Test a changed table is picked up and a data load swaps the snapshot."""
+        first = snapshot.get_snapshot()
+        self.assertIs(snapshot.get_snapshot(), first)
+
+        Branch.objects.filter(ifsc='SBIN0000009').delete()
+        second = snapshot.get_snapshot()
+        self.assertIsNot(second, first)
+        self.assertIsNone(second.branch_payload('SBIN0000009'))
+
+        Bank.objects.filter(id=1).update(name='SBI')
+        call_command('init_data', refresh=True, stdout=StringIO())
+        self.assertEqual(snapshot._snapshot.bank_payload(1)['name'], 'State Bank of India')
+
+    def test_stats(self):
+        """Test GET /api/snapshot/stats/ reports memory use per branch."""
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        response = self.client.get(reverse('snapshot-stats'))
+        self.assertEqual(response.data, {'enabled': False})
+
+        with self.settings(BANKS_SNAPSHOT=SNAPSHOT_ON):
+            response = self.client.get(reverse('snapshot-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['banks'], response.data['branches']), (5, 11))
+        self.assertGreater(response.data['bytes_per_branch'], 0)
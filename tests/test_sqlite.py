@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import skipUnless
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import SimpleTestCase, override_settings
+from bank_api.database import parse_database_url
+from banks import sqlite
+from banks.models import Bank
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Tunes SQLite connections')
+class SQLiteTest(SimpleTestCase):
+    """Test cases for SQLite connection tuning and swap loads."""
+    databases = '__all__'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'banks.sqlite3')
+        alias = self.enterContext(sqlite.database_alias('test_sqlite', self.path))
+        self.alias = alias
+        call_command('migrate', database=alias, verbosity=0)
+        Bank.objects.using(alias).create(id=1, name='STATE BANK OF INDIA')
+
+    def pragma(self, name):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('cache_size'), -65536)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    def test_query_only(self):
+        connections[self.alias].close()
+        with override_settings(BANKS_SQLITE={'QUERY_ONLY': True}):
+            self.assertEqual(Bank.objects.using(self.alias).count(), 1)
+            with self.assertRaises(OperationalError):
+                Bank.objects.using(self.alias).create(id=2, name='ICICI BANK')
+            connections[self.alias].close()
+
+    def test_swap_load(self):
+        """Test a swap load replaces the file for new connections and cleans up old ones."""
+        def load(using):
+            Bank.objects.using(using).create(id=2, name='ICICI BANK')
+            return using
+
+        self.assertEqual(sqlite.swap_load(load, using=self.alias), 'test_sqlite_swap')
+        self.assertTrue(os.path.islink(self.path))
+        self.assertEqual(Bank.objects.using(self.alias).count(), 2)
+        first = os.path.realpath(self.path)
+
+        sqlite.swap_load(lambda using: Bank.objects.using(using).filter(id=1).delete(), using=self.alias)
+        self.assertEqual(list(Bank.objects.using(self.alias).values_list('id', flat=True)), [2])
+        self.assertNotEqual(os.path.realpath(self.path), first)
+        self.assertTrue(os.path.exists(first))  # kept for connections still reading it
+
+        sqlite.swap_load(lambda using: None, using=self.alias)
+        self.assertFalse(os.path.exists(first))
+        self.assertFalse(os.path.exists(self.path + '-wal'))
+
+    def test_immutable_url(self):
+        config = parse_database_url(f'sqlite:///{self.path}?immutable=1')
+        self.assertEqual(config['NAME'], f'file:{self.path}?immutable=1')
+        self.assertTrue(sqlite.is_immutable(config))
+        self.assertEqual(sqlite.database_path(config), self.path)
+        self.assertIsNone(sqlite.database_path({'NAME': ':memory:'}))
+        self.assertIsNone(sqlite.database_path({'NAME': 'file:memorydb?mode=memory&cache=shared'}))
+
+        connections[self.alias].close()
+        with sqlite.database_alias('test_immutable', config['NAME'], self.alias) as alias:
+            self.assertEqual(Bank.objects.using(alias).get().name, 'STATE BANK OF INDIA')